@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Benchmark v2 memory append throughput: per-record dedup vs bulk INSERT OR IGNORE."""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+ADAPTER_V2 = ROOT / "scripts" / "memory_backend_adapter_v2.py"
+
+
+def load_adapter_module():
+    spec = importlib.util.spec_from_file_location("memory_backend_adapter_v2", ADAPTER_V2)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_records(count: int, duplicate_ratio: float, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    unique = max(1, int(count * (1.0 - duplicate_ratio)))
+    return [
+        {
+            "content": f"synthetic memory {rng.randrange(unique)} venue latency note",
+            "evidence_score": round(rng.random(), 3),
+            "tags": [f"tag-{rng.randrange(16)}"],
+        }
+        for _ in range(count)
+    ]
+
+
+def run_mode(mod, policy: Path, records: List[Dict[str, Any]], bulk: bool, batch_size: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        adapter = mod.MemoryBackendAdapterV2(policy, Path(tmp) / "bench.sqlite3")
+        adapter.bulk_insert_enabled = bulk and adapter.bulk_insert_enabled
+        accepted = 0
+        started = time.perf_counter()
+        for start in range(0, len(records), batch_size):
+            out = adapter.append(
+                "long_term",
+                records[start : start + batch_size],
+                {"source": "bench-append"},
+            )
+            accepted += out["accepted_count"]
+        elapsed = time.perf_counter() - started
+        adapter.close()
+
+    return {
+        "mode": "bulk" if bulk else "per_record",
+        "records": len(records),
+        "accepted": accepted,
+        "seconds": round(elapsed, 4),
+        "records_per_sec": round(len(records) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark v2 memory append throughput.")
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--batch-size", type=int, default=5000, help="Records per append call.")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument(
+        "--policy",
+        default="contracts/memory/lds-memory-policy.json",
+        help="Memory policy JSON path (relative to LDS root).",
+    )
+    args = parser.parse_args()
+
+    mod = load_adapter_module()
+    records = make_records(args.records, args.duplicate_ratio, args.seed)
+    results = [
+        run_mode(mod, ROOT / args.policy, records, bulk=False, batch_size=args.batch_size),
+        run_mode(mod, ROOT / args.policy, records, bulk=True, batch_size=args.batch_size),
+    ]
+    before, after = results
+    speedup = (
+        round(after["records_per_sec"] / before["records_per_sec"], 2)
+        if before["records_per_sec"] and after["records_per_sec"]
+        else None
+    )
+
+    print(json.dumps({"benchmark": "memory_append_v2", "results": results, "speedup": speedup}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Reproducible performance benchmark for memory backends v1 (JSONL), v2 (SQLite) and sharded v2.
+
+Measures append throughput, query p50/p95/p99 latency, compact/evict wall time and on-disk size
+for a seeded synthetic workload, and writes one JSON artifact per run so results can be compared
+between commits (`--baseline` adds ratios against an earlier artifact).
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import math
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+ADAPTERS = {
+    "v1": ROOT / "scripts" / "memory_backend_adapter_v1.py",
+    "v2": ROOT / "scripts" / "memory_backend_adapter_v2.py",
+    "v2-sharded": ROOT / "scripts" / "memory_backend_adapter_v2.py",
+}
+COMMON = ROOT / "scripts" / "memory_backend_common.py"
+DOMAIN_WORDS = (
+    "latency", "venue", "settlement", "hedge", "drift", "slippage", "gateway", "outage",
+    "margin", "liquidity", "spread", "risk", "order", "fill", "clearing", "signal",
+)
+
+
+def load_module(path: Path, name: str):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_common_module():
+    module = sys.modules.get("memory_backend_common")
+    if module is None:
+        module = load_module(COMMON, "memory_backend_common")
+        sys.modules["memory_backend_common"] = module
+    return module
+
+
+common = load_common_module()
+_BACKEND_MODULES: Dict[str, Any] = {}
+
+
+def backend_module(backend: str):
+    if backend not in _BACKEND_MODULES:
+        _BACKEND_MODULES[backend] = load_module(ADAPTERS[backend], f"memory_backend_adapter_{backend}")
+    return _BACKEND_MODULES[backend]
+
+
+def parse_class_mix(raw: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if not name.strip() or not weight.strip():
+            raise ValueError(f"--class-mix entry must be class=weight: {part!r}")
+        mix[name.strip()] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("--class-mix must contain a positive weight")
+    return mix
+
+
+def generate_records(
+    count: int,
+    seed: int,
+    class_mix: Dict[str, float],
+    content_words: int,
+    tag_cardinality: int,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Deterministic (memory_class, record) pairs; content mixes domain words with a long-tail vocabulary."""
+    rng = random.Random(seed)
+    classes = list(class_mix)
+    weights = [class_mix[name] for name in classes]
+    vocabulary = [*DOMAIN_WORDS, *(f"term{i}" for i in range(5000))]
+    # Zipf-like weights keep a few words hot, like real agent notes.
+    vocab_weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+
+    records: List[Tuple[str, Dict[str, Any]]] = []
+    for i in range(count):
+        length = max(3, int(rng.gauss(content_words, content_words / 4)))
+        words = rng.choices(vocabulary, weights=vocab_weights, k=length)
+        tags = sorted({f"tag-{rng.randrange(tag_cardinality)}" for _ in range(rng.randrange(4))})
+        records.append(
+            (
+                rng.choices(classes, weights=weights, k=1)[0],
+                {
+                    "content": f"note {i} " + " ".join(words),
+                    "evidence_score": round(rng.random(), 3),
+                    "tags": tags,
+                },
+            )
+        )
+    return records
+
+
+def percentile(samples: List[float], pct: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return round(ordered[index], 3)
+
+
+def store_size_bytes(store: Path) -> int:
+    return sum(path.stat().st_size for path in store.rglob("*") if path.is_file())
+
+
+def open_adapter(backend: str, policy: Path, store: Path, **options: Any):
+    """Open a `MemoryBackend` by name; `store` is a directory owned by the backend."""
+    if backend == "v1":
+        return backend_module("v1").MemoryBackendAdapterV1(policy, store, **options)
+    if backend == "v2-sharded":
+        # One file per memory class regardless of the policy's own sharding.mode.
+        return backend_module("v2").ShardedMemoryBackendV2(
+            policy, store / "memory.sqlite3", sharding={"mode": "class"}, **options
+        )
+    return backend_module("v2").MemoryBackendAdapterV2(policy, store / "memory.sqlite3", **options)
+
+
+def run_backend(
+    backend: str,
+    policy: Path,
+    records: List[Tuple[str, Dict[str, Any]]],
+    args: argparse.Namespace,
+) -> Dict[str, Any]:
+    rng = random.Random(args.seed + 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Path(tmp)
+        adapter = open_adapter(backend, policy, store)
+        provenance = {"source": "bench-memory-backends"}
+
+        by_class: Dict[str, List[Dict[str, Any]]] = {}
+        for memory_class, record in records:
+            by_class.setdefault(memory_class, []).append(record)
+
+        accepted = 0
+        started = time.perf_counter()
+        for memory_class, class_records in by_class.items():
+            for start in range(0, len(class_records), args.batch_size):
+                out = adapter.append(memory_class, class_records[start : start + args.batch_size], provenance)
+                accepted += out["accepted_count"]
+        append_seconds = time.perf_counter() - started
+
+        latencies: List[float] = []
+        hits = 0
+        for _ in range(args.queries):
+            text = " ".join(rng.sample(DOMAIN_WORDS, k=rng.randint(1, 2)))
+            started = time.perf_counter()
+            out = adapter.query(text, None, args.top_k, filters={})
+            latencies.append((time.perf_counter() - started) * 1000.0)
+            hits += len(out["results"])
+
+        size_bytes = store_size_bytes(store)
+
+        started = time.perf_counter()
+        compacted = adapter.compact("episodic", date.today().isoformat(), 256) if "episodic" in by_class else None
+        compact_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        evicted = adapter.evict("short_term", "all", "benchmark", return_tombstones=False)
+        evict_seconds = time.perf_counter() - started
+
+        adapter.close()
+
+    return {
+        "backend": backend,
+        "records": len(records),
+        "accepted": accepted,
+        "append_seconds": round(append_seconds, 4),
+        "append_records_per_sec": round(len(records) / append_seconds, 1) if append_seconds > 0 else None,
+        "query_count": args.queries,
+        "query_avg_results": round(hits / args.queries, 2) if args.queries else None,
+        "query_p50_ms": percentile(latencies, 50),
+        "query_p95_ms": percentile(latencies, 95),
+        "query_p99_ms": percentile(latencies, 99),
+        "compact_seconds": round(compact_seconds, 4),
+        "compacted_count": compacted["compacted_count"] if compacted else 0,
+        "evict_seconds": round(evict_seconds, 4),
+        "evicted_count": evicted["evicted_count"],
+        "store_size_bytes": size_bytes,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            text=True,
+            capture_output=True,
+            check=False,
+        )
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline_path: Path) -> List[Dict[str, Any]]:
+    """Ratios current/baseline for matching (backend, records) runs; > 1.0 means slower or larger."""
+    with baseline_path.open("r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(run["backend"], run["records"]): run for run in baseline.get("results", [])}
+    metrics = ("query_p50_ms", "query_p95_ms", "query_p99_ms", "compact_seconds", "evict_seconds", "store_size_bytes")
+
+    comparison: List[Dict[str, Any]] = []
+    for run in results:
+        old = previous.get((run["backend"], run["records"]))
+        if old is None or run.get("skipped"):
+            continue
+        ratios: Dict[str, float | None] = {}
+        for metric in metrics:
+            before, after = old.get(metric), run.get(metric)
+            ratios[metric] = round(after / before, 3) if before and after is not None else None
+        before_rate, after_rate = old.get("append_records_per_sec"), run.get("append_records_per_sec")
+        # Throughput is inverted so every ratio reads "> 1.0 is a regression".
+        ratios["append_records_per_sec"] = round(before_rate / after_rate, 3) if before_rate and after_rate else None
+        comparison.append({"backend": run["backend"], "records": run["records"], "ratios": ratios})
+    return comparison
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark memory backends v1 and v2.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated record counts.")
+    parser.add_argument("--backends", default="v1,v2", help="Comma-separated backends (v1, v2, v2-sharded).")
+    parser.add_argument(
+        "--max-v1-records",
+        type=int,
+        default=100000,
+        help="Record v1 as skipped above this size (each query decodes every live record, so 1M records is impractical).",
+    )
+    parser.add_argument("--class-mix", default="short_term=0.5,episodic=0.3,long_term=0.2")
+    parser.add_argument("--content-words", type=int, default=24, help="Mean words per record.")
+    parser.add_argument("--tag-cardinality", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=5000, help="Records per append call.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument(
+        "--policy",
+        default="contracts/memory/lds-memory-policy.json",
+        help="Memory policy JSON path (relative to LDS root).",
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmarks/results/memory_backends.json",
+        help="JSON artifact path (relative to LDS root).",
+    )
+    parser.add_argument("--baseline", help="Earlier artifact to compare against.")
+    args = parser.parse_args()
+
+    sizes = [int(value) for value in args.sizes.split(",") if value.strip()]
+    backends = [value.strip() for value in args.backends.split(",") if value.strip()]
+    unknown = [name for name in backends if name not in ADAPTERS]
+    if unknown:
+        print(json.dumps({"status": "fail", "error": f"unknown backends: {unknown}"}, indent=2))
+        return 1
+    class_mix = parse_class_mix(args.class_mix)
+
+    results: List[Dict[str, Any]] = []
+    for size in sizes:
+        records = generate_records(size, args.seed, class_mix, args.content_words, args.tag_cardinality)
+        for backend in backends:
+            if backend == "v1" and size > args.max_v1_records:
+                results.append({"backend": backend, "records": size, "skipped": "above --max-v1-records"})
+                continue
+            run = run_backend(backend, ROOT / args.policy, records, args)
+            results.append(run)
+            print(json.dumps(run), file=sys.stderr)
+
+    artifact: Dict[str, Any] = {
+        "benchmark": "memory_backends",
+        "generated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "git_commit": git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "workload": {
+            "seed": args.seed,
+            "class_mix": class_mix,
+            "content_words": args.content_words,
+            "tag_cardinality": args.tag_cardinality,
+            "batch_size": args.batch_size,
+            "queries": args.queries,
+            "top_k": args.top_k,
+        },
+        "results": results,
+    }
+    if args.baseline:
+        artifact["comparison"] = compare_to_baseline(results, ROOT / args.baseline)
+
+    output = ROOT / args.output
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(artifact, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps({"status": "pass", "output": str(output), "runs": len(results)}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
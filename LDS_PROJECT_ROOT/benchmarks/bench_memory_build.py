@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Benchmark v2 record construction: one `_build_record` per record vs one `_build_records` per batch.
+
+Measures only the CPU work in front of SQLite: building record dicts (canonical hash, id, stamps)
+and turning them into INSERT parameters (tags/provenance JSON, epochs). No database writes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+ADAPTER_V2 = ROOT / "scripts" / "memory_backend_adapter_v2.py"
+
+
+def load_adapter_module():
+    spec = importlib.util.spec_from_file_location("memory_backend_adapter_v2", ADAPTER_V2)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_records(count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "content": f"synthetic memory {index} venue latency note {rng.randrange(1000)}",
+            "evidence_score": round(rng.random(), 3),
+            "tags": [f"tag-{rng.randrange(16)}"],
+        }
+        for index in range(count)
+    ]
+
+
+def best_of(repeats: int, run: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark v2 per-record vs batch record construction.")
+    parser.add_argument("--records", type=int, default=100000, help="Records per batch.")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per mode; the fastest is reported.")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument(
+        "--policy",
+        default="contracts/memory/lds-memory-policy.json",
+        help="Memory policy JSON path (relative to LDS root).",
+    )
+    args = parser.parse_args()
+
+    mod = load_adapter_module()
+    records = make_records(args.records, args.seed)
+    provenance = {"source": "bench-build", "batch": "microbenchmark"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        adapter = mod.MemoryBackendAdapterV2(ROOT / args.policy, Path(tmp) / "bench.sqlite3")
+
+        def per_record() -> None:
+            for raw in records:
+                adapter._insert_rows([adapter._build_record("long_term", raw, provenance)])
+
+        def batch() -> None:
+            adapter._insert_rows(adapter._build_records("long_term", records, provenance))
+
+        built = adapter._build_records("long_term", records, provenance)
+        phases = {
+            "per_record": best_of(args.repeats, per_record),
+            "batch": best_of(args.repeats, batch),
+            "batch_build_only": best_of(args.repeats, lambda: adapter._build_records("long_term", records, provenance)),
+            "batch_params_only": best_of(args.repeats, lambda: adapter._insert_rows(built)),
+        }
+        adapter.close()
+
+    results = [
+        {
+            "mode": mode,
+            "seconds": round(seconds, 4),
+            "records_per_sec": round(len(records) / seconds, 1) if seconds > 0 else None,
+            "us_per_record": round(seconds / len(records) * 1e6, 3) if records else None,
+        }
+        for mode, seconds in phases.items()
+    ]
+    print(
+        json.dumps(
+            {
+                "benchmark": "memory_build_v2",
+                "records": len(records),
+                "repeats": args.repeats,
+                "results": results,
+                "batch_speedup": round(phases["per_record"] / phases["batch"], 2) if phases["batch"] > 0 else None,
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
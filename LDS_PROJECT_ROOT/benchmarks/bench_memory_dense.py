@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Benchmark v2 query rankings on paraphrased queries: recall@k and latency per ranking mode.
+
+Each query is built from one stored record by keeping a few of its words, changing their suffixes
+and shuffling them, so the source record is the single relevant answer. `exact` is a pure-Python
+full-precision cosine scan over the same hashed embeddings; `dense_overlap_with_exact` is how much
+of its top-k the float16 batched scan reproduces.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+ADAPTER_V2 = ROOT / "scripts" / "memory_backend_adapter_v2.py"
+SUFFIXES = ("", "s", "ed", "ing", "er")
+SYLLABLES = ("ba", "ker", "lo", "mi", "nor", "pa", "qui", "ren", "sa", "tu", "vel", "zo", "dra", "fen", "gal", "hus")
+MODES = ("lexical", "bm25", "dense", "hybrid")
+
+
+def load_adapter_module():
+    spec = importlib.util.spec_from_file_location("memory_backend_adapter_v2", ADAPTER_V2)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(samples: List[float], pct: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return round(ordered[index], 3)
+
+
+def make_corpus(
+    records: int, queries: int, vocabulary: int, words: int, query_words: int, seed: int
+) -> Tuple[List[str], List[Tuple[str, int]]]:
+    rng = random.Random(seed)
+    stems: List[str] = []
+    seen = set()
+    while len(stems) < vocabulary:
+        stem = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+        if stem not in seen:
+            seen.add(stem)
+            stems.append(stem)
+
+    documents: List[List[str]] = []
+    contents: List[str] = []
+    for index in range(records):
+        chosen = rng.sample(stems, k=words)
+        documents.append(chosen)
+        contents.append(f"{' '.join(stem + rng.choice(SUFFIXES) for stem in chosen)} note {index}")
+
+    paraphrases: List[Tuple[str, int]] = []
+    for target in rng.sample(range(records), k=min(queries, records)):
+        kept = rng.sample(documents[target], k=min(query_words, words))
+        rng.shuffle(kept)
+        paraphrases.append((" ".join(stem + rng.choice(SUFFIXES) for stem in kept), target))
+    return contents, paraphrases
+
+
+def exact_scan(mod, vectors: List[Dict[int, float]], text: str, top: int) -> List[int]:
+    query = mod.hashed_embedding(text)
+    scored = []
+    for index, vector in enumerate(vectors):
+        score = sum(weight * vector.get(slot, 0.0) for slot, weight in query.items())
+        if score > 0.0:
+            scored.append((score, -index))
+    scored.sort(reverse=True)
+    return [-negated for _, negated in scored[:top]]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark v2 lexical, BM25, dense and hybrid recall on paraphrases.")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--vocabulary", type=int, default=4000, help="Distinct word stems in the corpus.")
+    parser.add_argument("--words", type=int, default=10, help="Stems per record.")
+    parser.add_argument("--query-words", type=int, default=4, help="Stems kept per paraphrased query.")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument(
+        "--policy",
+        default="contracts/memory/lds-memory-policy.json",
+        help="Memory policy JSON path (relative to LDS root).",
+    )
+    args = parser.parse_args()
+
+    mod = load_adapter_module()
+    contents, paraphrases = make_corpus(
+        args.records, args.queries, args.vocabulary, args.words, args.query_words, args.seed
+    )
+    top = args.top_k
+    results: List[Dict[str, Any]] = []
+    rankings: Dict[str, List[List[int]]] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        adapter = mod.MemoryBackendAdapterV2(ROOT / args.policy, Path(tmp) / "bench.sqlite3", dense_enabled=True)
+        started = time.perf_counter()
+        for start in range(0, len(contents), 5000):
+            adapter.append(
+                "long_term",
+                [{"content": content, "evidence_score": 0.5} for content in contents[start : start + 5000]],
+                {"source": "bench-dense"},
+            )
+        append_seconds = time.perf_counter() - started
+        index_of = {content: index for index, content in enumerate(contents)}
+
+        for mode in MODES:
+            latencies: List[float] = []
+            ranked: List[List[int]] = []
+            for text, _ in paraphrases:
+                started = time.perf_counter()
+                out = adapter.query(text, ["long_term"], top, filters={"ranking": mode})
+                latencies.append((time.perf_counter() - started) * 1000.0)
+                ranked.append([index_of[item["evidence"]["content"]] for item in out["results"]])
+            rankings[mode] = ranked
+            results.append({"mode": mode, "latencies": latencies})
+        adapter.close()
+
+    vectors = [mod.hashed_embedding(content) for content in contents]
+    latencies = []
+    ranked = []
+    for text, _ in paraphrases:
+        started = time.perf_counter()
+        ranked.append(exact_scan(mod, vectors, text, top))
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    rankings["exact"] = ranked
+    results.append({"mode": "exact", "latencies": latencies})
+
+    for entry in results:
+        ranked = rankings[entry["mode"]]
+        hits = sum(1 for (_, target), ids in zip(paraphrases, ranked) if target in ids)
+        latencies = entry.pop("latencies")
+        entry.update(
+            {
+                f"recall_at_{top}": round(hits / len(paraphrases), 4) if paraphrases else None,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+            }
+        )
+
+    overlaps = [
+        len(set(dense) & set(exact)) / len(exact)
+        for dense, exact in zip(rankings["dense"], rankings["exact"])
+        if exact
+    ]
+    print(
+        json.dumps(
+            {
+                "benchmark": "memory_dense_v2",
+                "records": len(contents),
+                "queries": len(paraphrases),
+                "top_k": top,
+                "embedding_model": mod.EMBEDDING_MODEL,
+                "numpy": mod._numpy() is not None,
+                "append_seconds": round(append_seconds, 4),
+                "results": results,
+                "dense_overlap_with_exact": round(sum(overlaps) / len(overlaps), 4) if overlaps else None,
+            },
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,121 +4,442 @@
 from __future__ import annotations
 
 import argparse
-import hashlib
+import importlib.util
 import json
+import os
 import sys
-from datetime import date, datetime, timedelta, timezone
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List
+from typing import Any, Dict, Iterable, Iterator, List
 
 ROOT = Path(__file__).resolve().parents[1]
+COMMON = ROOT / "scripts" / "memory_backend_common.py"
+
+
+def load_common_module():
+    module = sys.modules.get("memory_backend_common")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("memory_backend_common", COMMON)
+        module = importlib.util.module_from_spec(spec)
+        assert spec.loader is not None
+        sys.modules["memory_backend_common"] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+_common = load_common_module()
+Instrumentation = _common.Instrumentation
+MemoryBackend = _common.MemoryBackend
+add_instrumentation_arguments = _common.add_instrumentation_arguments
+add_operation_parsers = _common.add_operation_parsers
+dispatch_request = _common.dispatch_request
+instrumentation_from_args = _common.instrumentation_from_args
+instrumented = _common.instrumented
+load_records_from_args = _common.load_records_from_args
+parse_json_value = _common.parse_json_value
+request_from_args = _common.request_from_args
+
+
+class _ClassIndex:
+    """Sidecar index for one class: segment fingerprints plus one row per record.
+
+    Rows are `[segment, byte_offset, canonical_hash, expires_on, tombstone]`, enough for dedup,
+    eviction and query pre-filtering without decoding record lines.
+    """
+
+    VERSION = 1
+
+    def __init__(self) -> None:
+        self.segments: Dict[str, List[int]] = {}
+        self.records: Dict[str, List[Any]] = {}
+        self.live_hashes: set[str] = set()
+        self.dirty = False
+
+    def add_entry(self, segment: str, offset: int, entry: Dict[str, Any]) -> None:
+        self.dirty = True
+        if entry.get("op") == "update":
+            row = self.records.get(str(entry.get("record_id", "")))
+            if row is None:
+                return
+            fields = entry.get("set", {})
+            if "expires_on" in fields:
+                row[3] = fields["expires_on"]
+            if "tombstone" in fields:
+                tombstone = bool(fields["tombstone"])
+                if tombstone and not row[4]:
+                    self.live_hashes.discard(row[2])
+                elif not tombstone and row[4]:
+                    self.live_hashes.add(row[2])
+                row[4] = tombstone
+            return
+
+        record_id = str(entry.get("record_id") or f"#{segment}:{offset}")
+        previous = self.records.get(record_id)
+        if previous is not None and not previous[4]:
+            self.live_hashes.discard(previous[2])
+        row = [
+            segment,
+            offset,
+            str(entry.get("canonical_hash", "")),
+            entry.get("expires_on"),
+            bool(entry.get("tombstone", False)),
+        ]
+        self.records[record_id] = row
+        if not row[4]:
+            self.live_hashes.add(row[2])
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": self.VERSION,
+            "segments": self.segments,
+            "records": [[record_id, *row] for record_id, row in self.records.items()],
+        }
 
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "_ClassIndex":
+        if data.get("version") != cls.VERSION:
+            raise ValueError("unsupported index version")
+        index = cls()
+        index.segments = {str(name): [int(size), int(mtime)] for name, (size, mtime) in data["segments"].items()}
+        for record_id, *row in data["records"]:
+            index.records[record_id] = row
+            if not row[4]:
+                index.live_hashes.add(row[2])
+        return index
 
-class MemoryBackendAdapterV1:
-    """Reference backend that implements append/query/compact/evict on JSONL files."""
 
-    def __init__(self, policy_path: Path, store_dir: Path) -> None:
-        self.policy_path = policy_path
-        self.store_dir = store_dir
-        self.policy = self._load_json(policy_path)
-        self.memory_classes = self.policy.get("memory_classes", {})
-        self.requires_provenance = bool(
-            self.policy.get("merge_policy", {}).get("requires_provenance", True)
-        )
+class MemoryBackendAdapterV1(_common.MemoryBackendBase):
+    """Reference backend that implements append/query/compact/evict on JSONL files.
 
-        if not isinstance(self.memory_classes, dict) or not self.memory_classes:
-            raise ValueError("memory policy is invalid: memory_classes must be non-empty object")
-        self.store_dir.mkdir(parents=True, exist_ok=True)
+    Each class is an append-only log of JSONL segments: records and `op: update` entries
+    (tombstones, compaction links) are appended, segments roll at `segment_max_bytes`, and a
+    background merge folds sealed segments back into `<class>.jsonl`. A `<class>.idx` sidecar
+    maps records to byte offsets; it is caught up from segment tails or rebuilt when stale.
+    """
 
-    @staticmethod
-    def _load_json(path: Path) -> Dict[str, Any]:
-        with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+    SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+    MERGE_SEGMENT_THRESHOLD = 4
 
-    @staticmethod
-    def _sha256(text: str) -> str:
-        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    def __init__(
+        self,
+        policy_path: Path,
+        store_dir: Path,
+        segment_max_bytes: int | None = None,
+        background_merge: bool = True,
+        instrumentation: Instrumentation | None = None,
+    ) -> None:
+        self._init_policy(policy_path)
+        if instrumentation is not None:
+            self.instrumentation = instrumentation
+        self.store_dir = store_dir
+        self.segment_max_bytes = int(segment_max_bytes or self.SEGMENT_MAX_BYTES)
+        self.background_merge = background_merge
+        self._locks: Dict[str, threading.RLock] = {}
+        self._merge_locks: Dict[str, threading.Lock] = {}
+        self._merge_threads: Dict[str, threading.Thread] = {}
+        self._indexes: Dict[str, _ClassIndex] = {}
+        self._locks_guard = threading.Lock()
+        self.store_dir.mkdir(parents=True, exist_ok=True)
 
     def _class_file(self, memory_class: str) -> Path:
         self._validate_memory_class(memory_class)
         return self.store_dir / f"{memory_class}.jsonl"
 
-    def _validate_memory_class(self, memory_class: str) -> None:
-        if memory_class not in self.memory_classes:
-            allowed = ", ".join(sorted(self.memory_classes.keys()))
-            raise ValueError(f"unknown memory_class '{memory_class}', allowed: {allowed}")
+    def _lock_for(self, memory_class: str) -> threading.RLock:
+        with self._locks_guard:
+            return self._locks.setdefault(memory_class, threading.RLock())
+
+    @contextmanager
+    def _timed_lock(self, memory_class: str) -> Iterator[None]:
+        """Hold the class lock, recording how long acquiring it took as the `lock_wait` span."""
+        started = time.perf_counter()
+        with self._lock_for(memory_class):
+            self.instrumentation.add_span("lock_wait", (time.perf_counter() - started) * 1000.0)
+            yield
+
+    def _merge_lock_for(self, memory_class: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._merge_locks.setdefault(memory_class, threading.Lock())
+
+    def _segment_paths(self, memory_class: str) -> List[Path]:
+        """Base segment `<class>.jsonl` followed by numbered segments `<class>.NNNNNN.jsonl` in log order."""
+        base = self._class_file(memory_class)
+        numbered: List[tuple[int, Path]] = []
+        for path in self.store_dir.glob(f"{memory_class}.*.jsonl"):
+            seq = path.name[len(memory_class) + 1 : -len(".jsonl")]
+            if seq.isdigit():
+                numbered.append((int(seq), path))
+        paths = [base] if base.exists() else []
+        paths.extend(path for _, path in sorted(numbered))
+        return paths
+
+    def _numbered_segment(self, memory_class: str, seq: int) -> Path:
+        return self.store_dir / f"{memory_class}.{seq:06d}.jsonl"
+
+    def _next_segment(self, memory_class: str, segments: List[Path]) -> Path:
+        last = segments[-1] if segments else None
+        if last is None or last == self._class_file(memory_class):
+            return self._numbered_segment(memory_class, 1)
+        return self._numbered_segment(memory_class, int(last.name.split(".")[-2]) + 1)
+
+    def _active_segment(self, memory_class: str) -> Path:
+        segments = self._segment_paths(memory_class)
+        if not segments:
+            return self._class_file(memory_class)
+        active = segments[-1]
+        if active.stat().st_size >= self.segment_max_bytes:
+            return self._next_segment(memory_class, segments)
+        return active
+
+    @staticmethod
+    def _fold_entries(lines: Iterable[str], records: Dict[str, Dict[str, Any]]) -> None:
+        """Replay log lines into `records`: plain lines are records, `op: update` lines patch one by id."""
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get("op") == "update":
+                target = records.get(str(entry.get("record_id", "")))
+                if target is not None:
+                    target.update(entry.get("set", {}))
+                continue
+            key = str(entry.get("record_id") or f"#{len(records)}")
+            records[key] = entry
 
-    def _ttl_for_class(self, memory_class: str) -> timedelta:
-        config = self.memory_classes[memory_class]
-        if "ttl_hours" in config:
-            return timedelta(hours=int(config["ttl_hours"]))
-        if "ttl_days" in config:
-            return timedelta(days=int(config["ttl_days"]))
-        return timedelta(days=1)
+    def _read_segments(self, segments: List[Path]) -> List[Dict[str, Any]]:
+        records: Dict[str, Dict[str, Any]] = {}
+        for path in segments:
+            with path.open("r", encoding="utf-8") as f:
+                self._fold_entries(f, records)
+        return list(records.values())
 
     def _load_records(self, memory_class: str) -> List[Dict[str, Any]]:
-        path = self._class_file(memory_class)
-        if not path.exists():
-            return []
-
-        records: List[Dict[str, Any]] = []
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                records.append(json.loads(line))
-        return records
+        with self._lock_for(memory_class):
+            return self._read_segments(self._segment_paths(memory_class))
 
-    def _write_records(self, memory_class: str, records: Iterable[Dict[str, Any]]) -> None:
-        path = self._class_file(memory_class)
-        with path.open("w", encoding="utf-8") as f:
-            for rec in records:
-                f.write(json.dumps(rec, ensure_ascii=True) + "\n")
+    def _index_path(self, memory_class: str) -> Path:
+        return self.store_dir / f"{memory_class}.idx"
 
-    def _build_record(
-        self,
-        memory_class: str,
-        raw_record: Dict[str, Any],
-        provenance: Dict[str, Any],
-    ) -> Dict[str, Any]:
-        content = str(raw_record.get("content", "")).strip()
-        if not content:
-            raise ValueError("record.content must be non-empty")
-
-        now = datetime.now(timezone.utc)
-        canonical_content = " ".join(content.lower().split())
-        canonical_hash = self._sha256(canonical_content)
-        source = str(provenance.get("source", "unknown"))
-        entropy = f"{canonical_hash}:{now.isoformat()}:{source}"
-        record_id = self._sha256(entropy)[:24]
-        ttl = self._ttl_for_class(memory_class)
-
-        evidence_score = raw_record.get("evidence_score", 0.5)
-        try:
-            evidence_score = float(evidence_score)
-        except Exception as exc:
-            raise ValueError(f"record.evidence_score must be float-compatible ({exc})") from exc
+    @staticmethod
+    def _scan_segment(index: _ClassIndex, path: Path, start: int) -> None:
+        """Index complete lines of `path` from byte `start`; a torn trailing line is left for later."""
+        mtime_ns = path.stat().st_mtime_ns
+        offset = start
+        with path.open("rb") as f:
+            f.seek(start)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                if raw.strip():
+                    index.add_entry(path.name, offset, json.loads(raw))
+                offset += len(raw)
+        index.segments[path.name] = [offset, mtime_ns]
+        index.dirty = True
+
+    def _load_index(self, memory_class: str) -> _ClassIndex:
+        """Return the class index, reading the sidecar once and syncing it against segment size/mtime.
+
+        Segments only grow at the tail, so a larger segment is caught up from its recorded size;
+        a missing, shrunk or unknown-order segment (merge, manual edit) forces a full rebuild.
+        """
+        with self._lock_for(memory_class):
+            index = self._indexes.get(memory_class)
+            if index is None:
+                index = _ClassIndex()
+                sidecar = self._index_path(memory_class)
+                if sidecar.exists():
+                    try:
+                        index = _ClassIndex.from_json(self._load_json(sidecar))
+                    except (ValueError, KeyError, TypeError):
+                        index = _ClassIndex()
+
+            segments = self._segment_paths(memory_class)
+            names = [path.name for path in segments]
+            stale = any(name not in names for name in index.segments)
+            plan: List[tuple[Path, int]] = []
+            for path in segments:
+                known = index.segments.get(path.name)
+                if known is None:
+                    plan.append((path, 0))
+                    continue
+                stat = path.stat()
+                if [stat.st_size, stat.st_mtime_ns] == known:
+                    continue
+                if stat.st_size < known[0] or plan:
+                    stale = True
+                    break
+                plan.append((path, known[0]))
+            if stale:
+                index = _ClassIndex()
+                plan = [(path, 0) for path in segments]
+
+            for path, start in plan:
+                self._scan_segment(index, path, start)
+            self._indexes[memory_class] = index
+            return index
+
+    def _save_index(self, memory_class: str) -> None:
+        with self._lock_for(memory_class):
+            index = self._indexes.get(memory_class)
+            if index is None or not index.dirty:
+                return
+            sidecar = self._index_path(memory_class)
+            tmp = sidecar.with_name(sidecar.name + ".tmp")
+            tmp.write_text(json.dumps(index.to_json(), separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, sidecar)
+            index.dirty = False
+
+    def _drop_index(self, memory_class: str) -> None:
+        with self._lock_for(memory_class):
+            self._indexes.pop(memory_class, None)
+            self._index_path(memory_class).unlink(missing_ok=True)
+
+    def _iter_live_records(self, memory_class: str, today: date) -> Iterator[Dict[str, Any]]:
+        """Decode only live, unexpired record lines (as written; later update entries are not applied)."""
+        with self._lock_for(memory_class):
+            index = self._load_index(memory_class)
+            order = {path.name: pos for pos, path in enumerate(self._segment_paths(memory_class))}
+            rows = []
+            for row in index.records.values():
+                if row[4]:
+                    continue
+                expires = self._safe_date(row[3])
+                if expires is not None and expires < today:
+                    continue
+                rows.append(row)
+            rows.sort(key=lambda row: (order.get(row[0], -1), row[1]))
+
+            handle = None
+            current = None
+            try:
+                for row in rows:
+                    if row[0] != current:
+                        if handle is not None:
+                            handle.close()
+                        current = row[0]
+                        handle = (self.store_dir / current).open("rb")
+                    handle.seek(row[1])
+                    yield json.loads(handle.readline())
+            finally:
+                if handle is not None:
+                    handle.close()
+
+    def _append_entries(self, memory_class: str, entries: Iterable[Dict[str, Any]]) -> None:
+        """Append records or update entries to the active segment; cost is O(batch), not O(store)."""
+        entries = list(entries)
+        if not entries:
+            return
+        lines = [(json.dumps(entry, ensure_ascii=True) + "\n").encode("utf-8") for entry in entries]
+        with self._lock_for(memory_class):
+            index = self._load_index(memory_class)
+            active = self._active_segment(memory_class)
+            rolled = not active.exists() and active != self._class_file(memory_class)
+            with active.open("ab") as f:
+                offset = f.tell()
+                f.write(b"".join(lines))
+            for entry, line in zip(entries, lines):
+                index.add_entry(active.name, offset, entry)
+                offset += len(line)
+            index.segments[active.name] = [offset, active.stat().st_mtime_ns]
+        if rolled:
+            self._maybe_schedule_merge(memory_class)
+
+    @staticmethod
+    def _update_entry(record_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        return {"op": "update", "record_id": record_id, "set": fields}
 
-        tags = raw_record.get("tags", [])
-        if tags is None:
-            tags = []
-        if not isinstance(tags, list):
-            raise ValueError("record.tags must be a list when provided")
+    def _write_records(self, memory_class: str, records: Iterable[Dict[str, Any]]) -> None:
+        """Replace the whole class with `records` as one base segment, dropping other segments and the index.
+
+        A full O(class) rewrite that no write path uses; `merge` folds segments on its own. Kept for
+        tests and manual maintenance that need to edit stored records in place.
+        """
+        with self._merge_lock_for(memory_class), self._lock_for(memory_class):
+            path = self._class_file(memory_class)
+            tmp = path.with_name(path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for rec in records:
+                    f.write(json.dumps(rec, ensure_ascii=True) + "\n")
+            os.replace(tmp, path)
+            for segment in self._segment_paths(memory_class):
+                if segment != path:
+                    segment.unlink()
+            self._drop_index(memory_class)
+
+    @instrumented("merge")
+    def merge(self, memory_class: str) -> Dict[str, Any]:
+        """Fold sealed segments (records plus tombstone/compaction updates) into the base segment.
+
+        The active segment is sealed first so writers keep appending to a fresh segment while the
+        fold runs; only the final swap holds the class lock.
+        """
+        self._validate_memory_class(memory_class)
+        with self._merge_lock_for(memory_class):
+            with self._lock_for(memory_class):
+                segments = self._segment_paths(memory_class)
+                if not segments:
+                    return {"segments_merged": 0, "record_count": 0, "bytes_before": 0, "bytes_after": 0}
+                active = segments[-1]
+                if active == self._class_file(memory_class) or active.stat().st_size > 0:
+                    self._next_segment(memory_class, segments).touch()
+                else:
+                    segments = segments[:-1]
+
+            bytes_before = sum(path.stat().st_size for path in segments)
+            records = self._read_segments(segments)
+            base = self._class_file(memory_class)
+            tmp = base.with_name(base.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for rec in records:
+                    f.write(json.dumps(rec, ensure_ascii=True) + "\n")
+
+            with self._lock_for(memory_class):
+                os.replace(tmp, base)
+                for segment in segments:
+                    if segment != base:
+                        segment.unlink()
+                self._drop_index(memory_class)
 
         return {
-            "record_id": record_id,
-            "memory_class": memory_class,
-            "canonical_hash": canonical_hash,
-            "content": content,
-            "evidence_score": max(0.0, min(1.0, evidence_score)),
-            "tags": [str(tag) for tag in tags],
-            "created_at": now.isoformat().replace("+00:00", "Z"),
-            "expires_on": (now + ttl).date().isoformat(),
-            "provenance": provenance,
-            "tombstone": False,
+            "segments_merged": len(segments),
+            "record_count": len(records),
+            "bytes_before": bytes_before,
+            "bytes_after": base.stat().st_size,
         }
 
+    def _maybe_schedule_merge(self, memory_class: str) -> None:
+        if not self.background_merge:
+            return
+        sealed = len(self._segment_paths(memory_class)) - 1
+        if sealed < self.MERGE_SEGMENT_THRESHOLD:
+            return
+        with self._locks_guard:
+            running = self._merge_threads.get(memory_class)
+            if running is not None and running.is_alive():
+                return
+            thread = threading.Thread(
+                target=self.merge,
+                args=(memory_class,),
+                name=f"memory-v1-merge-{memory_class}",
+                daemon=True,
+            )
+            self._merge_threads[memory_class] = thread
+            thread.start()
+
+    def close(self) -> None:
+        """Wait for background merges, then persist dirty sidecar indexes."""
+        with self._locks_guard:
+            threads = list(self._merge_threads.values())
+        for thread in threads:
+            thread.join()
+        for memory_class in list(self._indexes):
+            self._save_index(memory_class)
+
+    @instrumented("append")
     def append(
         self,
         memory_class: str,
@@ -126,44 +447,30 @@ class MemoryBackendAdapterV1:
         provenance: Dict[str, Any] | None,
     ) -> Dict[str, Any]:
         self._validate_memory_class(memory_class)
-        provenance = provenance or {}
-        if self.requires_provenance and not provenance:
-            raise ValueError("provenance is required by memory policy")
-
-        existing = self._load_records(memory_class)
-        existing_hashes = {
-            str(rec.get("canonical_hash", ""))
-            for rec in existing
-            if not bool(rec.get("tombstone", False))
-        }
+        provenance = self._validate_provenance(provenance)
 
-        accepted: List[Dict[str, Any]] = []
-        for raw in records:
-            if not isinstance(raw, dict):
-                raise ValueError("append records must be objects")
-            built = self._build_record(memory_class, raw, provenance)
-            if built["canonical_hash"] in existing_hashes:
-                continue
-            accepted.append(built)
-            existing_hashes.add(built["canonical_hash"])
+        with self._timed_lock(memory_class):
+            existing_hashes = self._load_index(memory_class).live_hashes
+            batch_hashes: set[str] = set()
+
+            accepted: List[Dict[str, Any]] = []
+            for built in self._build_records(memory_class, records, provenance):
+                if built["canonical_hash"] in existing_hashes or built["canonical_hash"] in batch_hashes:
+                    continue
+                accepted.append(built)
+                batch_hashes.add(built["canonical_hash"])
 
-        if accepted:
-            self._write_records(memory_class, [*existing, *accepted])
+            with self.instrumentation.span("write"):
+                self._append_entries(memory_class, accepted)
+        self.instrumentation.count("rows_in", len(records))
+        self.instrumentation.count("rows_accepted", len(accepted))
 
         return {
             "accepted_count": len(accepted),
             "record_ids": [rec["record_id"] for rec in accepted],
         }
 
-    @staticmethod
-    def _safe_date(value: Any) -> date | None:
-        if not isinstance(value, str):
-            return None
-        try:
-            return date.fromisoformat(value[:10])
-        except Exception:
-            return None
-
+    @instrumented("query")
     def query(
         self,
         query: str,
@@ -181,15 +488,11 @@ class MemoryBackendAdapterV1:
 
         today = date.today()
         scored: List[Dict[str, Any]] = []
+        scanned = 0
 
         for cls in classes:
-            for rec in self._load_records(cls):
-                if bool(rec.get("tombstone", False)):
-                    continue
-                expires = self._safe_date(rec.get("expires_on"))
-                if expires is not None and expires < today:
-                    continue
-
+            for rec in self._iter_live_records(cls, today):
+                scanned += 1
                 content = str(rec.get("content", "")).lower()
                 token_hits = sum(content.count(tok) for tok in text.split())
                 if token_hits <= 0:
@@ -209,8 +512,11 @@ class MemoryBackendAdapterV1:
                     }
                 )
 
-        scored.sort(key=lambda item: item["score"], reverse=True)
+        with self.instrumentation.span("sort"):
+            scored.sort(key=lambda item: item["score"], reverse=True)
         top = max(1, int(top_k))
+        self.instrumentation.count("rows_scanned", scanned)
+        self.instrumentation.count("rows_returned", min(top, len(scored)))
 
         return {
             "results": scored[:top],
@@ -218,6 +524,7 @@ class MemoryBackendAdapterV1:
             "filters": filters or {},
         }
 
+    @instrumented("compact")
     def compact(self, memory_class: str, before_date: str, max_tokens: int) -> Dict[str, Any]:
         self._validate_memory_class(memory_class)
 
@@ -260,17 +567,27 @@ class MemoryBackendAdapterV1:
         summary_ids = append_result["record_ids"]
         summary_id = summary_ids[0] if summary_ids else None
         if summary_id:
-            for rec in records:
-                if rec in eligible:
-                    rec["compacted_into"] = summary_id
+            self._append_entries(
+                memory_class,
+                (
+                    self._update_entry(str(rec.get("record_id", "")), {"compacted_into": summary_id})
+                    for rec in eligible
+                ),
+            )
 
-        self._write_records(memory_class, records)
         return {
             "compacted_count": len(eligible),
             "summary_ids": summary_ids,
         }
 
-    def evict(self, memory_class: str, selector: str, reason_code: str) -> Dict[str, Any]:
+    @instrumented("evict")
+    def evict(
+        self,
+        memory_class: str,
+        selector: str,
+        reason_code: str,
+        return_tombstones: bool = True,
+    ) -> Dict[str, Any]:
         self._validate_memory_class(memory_class)
         selector = selector.strip().lower()
         if selector not in {"expired", "all"}:
@@ -279,69 +596,39 @@ class MemoryBackendAdapterV1:
             raise ValueError("reason_code must be non-empty")
 
         today = date.today()
-        records = self._load_records(memory_class)
         tombstones: List[str] = []
+        updates: List[Dict[str, Any]] = []
 
-        for rec in records:
-            if bool(rec.get("tombstone", False)):
-                continue
+        with self._timed_lock(memory_class):
+            for record_id, row in self._load_index(memory_class).records.items():
+                if row[4]:
+                    continue
 
-            should_evict = selector == "all"
-            if selector == "expired":
-                expires = self._safe_date(rec.get("expires_on"))
-                should_evict = expires is not None and expires < today
+                should_evict = selector == "all"
+                if selector == "expired":
+                    expires = self._safe_date(row[3])
+                    should_evict = expires is not None and expires < today
 
-            if not should_evict:
-                continue
+                if not should_evict:
+                    continue
 
-            rec["tombstone"] = True
-            rec["tombstone_reason"] = reason_code
-            rec["tombstoned_on"] = today.isoformat()
-            tombstones.append(str(rec.get("record_id", "")))
+                updates.append(
+                    self._update_entry(
+                        record_id,
+                        {"tombstone": True, "tombstone_reason": reason_code, "tombstoned_on": today.isoformat()},
+                    )
+                )
+                tombstones.append(record_id)
 
-        self._write_records(memory_class, records)
+            with self.instrumentation.span("write"):
+                self._append_entries(memory_class, updates)
+        self.instrumentation.count("rows_evicted", len(tombstones))
         return {
             "evicted_count": len(tombstones),
-            "tombstones": tombstones,
+            "tombstones": tombstones if return_tombstones else [],
         }
 
 
-def parse_json_value(raw: str, field_name: str) -> Dict[str, Any]:
-    try:
-        data = json.loads(raw)
-    except Exception as exc:
-        raise ValueError(f"{field_name} must be valid JSON ({exc})") from exc
-    if not isinstance(data, dict):
-        raise ValueError(f"{field_name} must be a JSON object")
-    return data
-
-
-def load_records_from_args(records_file: str | None, record_values: List[str]) -> List[Dict[str, Any]]:
-    records: List[Dict[str, Any]] = []
-
-    if records_file:
-        path = Path(records_file)
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            records.append(data)
-        elif isinstance(data, list):
-            for item in data:
-                if not isinstance(item, dict):
-                    raise ValueError("records file list must contain only objects")
-                records.append(item)
-        else:
-            raise ValueError("records file must be a JSON object or JSON array")
-
-    for raw in record_values:
-        records.append(parse_json_value(raw, "--record"))
-
-    if not records:
-        raise ValueError("no records provided")
-
-    return records
-
-
 def main() -> int:
     parser = argparse.ArgumentParser(description="LDS memory backend adapter v1.")
     parser.add_argument(
@@ -354,53 +641,34 @@ def main() -> int:
         default="reports/handoff/memory_store",
         help="Storage directory for memory backend.",
     )
+    add_instrumentation_arguments(parser)
 
     sub = parser.add_subparsers(dest="cmd", required=True)
 
-    p_append = sub.add_parser("append", help="Append records to a memory class")
-    p_append.add_argument("--memory-class", required=True)
-    p_append.add_argument("--records-file", help="JSON file with object or array of objects")
-    p_append.add_argument("--record", action="append", default=[], help="Inline JSON record")
-    p_append.add_argument("--provenance", default="{}", help="Provenance JSON object")
-
-    p_query = sub.add_parser("query", help="Query records")
-    p_query.add_argument("--query", required=True)
-    p_query.add_argument("--memory-class", action="append", default=[])
-    p_query.add_argument("--top-k", type=int, default=5)
+    add_operation_parsers(sub)
 
-    p_compact = sub.add_parser("compact", help="Compact old records")
-    p_compact.add_argument("--memory-class", required=True)
-    p_compact.add_argument("--before-date", required=True, help="YYYY-MM-DD")
-    p_compact.add_argument("--max-tokens", type=int, default=256)
-
-    p_evict = sub.add_parser("evict", help="Evict records")
-    p_evict.add_argument("--memory-class", required=True)
-    p_evict.add_argument("--selector", required=True, choices=["expired", "all"])
-    p_evict.add_argument("--reason-code", required=True)
+    p_merge = sub.add_parser("merge", help="Fold log segments into the base segment")
+    p_merge.add_argument("--memory-class", required=True)
 
     args = parser.parse_args()
+    metrics = instrumentation_from_args(args)
 
     try:
-        adapter = MemoryBackendAdapterV1(ROOT / args.policy, ROOT / args.store_dir)
-
-        if args.cmd == "append":
-            records = load_records_from_args(args.records_file, args.record)
-            provenance = parse_json_value(args.provenance, "--provenance")
-            out = adapter.append(args.memory_class, records, provenance)
-        elif args.cmd == "query":
-            classes = args.memory_class if args.memory_class else None
-            out = adapter.query(args.query, classes, args.top_k, filters={})
-        elif args.cmd == "compact":
-            out = adapter.compact(args.memory_class, args.before_date, args.max_tokens)
-        elif args.cmd == "evict":
-            out = adapter.evict(args.memory_class, args.selector, args.reason_code)
+        adapter = MemoryBackendAdapterV1(ROOT / args.policy, ROOT / args.store_dir, instrumentation=metrics)
+
+        if args.cmd == "merge":
+            out = adapter.merge(args.memory_class)
         else:
-            raise ValueError(f"unsupported command: {args.cmd}")
+            out = dispatch_request(adapter, request_from_args(args))
+        adapter.close()
     except Exception as exc:
         print(json.dumps({"status": "fail", "error": str(exc)}, indent=2))
         return 1
 
-    print(json.dumps({"status": "pass", "result": out}, indent=2))
+    payload: Dict[str, Any] = {"status": "pass", "result": out}
+    if args.stats and metrics is not None:
+        payload["stats"] = metrics.last
+    print(json.dumps(payload, indent=2))
     return 0
 
 
@@ -4,43 +4,311 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import copy
 import hashlib
+import heapq
+import importlib.util
 import json
 import logging
+import math
+import os
+import re
+import socket
+import socketserver
 import sqlite3
+import struct
 import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Any, Dict, Iterable, Iterator, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List
 
 ROOT = Path(__file__).resolve().parents[1]
-ROOT_RESOLVED = ROOT.resolve()
+COMMON = ROOT / "scripts" / "memory_backend_common.py"
 LOG = logging.getLogger("memory_backend_adapter_v2")
 
 
-class MemoryBackendAdapterV2:
-    """SQLite backend with transactional append/query/compact/evict operations."""
+def load_common_module():
+    module = sys.modules.get("memory_backend_common")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("memory_backend_common", COMMON)
+        module = importlib.util.module_from_spec(spec)
+        assert spec.loader is not None
+        sys.modules["memory_backend_common"] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+_common = load_common_module()
+Instrumentation = _common.Instrumentation
+MemoryBackend = _common.MemoryBackend
+add_instrumentation_arguments = _common.add_instrumentation_arguments
+add_operation_parsers = _common.add_operation_parsers
+dispatch_request = _common.dispatch_request
+instrumentation_from_args = _common.instrumentation_from_args
+instrumented = _common.instrumented
+iter_ndjson = _common.iter_ndjson
+load_records_from_args = _common.load_records_from_args
+open_ndjson = _common.open_ndjson
+parse_json_value = _common.parse_json_value
+request_from_args = _common.request_from_args
+resolve_records_file_path = _common.resolve_records_file_path
+
+
+# Dense retrieval: signed feature hashing of character trigrams into a fixed-size vector.
+# The slot of a feature depends only on its bytes (blake2b), so vectors are stable across
+# processes and machines; the layout version is recorded in backend_meta as `embedding_model`.
+EMBEDDING_DIM = 256
+EMBEDDING_MODEL = f"hashed-trigram-v1:{EMBEDDING_DIM}"
+_EMBEDDING_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_EMBEDDING_BLOB = struct.Struct(f"<{EMBEDDING_DIM}e")
+
+
+@lru_cache(maxsize=1)
+def _numpy() -> Any:
+    """NumPy, or None when it is not installed.
+
+    Imported on first dense use rather than at module load: it costs ~0.2 s, which every CLI start
+    (including the thin daemon client) would otherwise pay.
+    """
+    try:
+        import numpy  # type: ignore
+    except Exception:  # pragma: no cover
+        return None
+    return numpy
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_features(token: str) -> tuple[tuple[int, float], ...]:
+    """Signed slot weights of one word's boundary-marked character trigrams, each weighted 1/n.
+
+    Trigrams only (no whole-word feature): inflections and near-spellings then share most slots,
+    which is what dense mode is for; exact words are already served by the lexical modes. Cached
+    per token because vocabularies are small relative to record counts.
+    """
+    marked = f"<{token}>"
+    grams = [marked[i : i + 3] for i in range(len(marked) - 2)]
+    weight = 1.0 / len(grams)
+    weights: Dict[int, float] = {}
+    for gram in grams:
+        digest = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+        slot = digest % EMBEDDING_DIM
+        weights[slot] = weights.get(slot, 0.0) + (weight if digest >> 63 else -weight)
+    return tuple(weights.items())
+
+
+def hashed_embedding(text: str) -> Dict[int, float]:
+    """Sparse, L2-normalized embedding of `text`; empty when it has no alphanumeric tokens."""
+    vector: Dict[int, float] = {}
+    for token in _EMBEDDING_TOKEN_RE.findall(text.lower()):
+        for slot, weight in _token_features(token):
+            vector[slot] = vector.get(slot, 0.0) + weight
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if norm == 0.0:
+        return {}
+    return {slot: value / norm for slot, value in vector.items() if value != 0.0}
+
+
+def embedding_blob(text: str) -> bytes:
+    """float16 little-endian blob of `hashed_embedding(text)` (2 bytes per dimension)."""
+    dense = [0.0] * EMBEDDING_DIM
+    for slot, value in hashed_embedding(str(text or "")).items():
+        dense[slot] = value
+    return _EMBEDDING_BLOB.pack(*dense)
+
+
+class _BackupRestarted(Exception):
+    """Raised from the backup progress callback to abandon a stepped copy other writers keep restarting."""
+
+
+class _QueryCache:
+    """LRU of query results tagged with the class generations they were computed at."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple[Any, ...], tuple[tuple[int, ...], List[Dict[str, Any]]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[Any, ...], generations: tuple[int, ...]) -> List[Dict[str, Any]] | None:
+        cached = self.entries.get(key)
+        if cached is None or cached[0] != generations:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(cached[1])
 
-    SCHEMA_VERSION = "2.0.0"
+    def put(self, key: tuple[Any, ...], generations: tuple[int, ...], results: List[Dict[str, Any]]) -> None:
+        self.entries[key] = (generations, copy.deepcopy(results))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
 
-    def __init__(self, policy_path: Path, db_path: Path) -> None:
-        self.policy_path = policy_path
-        self.db_path = db_path
-        self.policy = self._load_json(policy_path)
-        self.memory_classes = self.policy.get("memory_classes", {})
-        self.requires_provenance = bool(
-            self.policy.get("merge_policy", {}).get("requires_provenance", True)
-        )
+    def stats(self, hit: bool) -> Dict[str, Any]:
+        return {"hit": hit, "hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+class MemoryBackendAdapterV2(_common.MemoryBackendBase):
+    """SQLite backend with transactional append/query/compact/evict operations."""
 
-        if not isinstance(self.memory_classes, dict) or not self.memory_classes:
-            raise ValueError("memory policy is invalid: memory_classes must be non-empty object")
+    BASE_SCHEMA_VERSION = "2.0.0"
+    SCHEMA_VERSION = "2.8.0"
+    # Backfills commit per batch so writers interleave and an interrupted migration resumes.
+    MIGRATION_BATCH_ROWS = 5000
+    # Trigram tokens keep FTS5 MATCH equivalent to the substring scorer for tokens of 3+ chars.
+    FTS_MIN_TOKEN_CHARS = 3
+    # 500 rows x 14 bound parameters stays far below SQLITE_MAX_VARIABLE_NUMBER.
+    APPEND_CHUNK_ROWS = 500
+    # Query rows are pulled in batches so fetch and score time can be measured without a clock read per row.
+    QUERY_FETCH_ROWS = 256
+    # Embedding rows per batched dot product (4096 x 512-byte blobs = 2 MiB per batch).
+    DENSE_SCAN_ROWS = 4096
+    INSERT_COLUMNS = (
+        "record_id",
+        "memory_class",
+        "canonical_hash",
+        "content",
+        "evidence_score",
+        "tags_json",
+        "created_at",
+        "expires_on",
+        "provenance_json",
+        "tombstone",
+        "compliance_hold",
+        "content_words",
+        "created_epoch",
+        "expires_epoch",
+    )
+    # v1 import carries tombstone and compaction state through unchanged.
+    V1_IMPORT_COLUMNS = (*INSERT_COLUMNS, "tombstone_reason", "tombstoned_on", "compacted_into")
+    # v1 `op: update` fields that map onto memory_records columns.
+    V1_UPDATE_FIELDS = (
+        "tombstone",
+        "tombstone_reason",
+        "tombstoned_on",
+        "compacted_into",
+        "expires_on",
+        "compliance_hold",
+    )
+    V1_IMPORT_BATCH_LINES = 20000
+    COMPACTION_WINDOWS = ("day", "rows")
+    COMPACTION_WINDOW_ROWS = 1000
+    # Hard deletes commit per batch so a long purge never holds the write lock for long.
+    PURGE_BATCH_ROWS = 5000
+    NDJSON_IMPORT_BATCH_LINES = 5000
+    # Online backup: pages copied per step (1 MiB at the default 4 KiB page size), the pause between
+    # steps that lets writers in, and how many restarts (a write from another connection) a stepped
+    # copy tolerates before finishing in a single pass.
+    BACKUP_PAGES_PER_STEP = 256
+    BACKUP_STEP_SLEEP_MS = 5.0
+    BACKUP_MAX_RESTARTS = 3
+    SNAPSHOT_FORMAT = "lds-memory-snapshot/1"
+    SNAPSHOT_DIR = ROOT / "reports" / "handoff" / "memory_snapshots"
+    EXPORT_TOMBSTONE_FILTERS = ("exclude", "include", "only")
+    RETENTION_DEFAULTS: Dict[str, Any] = {
+        "purge_after_days": 90,
+        "maintenance_budget_seconds": 2.0,
+        "vacuum_pages_per_step": 256,
+    }
+    # Used when the policy has no `performance` block; policy profiles override these by name.
+    PERFORMANCE_DEFAULTS: Dict[str, Any] = {
+        "default_profile": "balanced",
+        "profiles": {
+            "balanced": {
+                "synchronous": "NORMAL",
+                "cache_size_kib": 65536,
+                "mmap_size_bytes": 268435456,
+                "temp_store": "MEMORY",
+                "wal_autocheckpoint_pages": 1000,
+                "busy_timeout_ms": 5000,
+            },
+        },
+    }
+    PROFILE_SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+    PROFILE_TEMP_STORE = ("DEFAULT", "FILE", "MEMORY")
+    RANKING_MODES = ("lexical", "bm25", "dense", "hybrid")
+    DENSE_MODES = ("dense", "hybrid")
+    RANKING_DEFAULTS: Dict[str, Any] = {
+        "default_mode": "lexical",
+        "bm25_k1": 1.2,
+        "bm25_b": 0.75,
+        "bm25_weight": 1.0,
+        "evidence_weight": 0.5,
+        "recency_weight": 0.25,
+        "recency_half_life_days": 30.0,
+        "hybrid_rrf_k": 60,
+        "hybrid_candidates": 50,
+        "dense_enabled": False,
+    }
+
+    def __init__(
+        self,
+        policy_path: Path,
+        db_path: Path,
+        use_fts: bool = True,
+        read_only: bool = False,
+        auto_migrate: bool = True,
+        query_cache_size: int = 0,
+        performance_profile: str | None = None,
+        instrumentation: Instrumentation | None = None,
+        dense_enabled: bool | None = None,
+    ) -> None:
+        self._init_policy(policy_path)
+        if instrumentation is not None:
+            self.instrumentation = instrumentation
+        performance = {**self.PERFORMANCE_DEFAULTS, **self.policy.get("performance", {})}
+        self.performance_profiles: Dict[str, Dict[str, Any]] = performance["profiles"]
+        self.default_performance_profile = str(performance["default_profile"])
+        self.performance_profile = self._resolve_profile(performance_profile or self.default_performance_profile)
+        # Cached results are revalidated against generation.<class> in backend_meta, which every
+        # writer bumps in the same transaction as its change, so other processes invalidate them too.
+        self.query_cache = _QueryCache(query_cache_size) if query_cache_size > 0 else None
+        self.use_fts = use_fts
+        self.db_path = db_path
+        self.read_only = read_only
+        self.fts_enabled = False
+        self.bulk_insert_enabled = False
+        self.ranking = {**self.RANKING_DEFAULTS, **self.policy.get("ranking", {})}
+        if self.ranking["default_mode"] not in self.RANKING_MODES:
+            raise ValueError(f"memory policy is invalid: ranking.default_mode must be one of {self.RANKING_MODES}")
+        # Embeddings cost a Python pass per written row, so only stores that use dense ranking pay it.
+        self.dense_enabled = bool(self.ranking["dense_enabled"] if dense_enabled is None else dense_enabled)
+        if self.ranking["default_mode"] in self.DENSE_MODES and not self.dense_enabled:
+            raise ValueError("memory policy is invalid: dense and hybrid default_mode require ranking.dense_enabled")
+        self.retention = {**self.RETENTION_DEFAULTS, **self.policy.get("retention", {})}
+
+        if read_only:
+            # Readers attach to a store a writer already initialized; they never run DDL.
+            self.conn = sqlite3.connect(
+                f"{self.db_path.resolve().as_uri()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+            )
+            self.conn.row_factory = sqlite3.Row
+            self._configure_sqlite()
+            self.conn.execute("PRAGMA query_only=ON")
+            self._refresh_capabilities()
+            return
 
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path))
+        # The daemon serializes access behind a lock, so the connection may move between threads.
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
         self._configure_sqlite()
         self._initialize_schema()
+        if auto_migrate and self.pending_migrations():
+            self.migrate()
+        if self.dense_enabled and not self.pending_migrations():
+            self._backfill_embeddings()
+        self._refresh_capabilities()
 
     def close(self) -> None:
         try:
@@ -54,35 +322,55 @@ class MemoryBackendAdapterV2:
         except Exception:
             pass
 
-    @staticmethod
-    def _load_json(path: Path) -> Dict[str, Any]:
-        with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
-
-    @staticmethod
-    def _sha256(text: str) -> str:
-        return hashlib.sha256(text.encode("utf-8")).hexdigest()
-
-    @staticmethod
-    def _safe_date(value: Any) -> date | None:
-        if not isinstance(value, str):
-            return None
-        try:
-            return date.fromisoformat(value[:10])
-        except ValueError:
-            return None
-
-    @staticmethod
-    def _now_utc() -> datetime:
-        return datetime.now(timezone.utc)
+    def _resolve_profile(self, name: str) -> str:
+        profile = self.performance_profiles.get(name)
+        if profile is None:
+            allowed = ", ".join(sorted(self.performance_profiles))
+            raise ValueError(f"unknown performance profile '{name}', allowed: {allowed}")
+        if str(profile.get("synchronous", "NORMAL")).upper() not in self.PROFILE_SYNCHRONOUS:
+            raise ValueError(f"performance profile '{name}': synchronous must be one of {self.PROFILE_SYNCHRONOUS}")
+        if str(profile.get("temp_store", "DEFAULT")).upper() not in self.PROFILE_TEMP_STORE:
+            raise ValueError(f"performance profile '{name}': temp_store must be one of {self.PROFILE_TEMP_STORE}")
+        return name
 
     def _configure_sqlite(self) -> None:
-        self.conn.execute("PRAGMA journal_mode=WAL")
-        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if not self.read_only:
+            # Must precede journal_mode=WAL, which writes the header. Existing stores without it keep
+            # auto_vacuum=NONE until `maintain(full_vacuum=True)` rebuilds them.
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self.conn.execute("PRAGMA journal_mode=WAL")
         self.conn.execute("PRAGMA foreign_keys=ON")
-        self.conn.execute("PRAGMA busy_timeout=5000")
+        self._apply_performance_profile()
+
+    def _apply_performance_profile(self) -> None:
+        profile = self.performance_profiles[self.performance_profile]
+        # PRAGMAs take no bound parameters; values are checked by _resolve_profile and the policy schema.
+        self.conn.execute(f"PRAGMA synchronous={str(profile.get('synchronous', 'NORMAL')).upper()}")
+        self.conn.execute(f"PRAGMA busy_timeout={int(profile.get('busy_timeout_ms', 5000))}")
+        if "cache_size_kib" in profile:
+            # A negative cache_size is in KiB, independent of page_size.
+            self.conn.execute(f"PRAGMA cache_size={-int(profile['cache_size_kib'])}")
+        if "mmap_size_bytes" in profile:
+            self.conn.execute(f"PRAGMA mmap_size={int(profile['mmap_size_bytes'])}")
+        if "temp_store" in profile:
+            self.conn.execute(f"PRAGMA temp_store={str(profile['temp_store']).upper()}")
+        if not self.read_only and "wal_autocheckpoint_pages" in profile:
+            self.conn.execute(f"PRAGMA wal_autocheckpoint={int(profile['wal_autocheckpoint_pages'])}")
+
+    def set_performance_profile(self, name: str) -> None:
+        """Switch this connection to another policy profile, e.g. back from `bulk_load` after a migration."""
+        self.performance_profile = self._resolve_profile(name)
+        self._apply_performance_profile()
+        if not self.read_only:
+            # Checkpoint so pages written under a relaxed-sync profile reach the database file with
+            # the new profile's durability.
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
 
     def _initialize_schema(self) -> None:
+        """Create the 2.0.0 base schema; everything newer is applied by `migrate`."""
+        if self._table_exists("backend_meta") and self._get_meta("schema_version") is not None:
+            # Existing stores keep whatever later migrations did to the base schema (e.g. dropped indexes).
+            return
         with self._tx():
             self.conn.execute(
                 """
@@ -121,7 +409,505 @@ class MemoryBackendAdapterV2:
                 )
                 """
             )
-            self._upsert_meta("schema_version", self.SCHEMA_VERSION)
+            if self._get_meta("schema_version") is None:
+                self._upsert_meta("schema_version", self.BASE_SCHEMA_VERSION)
+
+    def _refresh_capabilities(self) -> None:
+        self.fts_enabled = self.use_fts and self._table_exists("memory_records_fts")
+        self.bulk_insert_enabled = self._index_exists("uq_memory_records_live_hash")
+
+    def _table_exists(self, name: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (name,),
+        ).fetchone()
+        return row is not None
+
+    def _index_exists(self, name: str) -> bool:
+        row = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+            (name,),
+        ).fetchone()
+        return row is not None
+
+    def _get_meta(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM backend_meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else str(row["value"])
+
+    def _delete_meta(self, key: str) -> None:
+        self.conn.execute("DELETE FROM backend_meta WHERE key = ?", (key,))
+
+    @staticmethod
+    def _version_tuple(version: str) -> tuple[int, ...]:
+        return tuple(int(part) for part in version.split("."))
+
+    # ------------------------------------------------------------------
+    # Migrations. Each step has a quick transactional `apply` (DDL, triggers) that returns whether
+    # its optional `backfill(lo_rowid, hi_rowid)` must run. Backfills walk rowid windows up to the
+    # max rowid seen at apply time; rows written later are covered by the new columns/triggers.
+    # ------------------------------------------------------------------
+
+    def _migration_steps(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "version": "2.1.0",
+                "description": "content_words column for BM25 document length",
+                "apply": self._migrate_content_words_apply,
+                "backfill": self._migrate_content_words_backfill,
+            },
+            {
+                "version": "2.2.0",
+                "description": "partial unique index on live (memory_class, canonical_hash)",
+                "apply": self._migrate_unique_hash_apply,
+                "backfill": None,
+            },
+            {
+                "version": "2.3.0",
+                "description": "FTS5 trigram index over content with sync triggers",
+                "apply": self._migrate_fts_apply,
+                "backfill": self._migrate_fts_backfill,
+            },
+            {
+                "version": "2.4.0",
+                "description": "memory_record_tags table for indexed required_tags filtering",
+                "apply": self._migrate_tags_apply,
+                "backfill": self._migrate_tags_backfill,
+            },
+            {
+                "version": "2.5.0",
+                "description": "integer created/expires epoch columns with partial live-row indexes",
+                "apply": self._migrate_epochs_apply,
+                "backfill": self._migrate_epochs_backfill,
+            },
+            {
+                "version": "2.6.0",
+                "description": "partial index on purgeable tombstones (no compliance hold)",
+                "apply": self._migrate_purgeable_apply,
+                "backfill": None,
+            },
+            {
+                "version": "2.7.0",
+                "description": "hashed float16 content embeddings table for dense and hybrid ranking",
+                "apply": self._migrate_embeddings_apply,
+                "backfill": None,
+            },
+            {
+                "version": "2.8.0",
+                "description": "drop per-row embedding triggers; writers embed in batch when dense is enabled",
+                "apply": self._migrate_embedding_triggers_apply,
+                "backfill": None,
+            },
+        ]
+
+    def schema_version(self) -> str:
+        return self._get_meta("schema_version") or self.BASE_SCHEMA_VERSION
+
+    def pending_migrations(self) -> List[Dict[str, Any]]:
+        current = self._version_tuple(self.schema_version())
+        return [step for step in self._migration_steps() if self._version_tuple(step["version"]) > current]
+
+    @instrumented("migrate")
+    def migrate(self, dry_run: bool = False, batch_size: int | None = None) -> Dict[str, Any]:
+        """Apply pending steps in order; `dry_run` only reports the estimated rows each would touch."""
+        batch = max(1, int(batch_size or self.MIGRATION_BATCH_ROWS))
+        from_version = self.schema_version()
+        steps_report: List[Dict[str, Any]] = []
+
+        for step in self.pending_migrations():
+            version = step["version"]
+            cursor_key = f"migration.{version}.cursor"
+            target_key = f"migration.{version}.target_rowid"
+            resume_from = int(self._get_meta(cursor_key) or 0)
+
+            if dry_run:
+                estimated = self._count_rows_after(resume_from) if step["backfill"] else self._count_rows_after(0)
+                steps_report.append(
+                    {
+                        "version": version,
+                        "description": step["description"],
+                        "estimated_rows": estimated,
+                        "resumes_from_rowid": resume_from,
+                    }
+                )
+                continue
+
+            with self._tx():
+                needs_backfill = step["apply"]()
+                target = self._get_meta(target_key)
+                if target is None:
+                    target = str(self._max_rowid())
+                    self._upsert_meta(target_key, target)
+
+            rows_touched = 0
+            if needs_backfill and step["backfill"] is not None:
+                rows_touched = self._run_backfill(step["backfill"], cursor_key, resume_from, int(target), batch)
+
+            with self._tx():
+                self._upsert_meta("schema_version", version)
+                self._delete_meta(cursor_key)
+                self._delete_meta(target_key)
+            LOG.info("memory schema migrated to %s (%s rows)", version, rows_touched)
+            steps_report.append(
+                {
+                    "version": version,
+                    "description": step["description"],
+                    "rows_touched": rows_touched,
+                }
+            )
+
+        return {
+            "dry_run": dry_run,
+            "from_version": from_version,
+            "to_version": from_version if dry_run else self.schema_version(),
+            "target_version": self.SCHEMA_VERSION,
+            "steps": steps_report,
+        }
+
+    def _max_rowid(self) -> int:
+        row = self.conn.execute("SELECT max(rowid) FROM memory_records").fetchone()
+        return int(row[0] or 0)
+
+    def _count_rows_after(self, rowid: int) -> int:
+        row = self.conn.execute("SELECT count(*) FROM memory_records WHERE rowid > ?", (rowid,)).fetchone()
+        return int(row[0] or 0)
+
+    def _run_backfill(
+        self,
+        backfill: Callable[[int, int], int],
+        cursor_key: str,
+        start_rowid: int,
+        target_rowid: int,
+        batch: int,
+    ) -> int:
+        rows_touched = 0
+        cursor = start_rowid
+        while cursor < target_rowid:
+            row = self.conn.execute(
+                """
+                SELECT max(rowid) FROM (
+                    SELECT rowid FROM memory_records
+                    WHERE rowid > ? AND rowid <= ?
+                    ORDER BY rowid
+                    LIMIT ?
+                )
+                """,
+                (cursor, target_rowid, batch),
+            ).fetchone()
+            if row[0] is None:
+                break
+            window_end = int(row[0])
+            with self._tx():
+                rows_touched += backfill(cursor, window_end)
+                self._upsert_meta(cursor_key, str(window_end))
+            cursor = window_end
+        return rows_touched
+
+    def _migrate_content_words_apply(self) -> bool:
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(memory_records)")}
+        if "content_words" not in columns:
+            self.conn.execute(
+                "ALTER TABLE memory_records ADD COLUMN content_words INTEGER NOT NULL DEFAULT 0"
+            )
+        return True
+
+    def _migrate_content_words_backfill(self, lo_rowid: int, hi_rowid: int) -> int:
+        rows = self.conn.execute(
+            "SELECT rowid, content FROM memory_records WHERE rowid > ? AND rowid <= ? AND content_words = 0",
+            (lo_rowid, hi_rowid),
+        ).fetchall()
+        self.conn.executemany(
+            "UPDATE memory_records SET content_words = ? WHERE rowid = ?",
+            [(len(str(row["content"]).split()), row["rowid"]) for row in rows],
+        )
+        return len(rows)
+
+    def _migrate_unique_hash_apply(self) -> bool:
+        """Enforce live-row dedup in SQLite so bulk append can rely on INSERT OR IGNORE."""
+        self.conn.execute("SAVEPOINT unique_hash")
+        try:
+            self.conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_memory_records_live_hash "
+                "ON memory_records(memory_class, canonical_hash) WHERE tombstone = 0"
+            )
+        except sqlite3.IntegrityError:
+            self.conn.execute("ROLLBACK TO unique_hash")
+            LOG.warning("duplicate live canonical hashes found; append keeps per-record dedup")
+            return False
+        finally:
+            self.conn.execute("RELEASE unique_hash")
+        return True
+
+    def _migrate_fts_apply(self) -> bool:
+        """Create the FTS5 index and sync triggers; skip when FTS5/trigram is unavailable."""
+        if self._table_exists("memory_records_fts"):
+            # An interrupted run left its target behind: resume the backfill from the cursor.
+            return self._get_meta("migration.2.3.0.target_rowid") is not None
+        self.conn.execute("SAVEPOINT fts")
+        try:
+            self.conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS memory_records_fts USING fts5(
+                    content,
+                    content='memory_records',
+                    content_rowid='rowid',
+                    tokenize='trigram'
+                )
+                """
+            )
+        except sqlite3.OperationalError:
+            self.conn.execute("ROLLBACK TO fts")
+            self.conn.execute("RELEASE fts")
+            LOG.warning("sqlite build lacks FTS5 trigram support; using substring scorer")
+            return False
+        self.conn.execute("RELEASE fts")
+        self.conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS memory_records_fts_ai
+            AFTER INSERT ON memory_records BEGIN
+                INSERT INTO memory_records_fts(rowid, content) VALUES (new.rowid, new.content);
+            END
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS memory_records_fts_ad
+            AFTER DELETE ON memory_records BEGIN
+                INSERT INTO memory_records_fts(memory_records_fts, rowid, content)
+                VALUES ('delete', old.rowid, old.content);
+            END
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS memory_records_fts_au
+            AFTER UPDATE OF content ON memory_records BEGIN
+                INSERT INTO memory_records_fts(memory_records_fts, rowid, content)
+                VALUES ('delete', old.rowid, old.content);
+                INSERT INTO memory_records_fts(rowid, content) VALUES (new.rowid, new.content);
+            END
+            """
+        )
+        return True
+
+    def _migrate_fts_backfill(self, lo_rowid: int, hi_rowid: int) -> int:
+        return self.conn.execute(
+            """
+            INSERT INTO memory_records_fts(rowid, content)
+            SELECT rowid, content FROM memory_records WHERE rowid > ? AND rowid <= ?
+            """,
+            (lo_rowid, hi_rowid),
+        ).rowcount
+
+    def _migrate_tags_apply(self) -> bool:
+        """Normalized (record_id, tag) rows kept in sync with tags_json by triggers."""
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS memory_record_tags (
+                record_id TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (record_id, tag)
+            ) WITHOUT ROWID
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_record_tags_tag ON memory_record_tags(tag, record_id)"
+        )
+        self.conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS memory_record_tags_ai
+            AFTER INSERT ON memory_records WHEN json_valid(new.tags_json) BEGIN
+                INSERT OR IGNORE INTO memory_record_tags(record_id, tag)
+                SELECT new.record_id, CAST(value AS TEXT) FROM json_each(new.tags_json);
+            END
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS memory_record_tags_ad
+            AFTER DELETE ON memory_records BEGIN
+                DELETE FROM memory_record_tags WHERE record_id = old.record_id;
+            END
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS memory_record_tags_au
+            AFTER UPDATE OF tags_json ON memory_records BEGIN
+                DELETE FROM memory_record_tags WHERE record_id = old.record_id;
+                INSERT OR IGNORE INTO memory_record_tags(record_id, tag)
+                SELECT new.record_id, CAST(value AS TEXT)
+                FROM json_each(CASE WHEN json_valid(new.tags_json) THEN new.tags_json ELSE '[]' END);
+            END
+            """
+        )
+        return True
+
+    def _migrate_tags_backfill(self, lo_rowid: int, hi_rowid: int) -> int:
+        return self.conn.execute(
+            """
+            INSERT OR IGNORE INTO memory_record_tags(record_id, tag)
+            SELECT r.record_id, CAST(j.value AS TEXT)
+            FROM memory_records r,
+                 json_each(CASE WHEN json_valid(r.tags_json) THEN r.tags_json ELSE '[]' END) j
+            WHERE r.rowid > ? AND r.rowid <= ?
+            """,
+            (lo_rowid, hi_rowid),
+        ).rowcount
+
+    def _migrate_epochs_apply(self) -> bool:
+        """Integer epochs make expiry/age predicates plain range scans on partial live-row indexes."""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(memory_records)")}
+        for column in ("created_epoch", "expires_epoch"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE memory_records ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_records_live_expires "
+            "ON memory_records(memory_class, expires_epoch) WHERE tombstone = 0"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_records_live_created "
+            "ON memory_records(memory_class, created_epoch) WHERE tombstone = 0"
+        )
+        # Inserts compute epochs in Python; this keeps them in sync when the ISO columns are edited.
+        self.conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS memory_records_epochs_au
+            AFTER UPDATE OF created_at, expires_on ON memory_records BEGIN
+                UPDATE memory_records
+                SET created_epoch = {self._epoch_sql("new.created_at")},
+                    expires_epoch = {self._epoch_sql("new.expires_on")}
+                WHERE rowid = new.rowid;
+            END
+            """
+        )
+        # Superseded by idx_memory_records_live_expires; dropping it saves a write per insert.
+        self.conn.execute("DROP INDEX IF EXISTS idx_memory_records_class_live")
+        return True
+
+    def _migrate_purgeable_apply(self) -> bool:
+        """Lets `purge` range-scan old tombstones; held rows are outside the index entirely."""
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_memory_records_purgeable "
+            "ON memory_records(memory_class, tombstoned_on) WHERE tombstone = 1 AND compliance_hold = 0"
+        )
+        return False
+
+    def _migrate_embeddings_apply(self) -> bool:
+        """Embeddings keyed by memory_records.rowid; filled by `_embed_rows` when dense is enabled.
+
+        Only the delete trigger lives in SQL (it needs no Python), so purged rowids never keep a
+        stale vector and plain sqlite3 clients can still write to the store.
+        """
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS memory_record_embeddings (
+                rowid INTEGER PRIMARY KEY,
+                embedding BLOB NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS memory_record_embeddings_ad
+            AFTER DELETE ON memory_records BEGIN
+                DELETE FROM memory_record_embeddings WHERE rowid = old.rowid;
+            END
+            """
+        )
+        self._upsert_meta("embedding_model", EMBEDDING_MODEL)
+        return False
+
+    def _migrate_embedding_triggers_apply(self) -> bool:
+        """Stores migrated by the first 2.7.0 embedded every row in triggers through a Python UDF."""
+        self.conn.execute("DROP TRIGGER IF EXISTS memory_record_embeddings_ai")
+        self.conn.execute("DROP TRIGGER IF EXISTS memory_record_embeddings_au")
+        return False
+
+    def _embed_rows(self, lo_rowid: int, hi_rowid: int) -> int:
+        """Write embeddings for rows in (lo_rowid, hi_rowid] with one executemany."""
+        rows = self.conn.execute(
+            "SELECT rowid, content FROM memory_records WHERE rowid > ? AND rowid <= ?",
+            (lo_rowid, hi_rowid),
+        ).fetchall()
+        if not rows:
+            return 0
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO memory_record_embeddings(rowid, embedding) VALUES (?, ?)",
+            [(int(row["rowid"]), embedding_blob(row["content"])) for row in rows],
+        )
+        return len(rows)
+
+    def _embedded_through(self) -> int:
+        row = self.conn.execute("SELECT max(rowid) FROM memory_record_embeddings").fetchone()
+        return int(row[0] or 0)
+
+    def _embed_new_rows(self) -> int:
+        """Embed rows written after the last embedded one; callers run it inside their write transaction.
+
+        Rows get increasing rowids, so everything above the highest embedded rowid is new. Writers
+        with dense disabled leave such a tail behind, which the next dense writer fills in.
+        """
+        if not self.dense_enabled:
+            return 0
+        return self._embed_rows(self._embedded_through(), self._max_rowid())
+
+    def _backfill_embeddings(self) -> int:
+        """Embed the rows written while dense was disabled, one `MIGRATION_BATCH_ROWS` transaction each."""
+        start = self._embedded_through()
+        target = self._max_rowid()
+        if start >= target:
+            return 0
+        cursor_key = "embeddings.backfill.cursor"
+        rows = self._run_backfill(self._embed_rows, cursor_key, start, target, self.MIGRATION_BATCH_ROWS)
+        with self._tx():
+            self._delete_meta(cursor_key)
+        LOG.info("embedded %s memory records for dense ranking", rows)
+        return rows
+
+    @staticmethod
+    def _epoch_sql(expr: str) -> str:
+        """SQL twin of `_iso_epoch`: full timestamp, else its date part at midnight, else 0."""
+        return (
+            f"coalesce(CAST(strftime('%s', {expr}) AS INTEGER), "
+            f"CAST(strftime('%s', substr({expr}, 1, 10)) AS INTEGER), 0)"
+        )
+
+    def _migrate_epochs_backfill(self, lo_rowid: int, hi_rowid: int) -> int:
+        return self.conn.execute(
+            f"""
+            UPDATE memory_records
+            SET created_epoch = {self._epoch_sql("created_at")},
+                expires_epoch = {self._epoch_sql("expires_on")}
+            WHERE rowid > ? AND rowid <= ?
+            """,
+            (lo_rowid, hi_rowid),
+        ).rowcount
+
+    @staticmethod
+    def _iso_epoch(value: Any) -> int:
+        """UTC epoch seconds for an ISO timestamp or date (midnight); 0 when unparseable."""
+        text = str(value or "")
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(text[:10])
+            except ValueError:
+                return 0
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+
+    @staticmethod
+    def _day_epoch(day: date) -> int:
+        return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+    def _fts_match_expression(self, tokens: List[str]) -> str | None:
+        if not self.fts_enabled or not tokens:
+            return None
+        if any(len(tok) < self.FTS_MIN_TOKEN_CHARS for tok in tokens):
+            return None
+        return " OR ".join('"' + tok.replace('"', '""') + '"' for tok in tokens)
 
     def _upsert_meta(self, key: str, value: str) -> None:
         self.conn.execute(
@@ -135,6 +921,25 @@ class MemoryBackendAdapterV2:
             (key, value, self._now_utc().isoformat().replace("+00:00", "Z")),
         )
 
+    def _bump_generation(self, memory_class: str) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO backend_meta(key, value, updated_at)
+            VALUES(?, '1', ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value=CAST(value AS INTEGER) + 1,
+                updated_at=excluded.updated_at
+            """,
+            (f"generation.{memory_class}", self._now_utc().isoformat().replace("+00:00", "Z")),
+        )
+
+    def _class_generations(self, classes: List[str]) -> tuple[int, ...]:
+        keys = [f"generation.{cls}" for cls in classes]
+        placeholders = ", ".join("?" for _ in keys)
+        rows = self.conn.execute(f"SELECT key, value FROM backend_meta WHERE key IN ({placeholders})", keys)
+        values = {row["key"]: int(row["value"]) for row in rows}
+        return tuple(values.get(key, 0) for key in keys)
+
     @contextmanager
     def _tx(self) -> Iterator[None]:
         try:
@@ -144,62 +949,10 @@ class MemoryBackendAdapterV2:
         except sqlite3.DatabaseError as exc:
             self.conn.rollback()
             raise RuntimeError(f"sqlite transaction failed ({exc})") from exc
-
-    def _validate_memory_class(self, memory_class: str) -> None:
-        if memory_class not in self.memory_classes:
-            allowed = ", ".join(sorted(self.memory_classes.keys()))
-            raise ValueError(f"unknown memory_class '{memory_class}', allowed: {allowed}")
-
-    def _ttl_for_class(self, memory_class: str) -> timedelta:
-        config = self.memory_classes[memory_class]
-        if "ttl_hours" in config:
-            return timedelta(hours=int(config["ttl_hours"]))
-        if "ttl_days" in config:
-            return timedelta(days=int(config["ttl_days"]))
-        return timedelta(days=1)
-
-    def _build_record(
-        self,
-        memory_class: str,
-        raw_record: Dict[str, Any],
-        provenance: Dict[str, Any],
-    ) -> Dict[str, Any]:
-        content = str(raw_record.get("content", "")).strip()
-        if not content:
-            raise ValueError("record.content must be non-empty")
-
-        now = self._now_utc()
-        canonical_content = " ".join(content.lower().split())
-        canonical_hash = self._sha256(canonical_content)
-        source = str(provenance.get("source", "unknown"))
-        entropy = f"{canonical_hash}:{now.isoformat()}:{source}"
-        record_id = self._sha256(entropy)[:24]
-        ttl = self._ttl_for_class(memory_class)
-
-        evidence_score = raw_record.get("evidence_score", 0.5)
-        try:
-            evidence_score = float(evidence_score)
-        except (ValueError, TypeError) as exc:
-            raise ValueError(f"record.evidence_score must be float-compatible ({exc})") from exc
-
-        tags = raw_record.get("tags", [])
-        if tags is None:
-            tags = []
-        if not isinstance(tags, list):
-            raise ValueError("record.tags must be a list when provided")
-
-        return {
-            "record_id": record_id,
-            "memory_class": memory_class,
-            "canonical_hash": canonical_hash,
-            "content": content,
-            "evidence_score": max(0.0, min(1.0, evidence_score)),
-            "tags": [str(tag) for tag in tags],
-            "created_at": now.isoformat().replace("+00:00", "Z"),
-            "expires_on": (now + ttl).date().isoformat(),
-            "provenance": provenance,
-            "tombstone": False,
-        }
+        except BaseException:
+            # Interruptions (KeyboardInterrupt, caller errors) must not leave a half-applied batch open.
+            self.conn.rollback()
+            raise
 
     def _canonical_exists(self, memory_class: str, canonical_hash: str) -> bool:
         row = self.conn.execute(
@@ -215,23 +968,41 @@ class MemoryBackendAdapterV2:
         ).fetchone()
         return row is not None
 
-    def _row_to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
-        tags_raw = row["tags_json"]
-        provenance_raw = row["provenance_json"]
+    @staticmethod
+    def _decode_tags(row: sqlite3.Row) -> List[str]:
         try:
-            tags = json.loads(tags_raw)
+            tags = json.loads(row["tags_json"])
         except (json.JSONDecodeError, TypeError):
             LOG.debug("invalid tags_json for record_id=%s", row["record_id"])
             tags = []
+        if not isinstance(tags, list):
+            tags = []
+        return [str(tag) for tag in tags]
+
+    @staticmethod
+    def _decode_provenance(row: sqlite3.Row) -> Dict[str, Any]:
         try:
-            provenance = json.loads(provenance_raw)
+            provenance = json.loads(row["provenance_json"])
         except (json.JSONDecodeError, TypeError):
             LOG.debug("invalid provenance_json for record_id=%s", row["record_id"])
             provenance = {}
-        if not isinstance(tags, list):
-            tags = []
         if not isinstance(provenance, dict):
             provenance = {}
+        return provenance
+
+    def _load_provenance(self, record_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not record_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in record_ids)
+        rows = self.conn.execute(
+            f"SELECT record_id, provenance_json FROM memory_records WHERE record_id IN ({placeholders})",
+            record_ids,
+        )
+        return {row["record_id"]: self._decode_provenance(row) for row in rows}
+
+    def _row_to_record(self, row: sqlite3.Row) -> Dict[str, Any]:
+        tags = self._decode_tags(row)
+        provenance = self._decode_provenance(row)
 
         return {
             "record_id": row["record_id"],
@@ -239,7 +1010,7 @@ class MemoryBackendAdapterV2:
             "canonical_hash": row["canonical_hash"],
             "content": row["content"],
             "evidence_score": float(row["evidence_score"]),
-            "tags": [str(tag) for tag in tags],
+            "tags": tags,
             "created_at": row["created_at"],
             "expires_on": row["expires_on"],
             "provenance": provenance,
@@ -258,6 +1029,7 @@ class MemoryBackendAdapterV2:
         ).fetchall()
         return [self._row_to_record(row) for row in rows]
 
+    @instrumented("append")
     def append(
         self,
         memory_class: str,
@@ -265,56 +1037,404 @@ class MemoryBackendAdapterV2:
         provenance: Dict[str, Any] | None,
     ) -> Dict[str, Any]:
         self._validate_memory_class(memory_class)
-        provenance = provenance or {}
-        if self.requires_provenance and not provenance:
-            raise ValueError("provenance is required by memory policy")
+        provenance = self._validate_provenance(provenance)
+        metrics = self.instrumentation
+
+        with metrics.span("build"):
+            built_records = self._build_records(memory_class, records, provenance)
+
+        with metrics.span("write"), self._tx():
+            if self.bulk_insert_enabled:
+                accepted = self._insert_records_bulk(built_records)
+            else:
+                accepted = self._insert_records_per_record(built_records)
+            if accepted:
+                self._bump_generation(memory_class)
+        metrics.count("rows_in", len(built_records))
+        metrics.count("rows_accepted", len(accepted))
 
-        accepted: List[str] = []
+        return {
+            "accepted_count": len(accepted),
+            "record_ids": accepted,
+        }
 
-        with self._tx():
-            for raw in records:
-                if not isinstance(raw, dict):
-                    raise ValueError("append records must be objects")
+    @classmethod
+    def _insert_rows(cls, built_records: List[Dict[str, Any]]) -> List[tuple[Any, ...]]:
+        """INSERT parameters for a batch; epochs are parsed once per distinct timestamp.
+
+        Records built by one `_build_records` call share a single provenance object, so it is
+        serialized again only when a record's provenance is not the previous record's object.
+        """
+        provenance: Any = object()
+        provenance_json = ""
+        epochs: Dict[str, int] = {}
+        rows: List[tuple[Any, ...]] = []
+        for built in built_records:
+            if built["provenance"] is not provenance:
+                provenance = built["provenance"]
+                provenance_json = json.dumps(provenance, ensure_ascii=True)
+            created_at = built["created_at"]
+            expires_on = built["expires_on"]
+            if created_at not in epochs:
+                epochs[created_at] = cls._iso_epoch(created_at)
+            if expires_on not in epochs:
+                epochs[expires_on] = cls._iso_epoch(expires_on)
+            tags = built["tags"]
+            content = built["content"]
+            rows.append(
+                (
+                    built["record_id"],
+                    built["memory_class"],
+                    built["canonical_hash"],
+                    content,
+                    built["evidence_score"],
+                    json.dumps(tags, ensure_ascii=True) if tags else "[]",
+                    created_at,
+                    expires_on,
+                    provenance_json,
+                    0,
+                    0,
+                    len(content.split()),
+                    epochs[created_at],
+                    epochs[expires_on],
+                )
+            )
+        return rows
 
-                built = self._build_record(memory_class, raw, provenance)
-                if self._canonical_exists(memory_class, built["canonical_hash"]):
-                    continue
+    def _insert_records_per_record(self, built_records: List[Dict[str, Any]]) -> List[str]:
+        columns = ", ".join(self.INSERT_COLUMNS)
+        placeholders = ", ".join("?" for _ in self.INSERT_COLUMNS)
+        accepted: List[str] = []
+        for built, params in zip(built_records, self._insert_rows(built_records)):
+            if self._canonical_exists(built["memory_class"], built["canonical_hash"]):
+                continue
+            self.conn.execute(f"INSERT INTO memory_records({columns}) VALUES ({placeholders})", params)
+            accepted.append(built["record_id"])
+        self._embed_new_rows()
+        return accepted
+
+    def _insert_records_bulk(self, built_records: List[Dict[str, Any]]) -> List[str]:
+        """Chunked INSERT OR IGNORE; the partial unique index drops live duplicates."""
+        columns = ", ".join(self.INSERT_COLUMNS)
+        row_placeholders = "(" + ", ".join("?" for _ in self.INSERT_COLUMNS) + ")"
+        inserted: set[str] = set()
+        param_rows = self._insert_rows(built_records)
+
+        for start in range(0, len(built_records), self.APPEND_CHUNK_ROWS):
+            chunk = built_records[start : start + self.APPEND_CHUNK_ROWS]
+            chunk_rows = param_rows[start : start + self.APPEND_CHUNK_ROWS]
+            if sqlite3.sqlite_version_info >= (3, 35, 0):
+                values = ", ".join(row_placeholders for _ in chunk)
+                params = [value for row in chunk_rows for value in row]
+                rows = self.conn.execute(
+                    f"INSERT OR IGNORE INTO memory_records({columns}) VALUES {values} RETURNING record_id",
+                    params,
+                ).fetchall()
+                inserted.update(str(row[0]) for row in rows)
+                continue
 
-                self.conn.execute(
-                    """
-                    INSERT INTO memory_records(
-                        record_id,
-                        memory_class,
-                        canonical_hash,
-                        content,
-                        evidence_score,
-                        tags_json,
-                        created_at,
-                        expires_on,
-                        provenance_json,
-                        tombstone,
-                        compliance_hold
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0)
-                    """,
-                    (
-                        built["record_id"],
-                        built["memory_class"],
-                        built["canonical_hash"],
-                        built["content"],
-                        built["evidence_score"],
-                        json.dumps(built["tags"], ensure_ascii=True),
-                        built["created_at"],
-                        built["expires_on"],
-                        json.dumps(built["provenance"], ensure_ascii=True),
-                    ),
-                )
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO memory_records({columns}) VALUES {row_placeholders}",
+                chunk_rows,
+            )
+            if self.conn.total_changes == before:
+                continue
+            chunk_ids = [built["record_id"] for built in chunk]
+            id_placeholders = ", ".join("?" for _ in chunk_ids)
+            rows = self.conn.execute(
+                f"SELECT record_id FROM memory_records WHERE record_id IN ({id_placeholders})",
+                chunk_ids,
+            ).fetchall()
+            inserted.update(str(row[0]) for row in rows)
+
+        # RETURNING order is unspecified; report IDs in request order, once each.
+        accepted: List[str] = []
+        for built in built_records:
+            if built["record_id"] in inserted:
+                inserted.discard(built["record_id"])
                 accepted.append(built["record_id"])
+        self._embed_new_rows()
+        return accepted
+
+    def _resolve_ranking(self, filter_obj: Dict[str, Any]) -> str:
+        ranking = str(filter_obj.get("ranking", self.ranking["default_mode"])).strip().lower()
+        if ranking not in self.RANKING_MODES:
+            raise ValueError(f"filters.ranking must be one of: {', '.join(self.RANKING_MODES)}")
+        if ranking in self.DENSE_MODES and not self.dense_enabled:
+            raise ValueError(f"{ranking} ranking requires ranking.dense_enabled in the memory policy")
+        return ranking
+
+    def _bm25_corpus_stats(
+        self,
+        where_sql: str,
+        params: List[Any],
+        tokens: List[str],
+        match_expr: str | None = None,
+    ) -> Dict[str, Any]:
+        """Collect N, average document length and per-token document frequency over the filtered rows.
 
+        With `match_expr` the document frequencies are counted over the FTS candidates only; a row
+        matching no token adds nothing to any of them, so the counts equal those of a full scan.
+        """
+        df_columns = ", ".join(
+            "sum(CASE WHEN instr(lower(r.content), ?) > 0 THEN 1 ELSE 0 END)" for _ in tokens
+        )
+        if match_expr is None:
+            row = self.conn.execute(
+                f"SELECT count(*), avg(r.content_words), {df_columns} FROM memory_records r WHERE {where_sql}",
+                [*tokens, *params],
+            ).fetchone()
+            doc_freq = row[2:]
+        else:
+            row = self.conn.execute(
+                f"SELECT count(*), avg(r.content_words) FROM memory_records r WHERE {where_sql}",
+                params,
+            ).fetchone()
+            doc_freq = self.conn.execute(
+                f"""
+                SELECT {df_columns}
+                FROM memory_records_fts f
+                CROSS JOIN memory_records r ON r.rowid = f.rowid
+                WHERE memory_records_fts MATCH ? AND {where_sql}
+                """,
+                [*tokens, match_expr, *params],
+            ).fetchone()
         return {
-            "accepted_count": len(accepted),
-            "record_ids": accepted,
+            "doc_count": int(row[0] or 0),
+            "avg_words": float(row[1] or 0.0),
+            "doc_freq": [int(value or 0) for value in doc_freq],
+        }
+
+    def _bm25_python(
+        self,
+        content_lower: str,
+        doc_words: int,
+        tokens: List[str],
+        stats: Dict[str, Any],
+    ) -> float:
+        """Okapi BM25 of one row against `_bm25_corpus_stats`; the only BM25 formula, whichever fetch path ran.
+
+        idf is `log((N - df + 0.5) / (df + 0.5) + 1)`, so a token present in every row still scores
+        slightly above zero instead of being cancelled out.
+        """
+        k1 = float(self.ranking["bm25_k1"])
+        b = float(self.ranking["bm25_b"])
+        avg_words = stats["avg_words"] or 1.0
+        norm = k1 * (1.0 - b + b * (doc_words / avg_words))
+        score = 0.0
+        for tok, doc_freq in zip(tokens, stats["doc_freq"]):
+            tf = content_lower.count(tok)
+            if tf <= 0:
+                continue
+            idf = math.log((stats["doc_count"] - doc_freq + 0.5) / (doc_freq + 0.5) + 1.0)
+            score += idf * (tf * (k1 + 1.0)) / (tf + norm)
+        return score
+
+    def _recency_factor(self, created_at: Any, now: datetime) -> float:
+        half_life = float(self.ranking["recency_half_life_days"])
+        try:
+            created = datetime.fromisoformat(str(created_at).replace("Z", "+00:00"))
+        except ValueError:
+            return 0.0
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        age_days = max(0.0, (now - created).total_seconds() / 86400.0)
+        if half_life <= 0:
+            return 0.0
+        return 0.5 ** (age_days / half_life)
+
+    def _blended_score(self, bm25: float, evidence: float, created_at: Any, now: datetime) -> float:
+        # bm25 / (1 + bm25) keeps relevance in [0, 1) so policy weights stay comparable across queries.
+        relevance = bm25 / (1.0 + bm25) if bm25 > 0 else 0.0
+        return (
+            float(self.ranking["bm25_weight"]) * relevance
+            + float(self.ranking["evidence_weight"]) * evidence
+            + float(self.ranking["recency_weight"]) * self._recency_factor(created_at, now)
+        )
+
+    _RANK_COLUMNS = "r.record_id, r.memory_class, r.content, r.evidence_score, r.created_at, r.content_words"
+
+    def _rank_lexical(
+        self,
+        tokens: List[str],
+        ranking: str,
+        where_sql: str,
+        params: List[Any],
+        top: int,
+        now: datetime,
+    ) -> List[tuple[float, sqlite3.Row]]:
+        """Best `top` substring hits as (score, row), scored by token hits or blended BM25.
+
+        FTS5 only narrows the candidates: BM25 is always computed by `_bm25_python` from the same
+        corpus statistics, so scores do not depend on whether the FTS index is usable.
+        """
+        metrics = self.instrumentation
+        columns = self._RANK_COLUMNS
+        bm25_stats: Dict[str, Any] | None = None
+        match_expr = self._fts_match_expression(tokens)
+        with metrics.span("fetch"):
+            if ranking == "bm25":
+                bm25_stats = self._bm25_corpus_stats(where_sql, params, tokens, match_expr)
+            if match_expr is not None:
+                # CROSS JOIN pins the FTS scan as the outer loop; otherwise SQLite may re-run MATCH per row.
+                cursor = self.conn.execute(
+                    f"""
+                    SELECT {columns}
+                    FROM memory_records_fts f
+                    CROSS JOIN memory_records r ON r.rowid = f.rowid
+                    WHERE memory_records_fts MATCH ? AND {where_sql}
+                    """,
+                    [match_expr, *params],
+                )
+            else:
+                cursor = self.conn.execute(f"SELECT {columns} FROM memory_records r WHERE {where_sql}", params)
+
+        # Min-heap of (score, -seq, row): the root is the weakest kept hit, and ties keep cursor order.
+        heap: List[tuple[float, int, sqlite3.Row]] = []
+        seq = 0
+        while True:
+            with metrics.span("fetch"):
+                batch = cursor.fetchmany(self.QUERY_FETCH_ROWS)
+            if not batch:
+                break
+            metrics.count("rows_scanned", len(batch))
+            with metrics.span("score"):
+                for row in batch:
+                    seq += 1
+                    content = str(row["content"]).lower()
+                    token_hits = sum(content.count(tok) for tok in tokens)
+                    if token_hits <= 0:
+                        continue
+
+                    evidence = float(row["evidence_score"])
+                    if bm25_stats is not None:
+                        bm25 = self._bm25_python(content, int(row["content_words"]), tokens, bm25_stats)
+                        score = self._blended_score(bm25, evidence, row["created_at"], now)
+                    else:
+                        score = float(token_hits) + evidence
+
+                    entry = (round(score, 4), -seq, row)
+                    if len(heap) < top:
+                        heapq.heappush(heap, entry)
+                    elif entry[:2] > heap[0][:2]:
+                        heapq.heapreplace(heap, entry)
+
+        with metrics.span("sort"):
+            winners = sorted(heap, key=lambda item: (item[0], item[1]), reverse=True)
+        return [(score, row) for score, _, row in winners]
+
+    def _rank_dense(
+        self,
+        text: str,
+        where_sql: str,
+        params: List[Any],
+        top: int,
+    ) -> List[tuple[float, sqlite3.Row]]:
+        """Best `top` rows by cosine similarity of hashed embeddings (exact scan, batched).
+
+        Rows with no positive similarity are dropped, like lexical rows with no token hit.
+        """
+        if not self._table_exists("memory_record_embeddings"):
+            raise ValueError("dense ranking requires schema 2.7.0; run `migrate`")
+        metrics = self.instrumentation
+        query_vector = hashed_embedding(text)
+        if not query_vector:
+            return []
+        query_items = sorted(query_vector.items())
+        np = _numpy()
+        if np is not None:
+            # Only the query's non-zero slots matter: gathering those columns before widening
+            # float16 -> float32 is several times cheaper than converting whole rows.
+            query_slots = np.array([slot for slot, _ in query_items], dtype=np.intp)
+            query_weights = np.array([value for _, value in query_items], dtype=np.float32)
+
+        with metrics.span("fetch"):
+            cursor = self.conn.execute(
+                f"""
+                SELECT r.rowid, e.embedding
+                FROM memory_records r
+                JOIN memory_record_embeddings e ON e.rowid = r.rowid
+                WHERE {where_sql}
+                """,
+                params,
+            )
+        # Same min-heap shape as the lexical path, holding rowids; row order breaks score ties.
+        heap: List[tuple[float, int, int]] = []
+        seq = 0
+        while True:
+            with metrics.span("fetch"):
+                batch = cursor.fetchmany(self.DENSE_SCAN_ROWS)
+            if not batch:
+                break
+            metrics.count("rows_scanned", len(batch))
+            with metrics.span("score"):
+                if np is not None:
+                    matrix = np.frombuffer(b"".join(row[1] for row in batch), dtype="<f2")
+                    matrix = matrix.reshape(len(batch), EMBEDDING_DIM)
+                    scores = matrix[:, query_slots].astype(np.float32) @ query_weights
+                    keep = range(len(batch))
+                    if len(batch) > top:
+                        keep = np.argpartition(-scores, top - 1)[:top].tolist()
+                    candidates = [(float(scores[i]), i) for i in keep]
+                else:
+                    candidates = []
+                    for i, row in enumerate(batch):
+                        values = _EMBEDDING_BLOB.unpack(row[1])
+                        candidates.append((sum(values[slot] * weight for slot, weight in query_items), i))
+                for score, i in candidates:
+                    if score <= 0.0:
+                        continue
+                    entry = (round(score, 4), -(seq + i), int(batch[i][0]))
+                    if len(heap) < top:
+                        heapq.heappush(heap, entry)
+                    elif entry[:2] > heap[0][:2]:
+                        heapq.heapreplace(heap, entry)
+            seq += len(batch)
+
+        with metrics.span("sort"):
+            winners = sorted(heap, key=lambda item: (item[0], item[1]), reverse=True)
+        if not winners:
+            return []
+        rowids = [rowid for _, _, rowid in winners]
+        placeholders = ", ".join("?" for _ in rowids)
+        rows = {
+            int(row["rowid"]): row
+            for row in self.conn.execute(
+                f"SELECT r.rowid, {self._RANK_COLUMNS} FROM memory_records r WHERE r.rowid IN ({placeholders})",
+                rowids,
+            )
         }
+        return [(score, rows[rowid]) for score, _, rowid in winners]
 
+    def _rank_hybrid(
+        self,
+        text: str,
+        tokens: List[str],
+        where_sql: str,
+        params: List[Any],
+        top: int,
+        now: datetime,
+    ) -> List[tuple[float, sqlite3.Row]]:
+        """Reciprocal rank fusion of the BM25 and dense candidate lists.
+
+        RRF only uses ranks, so the two scales never need calibrating against each other; records
+        found by just one list still compete, which is what recovers paraphrased matches.
+        """
+        pool = max(top, int(self.ranking["hybrid_candidates"]))
+        rrf_k = float(self.ranking["hybrid_rrf_k"])
+        fused: Dict[str, List[Any]] = {}
+        for ranked in (
+            self._rank_lexical(tokens, "bm25", where_sql, params, pool, now),
+            self._rank_dense(text, where_sql, params, pool),
+        ):
+            for rank, (_, row) in enumerate(ranked, start=1):
+                entry = fused.setdefault(row["record_id"], [0.0, row])
+                entry[0] += 1.0 / (rrf_k + rank)
+        ordered = sorted(fused.values(), key=lambda item: item[0], reverse=True)[:top]
+        return [(round(score, 6), row) for score, row in ordered]
+
+    @instrumented("query")
     def query(
         self,
         query: str,
@@ -322,6 +1442,7 @@ class MemoryBackendAdapterV2:
         top_k: int,
         filters: Dict[str, Any] | None,
     ) -> Dict[str, Any]:
+        metrics = self.instrumentation
         text = query.strip().lower()
         if not text:
             raise ValueError("query must be non-empty")
@@ -331,86 +1452,132 @@ class MemoryBackendAdapterV2:
             self._validate_memory_class(cls)
 
         filter_obj = filters or {}
+        ranking = self._resolve_ranking(filter_obj)
         min_evidence = float(filter_obj.get("min_evidence_score", 0.0))
         required_tags_raw = filter_obj.get("required_tags", [])
         required_tags = set(str(tag) for tag in required_tags_raw) if isinstance(required_tags_raw, list) else set()
 
         placeholders = ", ".join("?" for _ in classes)
         today = date.today().isoformat()
-
-        rows = self.conn.execute(
-            f"""
-            SELECT *
-            FROM memory_records
-            WHERE tombstone = 0
-              AND memory_class IN ({placeholders})
-              AND expires_on >= ?
-              AND evidence_score >= ?
-            """,
-            [*classes, today, min_evidence],
-        ).fetchall()
-
-        scored: List[Dict[str, Any]] = []
         tokens = text.split()
 
-        for row in rows:
-            rec = self._row_to_record(row)
-            evidence = float(rec["evidence_score"])
+        now = self._now_utc()
 
-            tags = set(rec.get("tags", []))
-            if required_tags and not required_tags.issubset(tags):
-                continue
+        top = max(1, int(top_k))
+        cache_key: tuple[Any, ...] | None = None
+        generations: tuple[int, ...] = ()
+        if self.query_cache is not None:
+            unique_classes = sorted(set(classes))
+            generations = self._class_generations(unique_classes)
+            # The date is part of the key because expiry filtering compares against today.
+            cache_key = (
+                " ".join(tokens),
+                tuple(unique_classes),
+                top,
+                json.dumps(filter_obj, sort_keys=True, default=str),
+                today,
+            )
+            cached = self.query_cache.get(cache_key, generations)
+            metrics.count("cache_hits" if cached is not None else "cache_misses")
+            if cached is not None:
+                metrics.count("rows_returned", len(cached))
+                return {
+                    "results": cached,
+                    "trace_id": self._sha256(f"{now.isoformat()}:{query}")[:16],
+                    "filters": filter_obj,
+                    "cache": self.query_cache.stats(hit=True),
+                }
+        where_sql = (
+            f"r.tombstone = 0 AND r.memory_class IN ({placeholders}) "
+            "AND r.expires_epoch >= ? AND r.evidence_score >= ?"
+        )
+        params: List[Any] = [*classes, self._day_epoch(date.fromisoformat(today)), min_evidence]
+        if required_tags:
+            tag_placeholders = ", ".join("?" for _ in required_tags)
+            where_sql += (
+                " AND r.record_id IN ("
+                f"SELECT record_id FROM memory_record_tags WHERE tag IN ({tag_placeholders}) "
+                "GROUP BY record_id HAVING count(*) = ?)"
+            )
+            params.extend([*sorted(required_tags), len(required_tags)])
 
-            content = str(rec.get("content", "")).lower()
-            token_hits = sum(content.count(tok) for tok in tokens)
-            if token_hits <= 0:
-                continue
+        if ranking == "dense":
+            winners = self._rank_dense(text, where_sql, params, top)
+        elif ranking == "hybrid":
+            winners = self._rank_hybrid(text, tokens, where_sql, params, top, now)
+        else:
+            winners = self._rank_lexical(tokens, ranking, where_sql, params, top, now)
 
-            score = float(token_hits) + evidence
-            scored.append(
+        with metrics.span("decode"):
+            provenance_by_id = self._load_provenance([row["record_id"] for _, row in winners])
+            results = [
                 {
-                    "record_id": rec["record_id"],
-                    "score": round(score, 4),
+                    "record_id": row["record_id"],
+                    "score": score,
                     "evidence": {
-                        "memory_class": rec["memory_class"],
-                        "content": rec["content"],
-                        "provenance": rec.get("provenance", {}),
+                        "memory_class": row["memory_class"],
+                        "content": row["content"],
+                        "provenance": provenance_by_id.get(row["record_id"], {}),
                     },
                 }
-            )
+                for score, row in winners
+            ]
+        metrics.count("rows_returned", len(results))
 
-        scored.sort(key=lambda item: item["score"], reverse=True)
-        top = max(1, int(top_k))
-
-        return {
-            "results": scored[:top],
-            "trace_id": self._sha256(f"{self._now_utc().isoformat()}:{query}")[:16],
+        response: Dict[str, Any] = {
+            "results": results,
+            "trace_id": self._sha256(f"{now.isoformat()}:{query}")[:16],
             "filters": filter_obj,
         }
+        if self.query_cache is not None and cache_key is not None:
+            self.query_cache.put(cache_key, generations, results)
+            response["cache"] = self.query_cache.stats(hit=False)
+        return response
 
-    def compact(self, memory_class: str, before_date: str, max_words: int) -> Dict[str, Any]:
+    @instrumented("compact")
+    def compact(
+        self,
+        memory_class: str,
+        before_date: str,
+        max_words: int,
+        window: str | None = None,
+        window_rows: int | None = None,
+    ) -> Dict[str, Any]:
+        """Summarize live rows created on or before `before_date`.
+
+        Without `window` every eligible row folds into one summary. `window="day"` or `"rows"`
+        delegates to `_compact_windowed`, which bounds memory by one window at a time.
+        """
         self._validate_memory_class(memory_class)
 
         try:
             cutoff = date.fromisoformat(before_date)
         except Exception as exc:
             raise ValueError(f"before_date must be YYYY-MM-DD ({exc})") from exc
+        if window is not None:
+            return self._compact_windowed(memory_class, cutoff, max_words, window, window_rows)
 
-        rows = self.conn.execute(
-            """
-            SELECT *
-            FROM memory_records
-            WHERE memory_class = ?
-              AND tombstone = 0
-              AND substr(created_at, 1, 10) <= ?
-            ORDER BY created_at ASC
-            """,
-            (memory_class, cutoff.isoformat()),
-        ).fetchall()
-
-        eligible = [self._row_to_record(row) for row in rows]
+        # Rows created on or before the cutoff date are those before midnight of the following day.
+        cutoff_epoch = self._day_epoch(cutoff + timedelta(days=1))
+        with self.instrumentation.span("fetch"):
+            rows = self.conn.execute(
+                """
+                SELECT rowid, *
+                FROM memory_records
+                WHERE memory_class = ?
+                  AND tombstone = 0
+                  AND created_epoch < ?
+                ORDER BY created_epoch ASC
+                """,
+                (memory_class, cutoff_epoch),
+            ).fetchall()
+        with self.instrumentation.span("decode"):
+            eligible = [self._row_to_record(row) for row in rows]
+        self.instrumentation.count("rows_scanned", len(rows))
         if not eligible:
             return {"compacted_count": 0, "summary_ids": []}
+        # Rows appended after the eligibility scan (including the summary) must not be linked.
+        max_rowid = max(int(row["rowid"]) for row in rows)
 
         text = "\n".join(str(rec.get("content", "")).strip() for rec in eligible).strip()
         words = text.split()
@@ -432,24 +1599,163 @@ class MemoryBackendAdapterV2:
         summary_ids = append_result["record_ids"]
         summary_id = summary_ids[0] if summary_ids else None
         if summary_id:
-            with self._tx():
-                for rec in eligible:
-                    self.conn.execute(
-                        """
-                        UPDATE memory_records
-                        SET compacted_into = ?
-                        WHERE record_id = ?
-                          AND tombstone = 0
-                        """,
-                        (summary_id, rec["record_id"]),
-                    )
+            with self.instrumentation.span("write"), self._tx():
+                self.conn.execute(
+                    """
+                    UPDATE memory_records
+                    SET compacted_into = ?
+                    WHERE memory_class = ?
+                      AND tombstone = 0
+                      AND created_epoch < ?
+                      AND rowid <= ?
+                      AND record_id != ?
+                    """,
+                    (summary_id, memory_class, cutoff_epoch, max_rowid, summary_id),
+                )
+                self._bump_generation(memory_class)
 
         return {
             "compacted_count": len(eligible),
             "summary_ids": summary_ids,
         }
 
-    def evict(self, memory_class: str, selector: str, reason_code: str) -> Dict[str, Any]:
+    # Keyset over the idx_memory_records_live_created order; rowid breaks created_epoch ties.
+    _KEY_AFTER = "(created_epoch, rowid) > (?, ?)"
+    _KEY_UPTO = "(created_epoch, rowid) <= (?, ?)"
+
+    def _compact_windowed(
+        self,
+        memory_class: str,
+        cutoff: date,
+        max_words: int,
+        window: str,
+        window_rows: int | None,
+    ) -> Dict[str, Any]:
+        """Compact one window (a UTC day or `window_rows` rows) per transaction.
+
+        Each window reads content only until the `max_words` budget is filled, then commits its
+        summary, the compacted_into links and a `compaction.<class>.cursor` checkpoint together,
+        so an interrupted run with the same arguments resumes after the last finished window.
+        """
+        if window not in self.COMPACTION_WINDOWS:
+            raise ValueError(f"window must be one of: {', '.join(self.COMPACTION_WINDOWS)}")
+        rows_per_window = max(1, int(window_rows or self.COMPACTION_WINDOW_ROWS))
+        budget = max(1, int(max_words))
+        cutoff_epoch = self._day_epoch(cutoff + timedelta(days=1))
+        # Summaries inserted by this job land above max_rowid, so they are never compacted again.
+        live = (
+            "memory_class = ? AND tombstone = 0 AND created_epoch < ? AND rowid <= ? AND compacted_into IS NULL"
+        )
+
+        cursor_key = f"compaction.{memory_class}.cursor"
+        job = {"before_date": cutoff.isoformat(), "window": window, "window_rows": rows_per_window}
+        saved = json.loads(self._get_meta(cursor_key) or "null")
+        resumed = saved is not None and saved.get("job") == job and "max_rowid" in saved
+        position = (saved["created_epoch"], saved["rowid"]) if resumed else (-1, -1)
+        max_rowid = int(saved["max_rowid"]) if resumed else self._max_rowid()
+
+        metrics = self.instrumentation
+        compacted_count = 0
+        summary_ids: List[str] = []
+        windows = 0
+        while True:
+            fetch_started = time.perf_counter()
+            if window == "day":
+                first = self.conn.execute(
+                    f"SELECT created_epoch FROM memory_records WHERE {live} AND {self._KEY_AFTER} "
+                    "ORDER BY created_epoch, rowid LIMIT 1",
+                    (memory_class, cutoff_epoch, max_rowid, *position),
+                ).fetchone()
+                if first is None:
+                    break
+                day_end = min(cutoff_epoch, (int(first[0]) // 86400 + 1) * 86400)
+                upper = self.conn.execute(
+                    f"SELECT created_epoch, rowid FROM memory_records WHERE {live} AND {self._KEY_AFTER} "
+                    "ORDER BY created_epoch DESC, rowid DESC LIMIT 1",
+                    (memory_class, day_end, max_rowid, *position),
+                ).fetchone()
+            else:
+                upper = self.conn.execute(
+                    f"SELECT created_epoch, rowid FROM ("
+                    f"SELECT created_epoch, rowid FROM memory_records WHERE {live} AND {self._KEY_AFTER} "
+                    "ORDER BY created_epoch, rowid LIMIT ?"
+                    ") ORDER BY created_epoch DESC, rowid DESC LIMIT 1",
+                    (memory_class, cutoff_epoch, max_rowid, *position, rows_per_window),
+                ).fetchone()
+            if upper is None:
+                break
+            bound = (int(upper[0]), int(upper[1]))
+            window_sql = f"{live} AND {self._KEY_AFTER} AND {self._KEY_UPTO}"
+            window_params = (memory_class, cutoff_epoch, max_rowid, *position, *bound)
+
+            stats = self.conn.execute(
+                f"SELECT count(*), max(evidence_score) FROM memory_records WHERE {window_sql}",
+                window_params,
+            ).fetchone()
+            words: List[str] = []
+            contents = self.conn.execute(
+                f"SELECT content FROM memory_records WHERE {window_sql} ORDER BY created_epoch, rowid",
+                window_params,
+            )
+            for row in contents:
+                words.extend(str(row["content"]).split()[: budget - len(words)])
+                if len(words) >= budget:
+                    break
+            contents.close()
+            metrics.add_span("fetch", (time.perf_counter() - fetch_started) * 1000.0)
+            metrics.count("rows_scanned", int(stats[0]))
+
+            built = self._build_record(
+                memory_class,
+                {"content": " ".join(words), "evidence_score": float(stats[1]), "tags": ["compacted-summary"]},
+                {"source": "memory-compactor", "reason": f"windowed compaction ({window})"},
+            )
+            with metrics.span("write"), self._tx():
+                inserted = self._insert_records_per_record([built])
+                if inserted:
+                    summary_id = inserted[0]
+                else:
+                    # Identical summary text already exists live, possibly as a row of this window;
+                    # link the other rows to it, and that row itself stays uncompacted.
+                    summary_id = self.conn.execute(
+                        "SELECT record_id FROM memory_records "
+                        "WHERE memory_class = ? AND canonical_hash = ? AND tombstone = 0",
+                        (memory_class, built["canonical_hash"]),
+                    ).fetchone()[0]
+                linked = self.conn.execute(
+                    f"UPDATE memory_records SET compacted_into = ? WHERE {window_sql} AND record_id != ?",
+                    (summary_id, *window_params, summary_id),
+                ).rowcount
+                self._upsert_meta(
+                    cursor_key,
+                    json.dumps({"job": job, "created_epoch": bound[0], "rowid": bound[1], "max_rowid": max_rowid}),
+                )
+                self._bump_generation(memory_class)
+
+            compacted_count += linked
+            if inserted:
+                summary_ids.append(summary_id)
+            windows += 1
+            position = bound
+
+        with self._tx():
+            self._delete_meta(cursor_key)
+        return {
+            "compacted_count": compacted_count,
+            "summary_ids": summary_ids,
+            "windows": windows,
+            "resumed": resumed,
+        }
+
+    @instrumented("evict")
+    def evict(
+        self,
+        memory_class: str,
+        selector: str,
+        reason_code: str,
+        return_tombstones: bool = True,
+    ) -> Dict[str, Any]:
+        """Tombstone matching live rows in one UPDATE; `return_tombstones=False` reports counts only."""
         self._validate_memory_class(memory_class)
         selector_norm = selector.strip().lower()
         if selector_norm not in {"expired", "all"}:
@@ -461,79 +1767,1303 @@ class MemoryBackendAdapterV2:
         where = "memory_class = ? AND tombstone = 0"
         params: List[Any] = [memory_class]
         if selector_norm == "expired":
-            where += " AND expires_on < ?"
-            params.append(today)
+            where += " AND expires_epoch < ?"
+            params.append(self._day_epoch(date.today()))
 
-        rows = self.conn.execute(
-            f"SELECT record_id FROM memory_records WHERE {where}", params
-        ).fetchall()
-        target_ids = [str(row["record_id"]) for row in rows]
+        update_sql = (
+            "UPDATE memory_records SET tombstone = 1, tombstone_reason = ?, tombstoned_on = ? "
+            f"WHERE {where}"
+        )
+        update_params = [reason_code, today, *params]
+        target_ids: List[str] = []
+
+        with self.instrumentation.span("write"), self._tx():
+            if not return_tombstones:
+                evicted_count = self.conn.execute(update_sql, update_params).rowcount
+            elif sqlite3.sqlite_version_info >= (3, 35, 0):
+                rows = self.conn.execute(f"{update_sql} RETURNING record_id", update_params).fetchall()
+                target_ids = [str(row[0]) for row in rows]
+                evicted_count = len(target_ids)
+            else:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS evict_targets(record_id TEXT PRIMARY KEY)")
+                self.conn.execute("DELETE FROM evict_targets")
+                self.conn.execute(
+                    f"INSERT INTO evict_targets(record_id) SELECT record_id FROM memory_records WHERE {where}",
+                    params,
+                )
+                self.conn.execute(
+                    "UPDATE memory_records SET tombstone = 1, tombstone_reason = ?, tombstoned_on = ? "
+                    "WHERE record_id IN (SELECT record_id FROM evict_targets)",
+                    (reason_code, today),
+                )
+                target_ids = [str(row[0]) for row in self.conn.execute("SELECT record_id FROM evict_targets")]
+                evicted_count = len(target_ids)
+            if evicted_count:
+                self._bump_generation(memory_class)
+        self.instrumentation.count("rows_evicted", evicted_count)
 
-        if not target_ids:
-            return {"evicted_count": 0, "tombstones": []}
+        return {
+            "evicted_count": evicted_count,
+            "tombstones": target_ids,
+        }
+
+    @instrumented("purge")
+    def purge(
+        self,
+        memory_class: str | None = None,
+        retention_days: int | None = None,
+        batch_size: int | None = None,
+    ) -> Dict[str, Any]:
+        """Hard-delete tombstones older than the retention window; `compliance_hold` rows are never touched.
+
+        Tombstoned rows are invisible to queries, so purging leaves query generations alone. FTS and
+        tag rows follow through their AFTER DELETE triggers. Tombstones from before `tombstoned_on`
+        existed (legacy and v1-imported rows) have it NULL and age from `created_at` instead.
+        """
+        classes = [memory_class] if memory_class else sorted(self.memory_classes)
+        for cls in classes:
+            self._validate_memory_class(cls)
+        days = int(self.retention["purge_after_days"] if retention_days is None else retention_days)
+        if days < 0:
+            raise ValueError("retention_days must be >= 0")
+        cutoff = (date.today() - timedelta(days=days)).isoformat()
+        batch = max(1, int(batch_size or self.PURGE_BATCH_ROWS))
+
+        purged: Dict[str, int] = {}
+        for cls in classes:
+            purged[cls] = 0
+            while True:
+                with self._tx():
+                    deleted = self.conn.execute(
+                        """
+                        DELETE FROM memory_records
+                        WHERE rowid IN (
+                            SELECT rowid FROM memory_records
+                            WHERE memory_class = ?
+                              AND tombstone = 1
+                              AND compliance_hold = 0
+                              AND (
+                                  tombstoned_on < ?
+                                  OR (tombstoned_on IS NULL AND created_at < ?)
+                              )
+                            LIMIT ?
+                        )
+                        """,
+                        (cls, cutoff, cutoff, batch),
+                    ).rowcount
+                purged[cls] += deleted
+                self.instrumentation.count("rows_deleted", deleted)
+                if deleted < batch:
+                    break
+
+        return {
+            "purged_count": sum(purged.values()),
+            "classes": purged,
+            "retention_days": days,
+            "tombstoned_before": cutoff,
+        }
+
+    def _page_stats(self) -> Dict[str, int]:
+        return {
+            name: int(self.conn.execute(f"PRAGMA {name}").fetchone()[0])
+            for name in ("page_size", "page_count", "freelist_count", "auto_vacuum")
+        }
+
+    @instrumented("maintain")
+    def maintain(
+        self,
+        time_budget_seconds: float | None = None,
+        pages_per_step: int | None = None,
+        full_vacuum: bool = False,
+    ) -> Dict[str, Any]:
+        """Return free pages to the filesystem and refresh planner statistics within a time budget.
+
+        Incremental stores release `pages_per_step` free pages per step until the freelist is empty
+        or the budget runs out, then run `PRAGMA optimize`. `full_vacuum` rebuilds the file once
+        (not budgeted) and switches stores created before auto_vacuum=INCREMENTAL over to it.
+        """
+        budget = float(
+            self.retention["maintenance_budget_seconds"] if time_budget_seconds is None else time_budget_seconds
+        )
+        step = max(1, int(pages_per_step or self.retention["vacuum_pages_per_step"]))
+        started = time.perf_counter()
+        deadline = started + budget
+        before = self._page_stats()
+
+        vacuum_steps = 0
+        vacuum_started = time.perf_counter()
+        if full_vacuum:
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self.conn.execute("VACUUM")
+        elif before["auto_vacuum"] == 2:
+            while time.perf_counter() < deadline:
+                if int(self.conn.execute("PRAGMA freelist_count").fetchone()[0]) == 0:
+                    break
+                # sqlite3's execute() steps this pragma once (one page); executescript runs it to completion.
+                self.conn.executescript(f"PRAGMA incremental_vacuum({step});")
+                vacuum_steps += 1
+        self.instrumentation.add_span("vacuum", (time.perf_counter() - vacuum_started) * 1000.0)
+
+        optimized = time.perf_counter() < deadline
+        if optimized:
+            with self.instrumentation.span("optimize"):
+                # analysis_limit keeps any ANALYZE that optimize decides to run approximate and bounded.
+                self.conn.execute("PRAGMA analysis_limit=400")
+                self.conn.execute("PRAGMA optimize")
+        # In WAL mode the database file only shrinks once the truncation is checkpointed.
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+        after = self._page_stats()
+        return {
+            "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(after["auto_vacuum"], "unknown"),
+            "full_vacuum": full_vacuum,
+            "vacuum_steps": vacuum_steps,
+            "reclaimed_bytes": max(0, before["page_count"] - after["page_count"]) * before["page_size"],
+            "free_bytes_remaining": after["freelist_count"] * after["page_size"],
+            "optimized": optimized,
+            "budget_exhausted": not optimized or after["freelist_count"] > 0,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 3),
+        }
+
+    @staticmethod
+    def _v1_segment_paths(store_dir: Path, memory_class: str) -> List[Path]:
+        """v1 log order: `<class>.jsonl`, then `<class>.NNNNNN.jsonl` ascending."""
+        numbered: List[tuple[int, Path]] = []
+        for path in store_dir.glob(f"{memory_class}.*.jsonl"):
+            seq = path.name[len(memory_class) + 1 : -len(".jsonl")]
+            if seq.isdigit():
+                numbered.append((int(seq), path))
+        base = store_dir / f"{memory_class}.jsonl"
+        return ([base] if base.exists() else []) + [path for _, path in sorted(numbered)]
+
+    def _v1_import_params(self, memory_class: str, rec: Dict[str, Any]) -> tuple[Any, ...]:
+        try:
+            content = str(rec["content"])
+            return (
+                str(rec["record_id"]),
+                memory_class,
+                str(rec["canonical_hash"]),
+                content,
+                float(rec.get("evidence_score", 0.0)),
+                json.dumps(rec.get("tags", []), ensure_ascii=True),
+                str(rec["created_at"]),
+                str(rec["expires_on"]),
+                json.dumps(rec.get("provenance", {}), ensure_ascii=True),
+                1 if rec.get("tombstone") else 0,
+                1 if rec.get("compliance_hold") else 0,
+                len(content.split()),
+                self._iso_epoch(rec["created_at"]),
+                self._iso_epoch(rec["expires_on"]),
+                rec.get("tombstone_reason"),
+                rec.get("tombstoned_on"),
+                rec.get("compacted_into"),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"record is missing or has invalid field ({exc})") from exc
+
+    def _v1_apply_batch(
+        self,
+        memory_class: str,
+        ops: List[tuple[str, Any]],
+        cursor_key: str,
+        cursor: str,
+    ) -> Dict[str, int]:
+        """Apply one batch of v1 log entries and advance the checkpoint in the same transaction."""
+        columns = ", ".join(self.V1_IMPORT_COLUMNS)
+        placeholders = ", ".join("?" for _ in self.V1_IMPORT_COLUMNS)
+        counts = {"inserted": 0, "updated": 0, "skipped": 0}
+
+        def flush_puts(rows: List[tuple[Any, ...]]) -> None:
+            if not rows:
+                return
+            # executemany rowcount sums changes() per row, which excludes FTS/tag trigger writes.
+            inserted = self.conn.executemany(
+                f"INSERT OR IGNORE INTO memory_records({columns}) VALUES ({placeholders})",
+                rows,
+            ).rowcount
+            counts["inserted"] += inserted
+            counts["skipped"] += len(rows) - inserted
+            rows.clear()
 
         with self._tx():
-            for record_id in target_ids:
-                self.conn.execute(
-                    """
-                    UPDATE memory_records
-                    SET tombstone = 1,
-                        tombstone_reason = ?,
-                        tombstoned_on = ?
-                    WHERE record_id = ?
-                    """,
-                    (reason_code, today, record_id),
+            puts: List[tuple[Any, ...]] = []
+            for kind, payload in ops:
+                if kind == "put":
+                    puts.append(payload)
+                    continue
+                flush_puts(puts)
+                record_id, fields = payload
+                assignments = ", ".join(f"{name} = ?" for name in fields)
+                updated = self.conn.execute(
+                    f"UPDATE OR IGNORE memory_records SET {assignments} WHERE record_id = ?",
+                    [*fields.values(), record_id],
+                ).rowcount
+                counts["updated"] += updated
+                counts["skipped"] += 1 - updated
+            flush_puts(puts)
+            self._embed_new_rows()
+            self._upsert_meta(cursor_key, cursor)
+            self._bump_generation(memory_class)
+        return counts
+
+    @instrumented("migrate_from_v1")
+    def migrate_from_v1(
+        self,
+        store_dir: Path,
+        memory_classes: List[str] | None = None,
+        batch_size: int | None = None,
+        restart: bool = False,
+    ) -> Dict[str, Any]:
+        """Stream a v1 JSONL store into SQLite, preserving ids, timestamps, tombstones and links.
+
+        Each batch commits together with a `v1_import.<class>.cursor` checkpoint (segment and byte
+        offset), so an interrupted import resumes where it stopped and a rerun picks up only lines
+        appended since. A torn trailing line is left for the next run.
+        """
+        batch = max(1, int(batch_size or self.V1_IMPORT_BATCH_LINES))
+        classes = memory_classes or sorted(self.memory_classes.keys())
+        for memory_class in classes:
+            self._validate_memory_class(memory_class)
+        if not store_dir.is_dir():
+            raise ValueError(f"v1 store directory not found: {store_dir}")
+
+        report: Dict[str, Any] = {"store_dir": str(store_dir), "classes": {}}
+        for memory_class in classes:
+            cursor_key = f"v1_import.{memory_class}.cursor"
+            if restart:
+                with self._tx():
+                    self._delete_meta(cursor_key)
+            checkpoint = json.loads(self._get_meta(cursor_key) or "null")
+            segments = self._v1_segment_paths(store_dir, memory_class)
+            names = [path.name for path in segments]
+
+            start_index, start_offset = 0, 0
+            if checkpoint is not None:
+                if checkpoint["segment"] not in names:
+                    raise ValueError(
+                        f"v1 store changed since the {memory_class} checkpoint "
+                        f"(segment {checkpoint['segment']} is gone); rerun with restart"
+                    )
+                start_index = names.index(checkpoint["segment"])
+                start_offset = int(checkpoint["offset"])
+                stat = segments[start_index].stat()
+                # v1 merges replace segments via os.replace, which changes the inode.
+                if stat.st_ino != checkpoint["inode"] or stat.st_size < start_offset:
+                    raise ValueError(
+                        f"v1 segment {checkpoint['segment']} was rewritten since the checkpoint; rerun with restart"
+                    )
+
+            totals = {"lines_read": 0, "inserted": 0, "updated": 0, "skipped": 0}
+            ops: List[tuple[str, Any]] = []
+            position: Dict[str, Any] | None = None
+
+            def commit() -> None:
+                if not ops or position is None:
+                    return
+                counts = self._v1_apply_batch(memory_class, ops, cursor_key, json.dumps(position))
+                for name, value in counts.items():
+                    totals[name] += value
+                ops.clear()
+
+            for path in segments[start_index:]:
+                offset = start_offset if path.name == names[start_index] else 0
+                inode = path.stat().st_ino
+                with path.open("rb") as f:
+                    f.seek(offset)
+                    for raw in f:
+                        if not raw.endswith(b"\n"):
+                            break
+                        offset += len(raw)
+                        if not raw.strip():
+                            continue
+                        entry = json.loads(raw)
+                        totals["lines_read"] += 1
+                        if entry.get("op") == "update":
+                            fields = {
+                                name: (1 if value else 0) if name in ("tombstone", "compliance_hold") else value
+                                for name, value in entry.get("set", {}).items()
+                                if name in self.V1_UPDATE_FIELDS
+                            }
+                            if fields:
+                                ops.append(("update", (str(entry.get("record_id", "")), fields)))
+                        else:
+                            ops.append(("put", self._v1_import_params(memory_class, entry)))
+                        position = {"segment": path.name, "offset": offset, "inode": inode}
+                        if len(ops) >= batch:
+                            commit()
+                position = {"segment": path.name, "offset": offset, "inode": inode}
+            commit()
+
+            LOG.info("v1 import %s: %s", memory_class, totals)
+            report["classes"][memory_class] = {
+                **totals,
+                "resumed_from": checkpoint,
+                "checkpoint": json.loads(self._get_meta(cursor_key) or "null"),
+            }
+        return report
+
+    def _import_batch(
+        self,
+        snapshots: List[tuple[Any, ...]],
+        built_records: List[Dict[str, Any]],
+        classes: set[str],
+    ) -> int:
+        """Insert one NDJSON batch in a single transaction; returns the number of rows stored."""
+        columns = ", ".join(self.V1_IMPORT_COLUMNS)
+        placeholders = ", ".join("?" for _ in self.V1_IMPORT_COLUMNS)
+        with self._tx():
+            stored = 0
+            if snapshots:
+                stored += self.conn.executemany(
+                    f"INSERT OR IGNORE INTO memory_records({columns}) VALUES ({placeholders})",
+                    snapshots,
+                ).rowcount
+            if built_records:
+                if self.bulk_insert_enabled:
+                    stored += len(self._insert_records_bulk(built_records))
+                else:
+                    stored += len(self._insert_records_per_record(built_records))
+            self._embed_new_rows()
+            if stored:
+                for memory_class in sorted(classes):
+                    self._bump_generation(memory_class)
+        return stored
+
+    @instrumented("import")
+    def import_records(
+        self,
+        path: Path,
+        memory_class: str | None = None,
+        provenance: Dict[str, Any] | None = None,
+        batch_size: int | None = None,
+        progress: Callable[[Dict[str, Any]], None] | None = None,
+    ) -> Dict[str, Any]:
+        """Stream NDJSON records (plain or gzip) into the store, committing every `batch_size` lines.
+
+        Lines with a `record_id` are snapshot records as written by `export_records` and keep their
+        ids, timestamps, tombstones and compaction links. Other lines are raw records built like
+        `append` input, under the line's own `memory_class`/`provenance` or the given defaults.
+        Both kinds dedupe, so rerunning an interrupted import only adds what is missing. `progress`
+        is called with the running totals after every committed batch.
+        """
+        batch = max(1, int(batch_size or self.NDJSON_IMPORT_BATCH_LINES))
+        if memory_class is not None:
+            self._validate_memory_class(memory_class)
+        totals = {"lines_read": 0, "imported": 0, "skipped": 0, "batches": 0}
+        snapshots: List[tuple[Any, ...]] = []
+        built_records: List[Dict[str, Any]] = []
+        classes: set[str] = set()
+
+        def commit() -> None:
+            pending = len(snapshots) + len(built_records)
+            if not pending:
+                return
+            stored = self._import_batch(snapshots, built_records, classes)
+            totals["imported"] += stored
+            totals["skipped"] += pending - stored
+            totals["batches"] += 1
+            snapshots.clear()
+            built_records.clear()
+            classes.clear()
+            if progress is not None:
+                progress(dict(totals))
+
+        with open_ndjson(path) as stream:
+            for line_no, raw in iter_ndjson(stream):
+                target = str(raw.get("memory_class") or memory_class or "")
+                try:
+                    if not target:
+                        raise ValueError("memory_class is required (in the line or as a default)")
+                    self._validate_memory_class(target)
+                    if "record_id" in raw:
+                        snapshots.append(self._v1_import_params(target, raw))
+                    else:
+                        record_provenance = self._validate_provenance(raw.get("provenance") or provenance)
+                        built_records.append(self._build_record(target, raw, record_provenance))
+                except ValueError as exc:
+                    raise ValueError(f"{path.name} line {line_no}: {exc}") from exc
+                classes.add(target)
+                totals["lines_read"] += 1
+                if len(snapshots) + len(built_records) >= batch:
+                    commit()
+        commit()
+
+        self.instrumentation.count("rows_in", totals["lines_read"])
+        self.instrumentation.count("rows_accepted", totals["imported"])
+        LOG.info("ndjson import %s: %s", path, totals)
+        return {"path": str(path), **totals}
+
+    @instrumented("export")
+    def export_records(
+        self,
+        out_dir: Path,
+        memory_classes: List[str] | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        tombstones: str = "exclude",
+        compress: bool = False,
+    ) -> Dict[str, Any]:
+        """Write one NDJSON snapshot file per memory class, streaming rows in constant memory.
+
+        `since`/`until` bound created_at by UTC date, both inclusive. `tombstones` keeps live rows
+        only (`exclude`), every row (`include`) or tombstoned rows only (`only`). All classes are
+        read in one transaction so the files are a consistent snapshot; each file is written to a
+        temporary name beside its target and renamed into place.
+        """
+        if tombstones not in self.EXPORT_TOMBSTONE_FILTERS:
+            raise ValueError(f"tombstones must be one of: {', '.join(self.EXPORT_TOMBSTONE_FILTERS)}")
+        classes = memory_classes or sorted(self.memory_classes.keys())
+        for memory_class in classes:
+            self._validate_memory_class(memory_class)
+
+        where_sql = "memory_class = ?"
+        bounds: List[Any] = []
+        if since:
+            since_day = self._safe_date(since)
+            if since_day is None:
+                raise ValueError("since must be an ISO date (YYYY-MM-DD)")
+            where_sql += " AND created_epoch >= ?"
+            bounds.append(self._day_epoch(since_day))
+        if until:
+            until_day = self._safe_date(until)
+            if until_day is None:
+                raise ValueError("until must be an ISO date (YYYY-MM-DD)")
+            where_sql += " AND created_epoch < ?"
+            bounds.append(self._day_epoch(until_day + timedelta(days=1)))
+        if tombstones == "exclude":
+            where_sql += " AND tombstone = 0"
+        elif tombstones == "only":
+            where_sql += " AND tombstone = 1"
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        suffix = ".ndjson.gz" if compress else ".ndjson"
+        files: Dict[str, Dict[str, Any]] = {}
+        with self._tx():
+            for memory_class in classes:
+                target = out_dir / f"{memory_class}{suffix}"
+                fd, tmp_name = tempfile.mkstemp(prefix=f".{memory_class}.", suffix=suffix, dir=out_dir)
+                os.close(fd)
+                tmp_path = Path(tmp_name)
+                count = 0
+                try:
+                    with open_ndjson(tmp_path, "w") as out:
+                        cursor = self.conn.execute(
+                            f"SELECT * FROM memory_records WHERE {where_sql} ORDER BY rowid",
+                            [memory_class, *bounds],
+                        )
+                        while True:
+                            rows = cursor.fetchmany(self.QUERY_FETCH_ROWS)
+                            if not rows:
+                                break
+                            for row in rows:
+                                out.write(json.dumps(self._row_to_record(row), ensure_ascii=True, sort_keys=True))
+                                out.write("\n")
+                            count += len(rows)
+                    os.replace(tmp_path, target)
+                except BaseException:
+                    tmp_path.unlink(missing_ok=True)
+                    raise
+                files[memory_class] = {"path": str(target), "records": count, "bytes": target.stat().st_size}
+        self.instrumentation.count("rows_exported", sum(entry["records"] for entry in files.values()))
+        return {
+            "out_dir": str(out_dir),
+            "since": since,
+            "until": until,
+            "tombstones": tombstones,
+            "classes": files,
+        }
+
+    @staticmethod
+    def _file_sha256(path: Path) -> str:
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _snapshot_row_counts(conn: sqlite3.Connection) -> Dict[str, Any]:
+        tables = {
+            str(row[0]) for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        counts: Dict[str, Any] = {
+            name: int(conn.execute(f"SELECT count(*) FROM {name}").fetchone()[0])
+            for name in ("memory_records", "memory_record_tags", "memory_record_embeddings")
+            if name in tables
+        }
+        counts["by_class"] = {
+            str(row[0]): {"live": int(row[1]), "tombstoned": int(row[2])}
+            for row in conn.execute(
+                """
+                SELECT memory_class, sum(tombstone = 0), sum(tombstone = 1)
+                FROM memory_records GROUP BY memory_class ORDER BY memory_class
+                """
+            )
+        }
+        return counts
+
+    @instrumented("snapshot")
+    def snapshot(
+        self,
+        out_path: Path | None = None,
+        pages_per_step: int | None = None,
+        step_sleep_ms: float | None = None,
+        progress: Callable[[Dict[str, Any]], None] | None = None,
+    ) -> Dict[str, Any]:
+        """Copy the live store to a point-in-time snapshot file plus `<file>.manifest.json`.
+
+        Uses the online backup API, `pages_per_step` pages per step with a short pause between
+        steps, so each step holds the source read lock only briefly and WAL writers are never
+        blocked. A write from another connection restarts a stepped copy; after
+        BACKUP_MAX_RESTARTS restarts the copy finishes in one pass inside a single read
+        transaction, which under WAL still only delays checkpoints. The snapshot is switched to
+        rollback journaling so it is one self-contained file before it is hashed.
+        """
+        if out_path is None:
+            stamp = self._now_utc().strftime("%Y%m%dT%H%M%SZ")
+            out_path = self.SNAPSHOT_DIR / f"{self.db_path.stem}-{stamp}.sqlite3"
+        pages = max(1, int(pages_per_step or self.BACKUP_PAGES_PER_STEP))
+        sleep_ms = self.BACKUP_STEP_SLEEP_MS if step_sleep_ms is None else max(0.0, float(step_sleep_ms))
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{out_path.name}.", dir=out_path.parent)
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+
+        state: Dict[str, Any] = {"steps": 0, "restarts": 0, "copied": 0, "max_step_ms": 0.0}
+        mark = [time.perf_counter()]
+
+        def on_step(status: int, remaining: int, total: int) -> None:
+            # Time since the previous callback returned is one backup_step, i.e. one lock hold.
+            state["max_step_ms"] = max(state["max_step_ms"], (time.perf_counter() - mark[0]) * 1000.0)
+            state["steps"] += 1
+            # A restart begins again at page 1, so the copied page count fails to advance.
+            copied = total - remaining
+            if copied <= state["copied"]:
+                state["restarts"] += 1
+                if state["restarts"] > self.BACKUP_MAX_RESTARTS:
+                    raise _BackupRestarted()
+            state["copied"] = copied
+            if progress is not None:
+                progress({"steps": state["steps"], "remaining": remaining, "total": total, "restarts": state["restarts"]})
+            if remaining and sleep_ms:
+                time.sleep(sleep_ms / 1000.0)
+            mark[0] = time.perf_counter()
+
+        started = time.perf_counter()
+        try:
+            target = sqlite3.connect(str(tmp_path))
+            try:
+                mode = "stepped"
+                with self.instrumentation.span("copy"):
+                    try:
+                        self.conn.backup(target, pages=pages, progress=on_step)
+                    except _BackupRestarted:
+                        mode = "single_pass"
+                        self.conn.backup(target)
+                target.execute("PRAGMA journal_mode=DELETE")
+                with self.instrumentation.span("verify"):
+                    check = str(target.execute("PRAGMA quick_check").fetchone()[0])
+                    if check != "ok":
+                        raise RuntimeError(f"snapshot failed quick_check ({check})")
+                    row_counts = self._snapshot_row_counts(target)
+                    meta = target.execute("SELECT value FROM backend_meta WHERE key = 'schema_version'").fetchone()
+                    page_size = int(target.execute("PRAGMA page_size").fetchone()[0])
+                    page_count = int(target.execute("PRAGMA page_count").fetchone()[0])
+            finally:
+                target.close()
+            with self.instrumentation.span("hash"):
+                sha256 = self._file_sha256(tmp_path)
+            os.replace(tmp_path, out_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        manifest = {
+            "format": self.SNAPSHOT_FORMAT,
+            "created_at": self._now_utc().isoformat().replace("+00:00", "Z"),
+            "source_db": str(self.db_path),
+            "snapshot": out_path.name,
+            "schema_version": str(meta[0]) if meta else self.BASE_SCHEMA_VERSION,
+            "bytes": out_path.stat().st_size,
+            "sha256": sha256,
+            "page_size": page_size,
+            "page_count": page_count,
+            "row_counts": row_counts,
+        }
+        manifest_path = out_path.with_name(out_path.name + ".manifest.json")
+        tmp_manifest = manifest_path.with_name(f".{manifest_path.name}.tmp")
+        tmp_manifest.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp_manifest, manifest_path)
+        self.instrumentation.count("pages_copied", page_count)
+        return {
+            "snapshot_path": str(out_path),
+            "manifest_path": str(manifest_path),
+            "manifest": manifest,
+            "mode": mode,
+            "steps": state["steps"],
+            "restarts": state["restarts"],
+            "max_step_ms": round(state["max_step_ms"], 3),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 3),
+        }
+
+    def verify_snapshot(self, snapshot_path: Path, manifest_path: Path | None = None) -> Dict[str, Any]:
+        """Check a snapshot against its manifest (size, SHA-256, schema, quick_check, row counts)."""
+        manifest_path = manifest_path or snapshot_path.with_name(snapshot_path.name + ".manifest.json")
+        if not snapshot_path.is_file():
+            raise ValueError(f"snapshot not found: {snapshot_path}")
+        if not manifest_path.is_file():
+            raise ValueError(f"snapshot manifest not found: {manifest_path}")
+        manifest = self._load_json(manifest_path)
+        if manifest.get("format") != self.SNAPSHOT_FORMAT:
+            raise ValueError(f"unsupported snapshot format: {manifest.get('format')}")
+        if snapshot_path.stat().st_size != manifest.get("bytes"):
+            raise ValueError("snapshot size does not match its manifest")
+        if self._file_sha256(snapshot_path) != manifest.get("sha256"):
+            raise ValueError("snapshot sha256 does not match its manifest")
+        if self._version_tuple(str(manifest.get("schema_version"))) > self._version_tuple(self.SCHEMA_VERSION):
+            raise ValueError(
+                f"snapshot schema {manifest.get('schema_version')} is newer than this adapter ({self.SCHEMA_VERSION})"
+            )
+        source = sqlite3.connect(f"{snapshot_path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            check = str(source.execute("PRAGMA quick_check").fetchone()[0])
+            if check != "ok":
+                raise ValueError(f"snapshot failed quick_check ({check})")
+            if self._snapshot_row_counts(source) != manifest.get("row_counts"):
+                raise ValueError("snapshot row counts do not match its manifest")
+        finally:
+            source.close()
+        return manifest
+
+    @instrumented("restore")
+    def restore(self, snapshot_path: Path, manifest_path: Path | None = None) -> Dict[str, Any]:
+        """Replace this store's contents with a verified snapshot.
+
+        Nothing is written until `verify_snapshot` passes. The copy then runs as a single backup
+        step into this connection, so other connections see either the old store or the restored
+        one. Restored class generations are moved past both the old and the snapshot values, so
+        query caches in other processes cannot match a pre-restore entry; older snapshots are
+        migrated forward afterwards.
+        """
+        if self.read_only:
+            raise ValueError("restore requires a writable adapter")
+        with self.instrumentation.span("verify"):
+            manifest = self.verify_snapshot(snapshot_path, manifest_path)
+
+        classes = sorted(self.memory_classes.keys())
+        before = dict(zip(classes, self._class_generations(classes)))
+        source = sqlite3.connect(f"{snapshot_path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            with self.instrumentation.span("copy"):
+                source.backup(self.conn)
+        finally:
+            source.close()
+        # The backup copies the snapshot's journal mode and pragmas; reapply this connection's.
+        self._configure_sqlite()
+        restored = dict(zip(classes, self._class_generations(classes)))
+        with self._tx():
+            for memory_class in classes:
+                self._upsert_meta(
+                    f"generation.{memory_class}", str(max(before[memory_class], restored[memory_class]) + 1)
                 )
+        migrated = None
+        if self.pending_migrations():
+            migrated = self.migrate()
+        if self.dense_enabled:
+            self._backfill_embeddings()
+        self._refresh_capabilities()
+        self.instrumentation.count("pages_copied", int(manifest["page_count"]))
+        return {
+            "snapshot_path": str(snapshot_path),
+            "schema_version": manifest["schema_version"],
+            "row_counts": manifest["row_counts"],
+            "migrated": migrated,
+        }
 
+
+class ShardedMemoryBackendV2(_common.MemoryBackendBase):
+    """v2 store split into one SQLite file per memory class, optionally per namespace as well.
+
+    Each shard is a full `MemoryBackendAdapterV2` with its own file and writer lock, so heavy
+    churn in one class never waits on another class's writers. Writes route by memory class and,
+    in `class_namespace` mode, by `provenance[namespace_field]`. Queries fan out to every existing
+    shard of the requested classes on a thread pool (sqlite3 releases the GIL while stepping) and
+    merge the per-shard top-k by score. Lexical and dense scores do not depend on the rest of the
+    store; BM25 and hybrid use per-shard corpus statistics, so their merged order can differ
+    slightly from a single-file store. Like the adapter, one instance serves one caller at a time.
+    """
+
+    SCHEMA_VERSION = MemoryBackendAdapterV2.SCHEMA_VERSION
+    SHARDING_MODES = ("single", "class", "class_namespace")
+    SHARDING_DEFAULTS: Dict[str, Any] = {
+        "mode": "single",
+        "namespace_field": "namespace",
+        "default_namespace": "default",
+        "query_workers": 4,
+    }
+    # Namespaces become file names, so they are limited to a conservative portable character set.
+    NAMESPACE_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+    def __init__(
+        self,
+        policy_path: Path,
+        db_path: Path,
+        sharding: Dict[str, Any] | None = None,
+        instrumentation: Instrumentation | None = None,
+        **adapter_options: Any,
+    ) -> None:
+        self._init_policy(policy_path)
+        if instrumentation is not None:
+            self.instrumentation = instrumentation
+        self.sharding = {**self.SHARDING_DEFAULTS, **self.policy.get("sharding", {}), **(sharding or {})}
+        if self.sharding["mode"] not in self.SHARDING_MODES[1:]:
+            raise ValueError(f"sharded backend requires sharding.mode in {self.SHARDING_MODES[1:]}")
+        self.policy_path = policy_path
+        self.db_path = db_path
+        self.read_only = bool(adapter_options.get("read_only", False))
+        self.adapter_options = adapter_options
+        performance = {**MemoryBackendAdapterV2.PERFORMANCE_DEFAULTS, **self.policy.get("performance", {})}
+        self.default_performance_profile = str(performance["default_profile"])
+        self.shard_dir = db_path.parent / f"{db_path.stem}.shards"
+        self._shards: Dict[tuple[str, str | None], MemoryBackendAdapterV2] = {}
+        self._executor: ThreadPoolExecutor | None = None
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for shard in self._shards.values():
+            shard.close()
+        self._shards.clear()
+
+    def _namespace_for(self, provenance: Dict[str, Any] | None) -> str | None:
+        if self.sharding["mode"] != "class_namespace":
+            return None
+        namespace = str((provenance or {}).get(self.sharding["namespace_field"]) or self.sharding["default_namespace"])
+        if not self.NAMESPACE_RE.match(namespace):
+            raise ValueError(f"namespace must match {self.NAMESPACE_RE.pattern}: {namespace!r}")
+        return namespace
+
+    def _shard_path(self, memory_class: str, namespace: str | None) -> Path:
+        if namespace is None:
+            return self.shard_dir / f"{memory_class}.sqlite3"
+        return self.shard_dir / memory_class / f"{namespace}.sqlite3"
+
+    def _shard(self, memory_class: str, namespace: str | None) -> MemoryBackendAdapterV2:
+        key = (memory_class, namespace)
+        shard = self._shards.get(key)
+        if shard is None:
+            shard = MemoryBackendAdapterV2(self.policy_path, self._shard_path(memory_class, namespace), **self.adapter_options)
+            self._shards[key] = shard
+        return shard
+
+    def shard_keys(self, memory_class: str, namespaces: List[str] | None = None) -> List[tuple[str, str | None]]:
+        """Existing shards of a class, in a stable order; queries never create empty shard files."""
+        self._validate_memory_class(memory_class)
+        if self.sharding["mode"] == "class":
+            exists = self._shard_path(memory_class, None).exists()
+            return [(memory_class, None)] if exists else []
+        found = sorted(path.stem for path in (self.shard_dir / memory_class).glob("*.sqlite3"))
+        if namespaces is not None:
+            found = [namespace for namespace in found if namespace in namespaces]
+        return [(memory_class, namespace) for namespace in found]
+
+    def _fan_out(
+        self,
+        keys: List[tuple[str, str | None]],
+        call: Callable[[tuple[str, str | None], MemoryBackendAdapterV2], Any],
+    ) -> List[Any]:
+        shards = [self._shard(*key) for key in keys]
+        if len(shards) <= 1:
+            return [call(key, shard) for key, shard in zip(keys, shards)]
+        if self._executor is None:
+            workers = max(1, int(self.sharding["query_workers"]))
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lds-memory-shard")
+        # Each shard connection is used by exactly one worker for the duration of the call.
+        return list(self._executor.map(call, keys, shards))
+
+    @instrumented("append")
+    def append(
+        self,
+        memory_class: str,
+        records: List[Dict[str, Any]],
+        provenance: Dict[str, Any] | None,
+    ) -> Dict[str, Any]:
+        self._validate_memory_class(memory_class)
+        out = self._shard(memory_class, self._namespace_for(provenance)).append(memory_class, records, provenance)
+        self.instrumentation.count("rows_in", len(records))
+        self.instrumentation.count("rows_accepted", out["accepted_count"])
+        return out
+
+    @instrumented("query")
+    def query(
+        self,
+        query: str,
+        memory_classes: List[str] | None,
+        top_k: int,
+        filters: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        text = query.strip().lower()
+        if not text:
+            raise ValueError("query must be non-empty")
+        filter_obj = dict(filters or {})
+        namespaces = filter_obj.pop("namespace", None)
+        if namespaces is not None:
+            if self.sharding["mode"] != "class_namespace":
+                raise ValueError("filters.namespace requires sharding.mode class_namespace")
+            namespaces = [str(namespaces)] if isinstance(namespaces, str) else [str(item) for item in namespaces]
+        classes = memory_classes or sorted(self.memory_classes.keys())
+        keys = [key for cls in dict.fromkeys(classes) for key in self.shard_keys(cls, namespaces)]
+        top = max(1, int(top_k))
+
+        with self.instrumentation.span("fanout"):
+            outs = self._fan_out(keys, lambda key, shard: shard.query(query, [key[0]], top, filters=filter_obj))
+        with self.instrumentation.span("merge"):
+            # Stable sort: equal scores keep shard order, then each shard's own order.
+            merged = sorted(
+                (item for out in outs for item in out["results"]),
+                key=lambda item: item["score"],
+                reverse=True,
+            )[:top]
+        self.instrumentation.count("shards", len(keys))
+        self.instrumentation.count("rows_returned", len(merged))
         return {
-            "evicted_count": len(target_ids),
-            "tombstones": target_ids,
+            "results": merged,
+            "trace_id": self._sha256(f"{self._now_utc().isoformat()}:{query}")[:16],
+            "filters": filters or {},
+            "shards": len(keys),
         }
 
+    @instrumented("compact")
+    def compact(self, memory_class: str, before_date: str, max_words: int, **window: Any) -> Dict[str, Any]:
+        outs = [
+            self._shard(*key).compact(memory_class, before_date, max_words, **window)
+            for key in self.shard_keys(memory_class)
+        ]
+        return {
+            "compacted_count": sum(out["compacted_count"] for out in outs),
+            "summary_ids": [summary_id for out in outs for summary_id in out["summary_ids"]],
+        }
 
-def parse_json_value(raw: str, field_name: str) -> Dict[str, Any]:
-    try:
-        data = json.loads(raw)
-    except (json.JSONDecodeError, TypeError) as exc:
-        raise ValueError(f"{field_name} must be valid JSON ({exc})") from exc
-    if not isinstance(data, dict):
-        raise ValueError(f"{field_name} must be a JSON object")
-    return data
-
-
-def resolve_records_file_path(records_file: str) -> Path:
-    path = Path(records_file)
-    candidate = path if path.is_absolute() else (ROOT / path)
-    resolved = candidate.resolve()
-    if ROOT_RESOLVED not in resolved.parents and resolved != ROOT_RESOLVED:
-        raise ValueError("records_file path must stay inside LDS root")
-    return resolved
-
-
-def load_records_from_args(records_file: str | None, record_values: List[str]) -> List[Dict[str, Any]]:
-    records: List[Dict[str, Any]] = []
-
-    if records_file:
-        path = resolve_records_file_path(records_file)
-        with path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            records.append(data)
-        elif isinstance(data, list):
-            for item in data:
-                if not isinstance(item, dict):
-                    raise ValueError("records file list must contain only objects")
-                records.append(item)
-        else:
-            raise ValueError("records file must be a JSON object or JSON array")
+    @instrumented("evict")
+    def evict(
+        self,
+        memory_class: str,
+        selector: str,
+        reason_code: str,
+        return_tombstones: bool = True,
+    ) -> Dict[str, Any]:
+        outs = [
+            self._shard(*key).evict(memory_class, selector, reason_code, return_tombstones=return_tombstones)
+            for key in self.shard_keys(memory_class)
+        ]
+        evicted = sum(out["evicted_count"] for out in outs)
+        self.instrumentation.count("rows_evicted", evicted)
+        return {"evicted_count": evicted, "tombstones": [rid for out in outs for rid in out["tombstones"]]}
+
+    def _all_shard_keys(self) -> List[tuple[str, str | None]]:
+        return [key for cls in sorted(self.memory_classes.keys()) for key in self.shard_keys(cls)]
+
+    def _per_shard(self, method: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        """Run a maintenance method on every existing shard, keyed by shard file relative to shard_dir."""
+        return {
+            self._shard_path(*key).relative_to(self.shard_dir).as_posix(): getattr(self._shard(*key), method)(*args, **kwargs)
+            for key in self._all_shard_keys()
+        }
+
+    def migrate(self, dry_run: bool = False, batch_size: int | None = None) -> Dict[str, Any]:
+        return {"shards": self._per_shard("migrate", dry_run=dry_run, batch_size=batch_size)}
+
+    def purge(
+        self,
+        memory_class: str | None = None,
+        retention_days: int | None = None,
+        batch_size: int | None = None,
+    ) -> Dict[str, Any]:
+        keys = self.shard_keys(memory_class) if memory_class else self._all_shard_keys()
+        shards = {
+            self._shard_path(*key).relative_to(self.shard_dir).as_posix(): self._shard(*key).purge(
+                key[0], retention_days=retention_days, batch_size=batch_size
+            )
+            for key in keys
+        }
+        return {"purged_count": sum(out["purged_count"] for out in shards.values()), "shards": shards}
+
+    def maintain(self, **options: Any) -> Dict[str, Any]:
+        return {"shards": self._per_shard("maintain", **options)}
+
+    def set_performance_profile(self, name: str) -> None:
+        self.adapter_options["performance_profile"] = name
+        for shard in self._shards.values():
+            shard.set_performance_profile(name)
+
+    def _load_records(self, memory_class: str) -> List[Dict[str, Any]]:
+        return [record for key in self.shard_keys(memory_class) for record in self._shard(*key)._load_records(memory_class)]
+
+
+def opens_sharded(policy_path: Path, db_path: Path) -> bool:
+    """True when the policy shards the store and `db_path` names the store, not one of its shard files."""
+    policy = json.loads(policy_path.read_text(encoding="utf-8"))
+    mode = str(policy.get("sharding", {}).get("mode", ShardedMemoryBackendV2.SHARDING_DEFAULTS["mode"]))
+    return mode != "single" and not any(parent.name.endswith(".shards") for parent in db_path.parents)
+
+
+def open_backend(policy_path: Path, db_path: Path, **options: Any) -> MemoryBackendAdapterV2 | ShardedMemoryBackendV2:
+    """Open the layout the policy declares: one SQLite file, or shards beside `db_path`."""
+    if opens_sharded(policy_path, db_path):
+        return ShardedMemoryBackendV2(policy_path, db_path, **options)
+    return MemoryBackendAdapterV2(policy_path, db_path, **options)
+
+
+class AsyncMemoryBackendV2:
+    """asyncio facade: one queued writer connection plus a pool of read-only query connections.
+
+    Writes (append/compact/evict) are serialized through a single writer task; `max_pending_writes`
+    bounds the queue so producers await instead of growing memory. Queries borrow one of
+    `reader_pool_size` read-only connections and run in worker threads, so they proceed in
+    parallel with ingest under WAL.
+    """
+
+    def __init__(
+        self,
+        policy_path: Path,
+        db_path: Path,
+        reader_pool_size: int = 4,
+        max_pending_writes: int = 64,
+        query_cache_size: int = 0,
+    ) -> None:
+        if reader_pool_size < 1:
+            raise ValueError("reader_pool_size must be >= 1")
+        if max_pending_writes < 1:
+            raise ValueError("max_pending_writes must be >= 1")
+        self.policy_path = policy_path
+        self.db_path = db_path
+        self.reader_pool_size = reader_pool_size
+        self.max_pending_writes = max_pending_writes
+        self.query_cache_size = query_cache_size
+        self._writer: MemoryBackendAdapterV2 | None = None
+        self._readers: List[MemoryBackendAdapterV2] = []
+        self._idle_readers: asyncio.Queue[MemoryBackendAdapterV2] | None = None
+        self._write_queue: asyncio.Queue[Any] | None = None
+        self._writer_task: asyncio.Task[None] | None = None
+        self._write_executor: ThreadPoolExecutor | None = None
+        self._read_executor: ThreadPoolExecutor | None = None
+
+    async def __aenter__(self) -> "AsyncMemoryBackendV2":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        if self._writer_task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        # The writer connection stays on one thread for its whole life.
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-writer")
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=self.reader_pool_size,
+            thread_name_prefix="memory-reader",
+        )
+        self._writer = await loop.run_in_executor(
+            self._write_executor,
+            MemoryBackendAdapterV2,
+            self.policy_path,
+            self.db_path,
+        )
+        # Opening a reader connects and checks the schema, so it runs off the event loop too.
+        open_reader = partial(
+            MemoryBackendAdapterV2,
+            self.policy_path,
+            self.db_path,
+            read_only=True,
+            query_cache_size=self.query_cache_size,
+        )
+        self._readers = list(
+            await asyncio.gather(
+                *(loop.run_in_executor(self._read_executor, open_reader) for _ in range(self.reader_pool_size))
+            )
+        )
+        self._idle_readers = asyncio.Queue()
+        for reader in self._readers:
+            self._idle_readers.put_nowait(reader)
+        self._write_queue = asyncio.Queue(maxsize=self.max_pending_writes)
+        self._writer_task = asyncio.create_task(self._run_writer())
+
+    async def close(self) -> None:
+        if self._writer_task is None or self._write_queue is None:
+            return
+        await self._write_queue.put(None)
+        await self._writer_task
+        self._writer_task = None
+        for reader in self._readers:
+            reader.close()
+        self._readers = []
+        if self._writer is not None and self._write_executor is not None:
+            await asyncio.get_running_loop().run_in_executor(self._write_executor, self._writer.close)
+            self._writer = None
+        for executor in (self._write_executor, self._read_executor):
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+    async def _run_writer(self) -> None:
+        assert self._write_queue is not None and self._write_executor is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._write_queue.get()
+            if item is None:
+                self._write_queue.task_done()
+                return
+            call, future = item
+            ok, outcome = await loop.run_in_executor(self._write_executor, self._capture, call)
+            if not future.cancelled():
+                if ok:
+                    future.set_result(outcome)
+                else:
+                    future.set_exception(outcome)
+            self._write_queue.task_done()
+
+    @staticmethod
+    def _capture(call: Callable[[], Dict[str, Any]]) -> tuple[bool, Any]:
+        # Catch in the worker thread so the writer coroutine frame never lands in a caller's traceback.
+        try:
+            return True, call()
+        except Exception as exc:
+            return False, exc
+
+    async def _submit_write(self, call: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        if self._write_queue is None:
+            raise RuntimeError("AsyncMemoryBackendV2 is not started")
+        future: asyncio.Future[Dict[str, Any]] = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((call, future))
+        return await future
+
+    async def append(
+        self,
+        memory_class: str,
+        records: List[Dict[str, Any]],
+        provenance: Dict[str, Any] | None,
+    ) -> Dict[str, Any]:
+        writer = self._writer
+        assert writer is not None
+        return await self._submit_write(lambda: writer.append(memory_class, records, provenance))
+
+    async def compact(self, memory_class: str, before_date: str, max_words: int) -> Dict[str, Any]:
+        writer = self._writer
+        assert writer is not None
+        return await self._submit_write(lambda: writer.compact(memory_class, before_date, max_words))
+
+    async def evict(
+        self,
+        memory_class: str,
+        selector: str,
+        reason_code: str,
+        return_tombstones: bool = True,
+    ) -> Dict[str, Any]:
+        writer = self._writer
+        assert writer is not None
+        return await self._submit_write(
+            lambda: writer.evict(memory_class, selector, reason_code, return_tombstones=return_tombstones)
+        )
+
+    async def query(
+        self,
+        query: str,
+        memory_classes: List[str] | None,
+        top_k: int,
+        filters: Dict[str, Any] | None,
+    ) -> Dict[str, Any]:
+        if self._idle_readers is None or self._read_executor is None:
+            raise RuntimeError("AsyncMemoryBackendV2 is not started")
+        reader = await self._idle_readers.get()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._read_executor,
+                lambda: reader.query(query, memory_classes, top_k, filters),
+            )
+        finally:
+            self._idle_readers.put_nowait(reader)
+
+
+class _MemoryRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.handle_line(line)  # type: ignore[attr-defined]
+            self.wfile.write((json.dumps(response, ensure_ascii=True) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+def store_identity(policy_path: Path, db_path: Path) -> Dict[str, str]:
+    """Resolved policy and database paths; a daemon only serves requests naming its own store."""
+    return {"db_path": str(db_path.resolve()), "policy": str(policy_path.resolve())}
+
+
+class MemoryDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Keeps one warm adapter and serves newline-delimited JSON requests over a Unix socket.
+
+    Requests may carry a `store` (see `store_identity`); one naming another store is refused with
+    `store_mismatch` so the CLI runs it in-process instead. The socket is owner-only (0600): any
+    process that can connect may write to the store or send `shutdown`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, adapter: MemoryBackendAdapterV2 | ShardedMemoryBackendV2) -> None:
+        self.socket_path = socket_path
+        self.adapter = adapter
+        self.store = store_identity(adapter.policy_path, adapter.db_path)
+        self.lock = threading.Lock()
+        self._remove_stale_socket()
+        super().__init__(str(socket_path), _MemoryRequestHandler)
 
-    for raw in record_values:
-        records.append(parse_json_value(raw, "--record"))
+    def _remove_stale_socket(self) -> None:
+        if not self.socket_path.exists():
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.socket_path))
+        except OSError:
+            self.socket_path.unlink()
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"memory daemon already listening on {self.socket_path}")
+
+    def server_bind(self) -> None:
+        super().server_bind()
+        os.chmod(self.socket_path, 0o600)
+
+    def handle_line(self, line: bytes) -> Dict[str, Any]:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            op = str(request.get("op", "")).strip().lower()
+            store = request.pop("store", None)
+            if store is not None and store != self.store:
+                return {
+                    "status": "fail",
+                    "error": f"memory daemon serves {self.store['db_path']}, not {store.get('db_path')}",
+                    "store_mismatch": True,
+                }
+            if op == "ping":
+                return {"status": "pass", "result": {"schema_version": self.adapter.SCHEMA_VERSION, "store": self.store}}
+            if op == "shutdown":
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return {"status": "pass", "result": {"shutdown": True}}
+            want_stats = bool(request.pop("stats", False))
+            metrics = self.adapter.instrumentation
+            with metrics.operation(op) as record:
+                waited_from = time.perf_counter()
+                with self.lock:
+                    metrics.add_span("lock_wait", (time.perf_counter() - waited_from) * 1000.0)
+                    result = dispatch_request(self.adapter, request)
+        except Exception as exc:
+            LOG.warning("memory daemon request failed: %s", exc)
+            return {"status": "fail", "error": str(exc)}
+        response = {"status": "pass", "result": result}
+        if want_stats:
+            response["stats"] = record
+        return response
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+class MemoryDaemonClient:
+    """Thin NDJSON client for MemoryDaemon; one connection can carry many requests."""
+
+    def __init__(self, socket_path: Path, timeout: float = 30.0) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(str(socket_path))
+        except OSError:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile("rb")
+
+    def request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.sock.sendall((json.dumps(request, ensure_ascii=True) + "\n").encode("utf-8"))
+        line = self.reader.readline()
+        if not line:
+            raise RuntimeError("memory daemon closed the connection")
+        return json.loads(line)
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+        finally:
+            self.sock.close()
+
+
+def request_via_daemon(socket_path: Path, request: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Return the daemon response, or None when no daemon is reachable or it serves another store."""
+    if not socket_path.exists():
+        return None
+    try:
+        client = MemoryDaemonClient(socket_path)
+    except OSError as exc:
+        LOG.debug("memory daemon unreachable at %s (%s); running locally", socket_path, exc)
+        return None
+    try:
+        response = client.request(request)
+    finally:
+        client.close()
+    if response.get("store_mismatch"):
+        LOG.debug("memory daemon at %s: %s; running locally", socket_path, response.get("error"))
+        return None
+    return response
+
+
+def metrics_summary(log_path: Path, thresholds_path: Path) -> Dict[str, Any]:
+    """Summarize a metrics log and compare query p95 with the evaluation contract's ceiling."""
+    operations = _common.summarize_metrics_log(log_path)
+    with thresholds_path.open("r", encoding="utf-8") as f:
+        ceiling = json.load(f)["thresholds"]["p95_latency_ms_max"]
+    query_p95 = operations.get("query", {}).get("p95_ms")
+    return {
+        "operations": operations,
+        "p95_latency_ms": query_p95,
+        "p95_latency_ms_max": ceiling,
+        "within_threshold": query_p95 is not None and query_p95 <= ceiling,
+    }
+
+
+def serve(
+    policy_path: Path,
+    db_path: Path,
+    socket_path: Path,
+    query_cache_size: int = 0,
+    performance_profile: str | None = None,
+    metrics_log: Path | None = None,
+) -> int:
+    # Always instrumented so clients can ask for per-request stats; the JSONL log stays opt-in.
+    adapter = open_backend(
+        policy_path,
+        db_path,
+        query_cache_size=query_cache_size,
+        performance_profile=performance_profile,
+        instrumentation=Instrumentation(metrics_log=metrics_log),
+    )
+    try:
+        with MemoryDaemon(socket_path, adapter) as server:
+            LOG.info("memory daemon listening on %s", socket_path)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                LOG.info("memory daemon interrupted")
+    finally:
+        adapter.close()
+    return 0
 
-    if not records:
-        raise ValueError("no records provided")
 
-    return records
+# Commands that operate on one SQLite file; in sharded mode they run per shard via --db-path.
+SINGLE_FILE_COMMANDS = ("snapshot", "restore", "import", "export", "migrate-from-v1")
 
 
 def main() -> int:
@@ -553,37 +3083,119 @@ def main() -> int:
         action="store_true",
         help="Enable debug logging.",
     )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="SQLite performance profile from the memory policy (default: performance.default_profile).",
+    )
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get("LDS_MEMORY_SOCKET"),
+        help="Memory daemon Unix socket; commands use it when reachable (env: LDS_MEMORY_SOCKET).",
+    )
+    add_instrumentation_arguments(parser)
 
     sub = parser.add_subparsers(dest="cmd", required=True)
 
-    p_append = sub.add_parser("append", help="Append records to a memory class")
-    p_append.add_argument("--memory-class", required=True)
-    p_append.add_argument("--records-file", help="JSON file with object or array of objects")
-    p_append.add_argument("--record", action="append", default=[], help="Inline JSON record")
-    p_append.add_argument("--provenance", default="{}", help="Provenance JSON object")
-
-    p_query = sub.add_parser("query", help="Query records")
-    p_query.add_argument("--query", required=True)
-    p_query.add_argument("--memory-class", action="append", default=[])
-    p_query.add_argument("--top-k", type=int, default=5)
-    p_query.add_argument("--filters", default="{}", help="JSON object with optional filters")
-
-    p_compact = sub.add_parser("compact", help="Compact old records")
-    p_compact.add_argument("--memory-class", required=True)
-    p_compact.add_argument("--before-date", required=True, help="YYYY-MM-DD")
-    p_compact.add_argument(
-        "--max-words",
-        "--max-tokens",
-        dest="max_words",
+    p_serve = sub.add_parser(
+        "serve",
+        help="Serve append/query/compact/evict/shutdown as NDJSON over --socket (created 0600: owner only)",
+        description=(
+            "Keep one warm adapter behind --socket. The socket is chmod 0600 right after binding, so only "
+            "the owning user can connect; any client that connects may write to the store or stop the daemon."
+        ),
+    )
+    p_serve.add_argument(
+        "--query-cache-size",
         type=int,
         default=256,
-        help="Maximum words in compacted summary (legacy alias: --max-tokens).",
+        help="Entries in the generation-checked query result cache (0 disables).",
     )
 
-    p_evict = sub.add_parser("evict", help="Evict records")
-    p_evict.add_argument("--memory-class", required=True)
-    p_evict.add_argument("--selector", required=True, choices=["expired", "all"])
-    p_evict.add_argument("--reason-code", required=True)
+    p_migrate = sub.add_parser("migrate", help="Apply pending schema migrations")
+    p_migrate.add_argument("--dry-run", action="store_true", help="Report pending steps and estimated rows only.")
+    p_migrate.add_argument("--batch-size", type=int, default=None, help="Rows per backfill transaction.")
+    p_migrate.add_argument("--bulk-load", action="store_true", help="Run under the bulk_load performance profile.")
+
+    p_purge = sub.add_parser("purge", help="Hard-delete old tombstones (never compliance-held rows)")
+    p_purge.add_argument("--memory-class", default=None, help="Limit to one class (default: all).")
+    p_purge.add_argument("--retention-days", type=int, default=None, help="Override retention.purge_after_days.")
+    p_purge.add_argument("--batch-size", type=int, default=None, help="Rows deleted per transaction.")
+
+    p_maintain = sub.add_parser("maintain", help="Incremental vacuum and PRAGMA optimize within a time budget")
+    p_maintain.add_argument("--time-budget", type=float, default=None, help="Seconds (default: policy retention).")
+    p_maintain.add_argument("--pages-per-step", type=int, default=None, help="Free pages released per step.")
+    p_maintain.add_argument(
+        "--full-vacuum",
+        action="store_true",
+        help="Rebuild the file once (unbudgeted); converts older stores to incremental auto_vacuum.",
+    )
+
+    p_metrics = sub.add_parser("metrics-summary", help="Per-operation latency percentiles from a --metrics-log file")
+    p_metrics.add_argument("--log", required=True, help="Metrics JSONL path (relative to LDS root).")
+    p_metrics.add_argument(
+        "--thresholds",
+        default="contracts/evaluation/lds-eval-thresholds.json",
+        help="Evaluation thresholds with p95_latency_ms_max (relative to LDS root).",
+    )
+
+    p_import = sub.add_parser("migrate-from-v1", help="Stream a v1 JSONL store into this database")
+    p_import.add_argument(
+        "--store-dir",
+        default="reports/handoff/memory_store",
+        help="v1 storage directory (relative to LDS root).",
+    )
+    p_import.add_argument("--memory-class", action="append", default=[])
+    p_import.add_argument("--batch-size", type=int, default=None, help="Log lines per transaction.")
+    p_import.add_argument("--restart", action="store_true", help="Discard checkpoints and import from the start.")
+    p_import.add_argument("--bulk-load", action="store_true", help="Run under the bulk_load performance profile.")
+
+    p_ndjson_import = sub.add_parser("import", help="Stream NDJSON records (plain or gzip) into this database")
+    p_ndjson_import.add_argument("--input", required=True, help="NDJSON file (relative to LDS root).")
+    p_ndjson_import.add_argument("--memory-class", default=None, help="Class for lines without memory_class.")
+    p_ndjson_import.add_argument(
+        "--provenance",
+        default=None,
+        help="JSON provenance for raw lines without their own (snapshot lines keep theirs).",
+    )
+    p_ndjson_import.add_argument("--batch-size", type=int, default=None, help="Lines per transaction.")
+    p_ndjson_import.add_argument("--progress", action="store_true", help="Log running totals after each batch.")
+    p_ndjson_import.add_argument("--bulk-load", action="store_true", help="Run under the bulk_load performance profile.")
+
+    p_export = sub.add_parser("export", help="Write per-class NDJSON snapshots")
+    p_export.add_argument("--out-dir", required=True, help="Output directory (relative to LDS root).")
+    p_export.add_argument("--memory-class", action="append", default=[])
+    p_export.add_argument("--since", default=None, help="Earliest created_at date, inclusive (YYYY-MM-DD).")
+    p_export.add_argument("--until", default=None, help="Latest created_at date, inclusive (YYYY-MM-DD).")
+    p_export.add_argument(
+        "--tombstones",
+        choices=MemoryBackendAdapterV2.EXPORT_TOMBSTONE_FILTERS,
+        default="exclude",
+        help="Live rows only, all rows, or tombstoned rows only.",
+    )
+    p_export.add_argument("--gzip", action="store_true", help="Write <class>.ndjson.gz.")
+
+    p_snapshot = sub.add_parser("snapshot", help="Online point-in-time backup with a SHA-256 manifest")
+    p_snapshot.add_argument(
+        "--out",
+        default=None,
+        help="Snapshot file (relative to LDS root; default reports/handoff/memory_snapshots/<db>-<UTC>.sqlite3).",
+    )
+    p_snapshot.add_argument("--pages-per-step", type=int, default=None, help="Pages copied per backup step.")
+    p_snapshot.add_argument("--step-sleep-ms", type=float, default=None, help="Pause between steps for writers.")
+
+    p_restore = sub.add_parser("restore", help="Verify a snapshot against its manifest and restore it")
+    p_restore.add_argument("--snapshot", required=True, help="Snapshot file (relative to LDS root).")
+    p_restore.add_argument("--manifest", default=None, help="Manifest path (default: <snapshot>.manifest.json).")
+
+    operation_parsers = add_operation_parsers(sub)
+    operation_parsers["compact"].add_argument(
+        "--window",
+        choices=MemoryBackendAdapterV2.COMPACTION_WINDOWS,
+        default=None,
+        help="Compact one UTC day or --window-rows rows per transaction (resumable).",
+    )
+    operation_parsers["compact"].add_argument("--window-rows", type=int, default=None, help="Rows per window.")
 
     args = parser.parse_args()
 
@@ -592,33 +3204,128 @@ def main() -> int:
         format="%(levelname)s %(name)s %(message)s",
     )
 
-    adapter: MemoryBackendAdapterV2 | None = None
+    if args.cmd == "serve":
+        if not args.socket:
+            print(json.dumps({"status": "fail", "error": "serve requires --socket"}, indent=2))
+            return 1
+        return serve(
+            ROOT / args.policy,
+            ROOT / args.db_path,
+            ROOT / args.socket,
+            args.query_cache_size,
+            args.profile,
+            ROOT / args.metrics_log if args.metrics_log else None,
+        )
+
+    if args.cmd == "metrics-summary":
+        try:
+            out = metrics_summary(ROOT / args.log, ROOT / args.thresholds)
+        except Exception as exc:
+            print(json.dumps({"status": "fail", "error": str(exc)}, indent=2))
+            return 1
+        print(json.dumps({"status": "pass", "result": out}, indent=2))
+        return 0
+
+    metrics = instrumentation_from_args(args)
+
+    def open_adapter(**options: Any) -> MemoryBackendAdapterV2 | ShardedMemoryBackendV2:
+        options.setdefault("performance_profile", args.profile)
+        return open_backend(ROOT / args.policy, ROOT / args.db_path, instrumentation=metrics, **options)
+
+    bulk_profile = "bulk_load" if getattr(args, "bulk_load", False) else args.profile
+    adapter: MemoryBackendAdapterV2 | ShardedMemoryBackendV2 | None = None
+    restore_error: str | None = None
     try:
-        adapter = MemoryBackendAdapterV2(ROOT / args.policy, ROOT / args.db_path)
-
-        if args.cmd == "append":
-            records = load_records_from_args(args.records_file, args.record)
-            provenance = parse_json_value(args.provenance, "--provenance")
-            out = adapter.append(args.memory_class, records, provenance)
-        elif args.cmd == "query":
-            classes = args.memory_class if args.memory_class else None
-            filters = parse_json_value(args.filters, "--filters")
-            out = adapter.query(args.query, classes, args.top_k, filters=filters)
-        elif args.cmd == "compact":
-            out = adapter.compact(args.memory_class, args.before_date, args.max_words)
-        elif args.cmd == "evict":
-            out = adapter.evict(args.memory_class, args.selector, args.reason_code)
+        if args.cmd in SINGLE_FILE_COMMANDS and opens_sharded(ROOT / args.policy, ROOT / args.db_path):
+            raise ValueError(f"{args.cmd} works on one database file; with sharding, pass a shard file as --db-path")
+        if args.cmd == "migrate":
+            adapter = open_adapter(auto_migrate=False, performance_profile=bulk_profile)
+            out = adapter.migrate(dry_run=args.dry_run, batch_size=args.batch_size)
+        elif args.cmd == "purge":
+            adapter = open_adapter()
+            out = adapter.purge(args.memory_class, retention_days=args.retention_days, batch_size=args.batch_size)
+        elif args.cmd == "maintain":
+            adapter = open_adapter()
+            out = adapter.maintain(
+                time_budget_seconds=args.time_budget,
+                pages_per_step=args.pages_per_step,
+                full_vacuum=args.full_vacuum,
+            )
+        elif args.cmd == "migrate-from-v1":
+            adapter = open_adapter(performance_profile=bulk_profile)
+            out = adapter.migrate_from_v1(
+                ROOT / args.store_dir,
+                memory_classes=args.memory_class or None,
+                batch_size=args.batch_size,
+                restart=args.restart,
+            )
+        elif args.cmd == "import":
+            adapter = open_adapter(performance_profile=bulk_profile)
+            out = adapter.import_records(
+                resolve_records_file_path(args.input, "--input"),
+                memory_class=args.memory_class,
+                provenance=parse_json_value(args.provenance, "--provenance") if args.provenance else None,
+                batch_size=args.batch_size,
+                progress=(lambda totals: LOG.info("import progress: %s", totals)) if args.progress else None,
+            )
+        elif args.cmd == "export":
+            adapter = open_adapter()
+            out = adapter.export_records(
+                ROOT / args.out_dir,
+                memory_classes=args.memory_class or None,
+                since=args.since,
+                until=args.until,
+                tombstones=args.tombstones,
+                compress=args.gzip,
+            )
+        elif args.cmd == "snapshot":
+            adapter = open_adapter()
+            out = adapter.snapshot(
+                ROOT / args.out if args.out else None,
+                pages_per_step=args.pages_per_step,
+                step_sleep_ms=args.step_sleep_ms,
+            )
+        elif args.cmd == "restore":
+            adapter = open_adapter(auto_migrate=False)
+            out = adapter.restore(ROOT / args.snapshot, ROOT / args.manifest if args.manifest else None)
         else:
-            raise ValueError(f"unsupported command: {args.cmd}")
+            request = request_from_args(args)
+            if args.socket:
+                # The daemon keeps its own instrumentation; it returns this request's record on demand.
+                response = request_via_daemon(
+                    ROOT / args.socket,
+                    {**request, "stats": args.stats, "store": store_identity(ROOT / args.policy, ROOT / args.db_path)},
+                )
+                if response is not None:
+                    print(json.dumps(response, indent=2))
+                    return 0 if response.get("status") == "pass" else 1
+
+            adapter = open_adapter()
+            out = dispatch_request(adapter, request)
     except Exception as exc:
         LOG.exception("memory backend v2 command failed")
         print(json.dumps({"status": "fail", "error": str(exc)}, indent=2))
         return 1
     finally:
         if adapter is not None:
-            adapter.close()
+            try:
+                if getattr(args, "bulk_load", False):
+                    # Also after a failure: leave the store on its normal profile, with the WAL written
+                    # under synchronous=OFF checkpointed at that profile's durability.
+                    adapter.set_performance_profile(args.profile or adapter.default_performance_profile)
+            except Exception as exc:
+                LOG.exception("restoring the performance profile after --bulk-load failed")
+                restore_error = str(exc)
+            finally:
+                adapter.close()
+    if restore_error is not None:
+        print(json.dumps({"status": "fail", "error": f"could not leave bulk_load: {restore_error}"}, indent=2))
+        return 1
 
-    print(json.dumps({"status": "pass", "result": out}, indent=2))
+    payload: Dict[str, Any] = {"status": "pass", "result": out}
+    if args.stats and metrics is not None:
+        payload["stats"] = metrics.last
+    print(json.dumps(payload, indent=2))
     return 0
 
 
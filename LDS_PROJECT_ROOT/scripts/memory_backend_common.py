@@ -0,0 +1,558 @@
+"""Shared pieces of the LDS memory backends: protocol, record building and CLI plumbing.
+
+Backends import this module by path (see `load_common_module` in each adapter) and register it
+in `sys.modules`, so every backend shares one `MemoryBackend` protocol object.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Protocol, TypeVar, runtime_checkable
+
+ROOT = Path(__file__).resolve().parents[1]
+ROOT_RESOLVED = ROOT.resolve()
+LOG = logging.getLogger("memory_backend_common")
+
+
+@runtime_checkable
+class MemoryBackend(Protocol):
+    """Structural interface of `contracts/memory/lds-memory-api.json`.
+
+    Size-bound parameters are positional because backends name them differently
+    (`max_tokens` in v1, `max_words` in v2).
+    """
+
+    def append(
+        self,
+        memory_class: str,
+        records: List[Dict[str, Any]],
+        provenance: Dict[str, Any] | None,
+        /,
+    ) -> Dict[str, Any]: ...
+
+    def query(
+        self,
+        query: str,
+        memory_classes: List[str] | None,
+        top_k: int,
+        filters: Dict[str, Any] | None,
+    ) -> Dict[str, Any]: ...
+
+    def compact(self, memory_class: str, before_date: str, max_tokens: int, /) -> Dict[str, Any]: ...
+
+    def evict(
+        self,
+        memory_class: str,
+        selector: str,
+        reason_code: str,
+        return_tombstones: bool = True,
+    ) -> Dict[str, Any]: ...
+
+    def close(self) -> None: ...
+
+
+class MetricsHook(Protocol):
+    """Receives each finished operation record (see `Instrumentation.operation`)."""
+
+    def __call__(self, record: Dict[str, Any]) -> None: ...
+
+
+class Instrumentation:
+    """Opt-in per-operation timing spans and counters for memory backends.
+
+    `operation(op)` opens a record for the outermost call on the current thread; nested calls
+    (compact appending its summary, the daemon wrapping a dispatch) fold into that record. Finished
+    records carry `op`, `status`, `total_ms`, `spans_ms` and `counters`; they are passed to every
+    hook and, when `metrics_log` is set, appended to it as one JSON line.
+    """
+
+    def __init__(self, metrics_log: Path | None = None, hooks: Iterable[MetricsHook] = ()) -> None:
+        self.metrics_log = metrics_log
+        self.hooks: List[MetricsHook] = list(hooks)
+        self.last: Dict[str, Any] | None = None
+        self._local = threading.local()
+        self._log_lock = threading.Lock()
+
+    def add_hook(self, hook: MetricsHook) -> None:
+        self.hooks.append(hook)
+
+    def _current(self) -> Dict[str, Any] | None:
+        return getattr(self._local, "record", None)
+
+    @contextmanager
+    def operation(self, op: str) -> Iterator[Dict[str, Any]]:
+        current = self._current()
+        if current is not None:
+            yield current
+            return
+        record: Dict[str, Any] = {
+            "op": op,
+            "started_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "spans_ms": {},
+            "counters": {},
+        }
+        self._local.record = record
+        started = time.perf_counter()
+        status = "pass"
+        try:
+            yield record
+        except BaseException:
+            status = "fail"
+            raise
+        finally:
+            self._local.record = None
+            record["status"] = status
+            record["total_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+            record["spans_ms"] = {name: round(ms, 3) for name, ms in record["spans_ms"].items()}
+            self.last = record
+            self._emit(record)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, (time.perf_counter() - started) * 1000.0)
+
+    def add_span(self, name: str, elapsed_ms: float) -> None:
+        record = self._current()
+        if record is not None:
+            record["spans_ms"][name] = record["spans_ms"].get(name, 0.0) + elapsed_ms
+
+    def count(self, name: str, value: int = 1) -> None:
+        record = self._current()
+        if record is not None:
+            record["counters"][name] = record["counters"].get(name, 0) + int(value)
+
+    def _emit(self, record: Dict[str, Any]) -> None:
+        for hook in self.hooks:
+            try:
+                hook(record)
+            except Exception:
+                # A broken metrics consumer must never fail the memory operation it observes.
+                LOG.exception("memory metrics hook failed")
+        if self.metrics_log is not None:
+            line = json.dumps(record, sort_keys=True) + "\n"
+            with self._log_lock:
+                self.metrics_log.parent.mkdir(parents=True, exist_ok=True)
+                with self.metrics_log.open("a", encoding="utf-8") as f:
+                    f.write(line)
+
+
+class NullInstrumentation(Instrumentation):
+    """Default for uninstrumented backends: every span and counter is a no-op."""
+
+    _NULL_CONTEXT = nullcontext()
+
+    def operation(self, op: str) -> Any:
+        return nullcontext({})
+
+    def span(self, name: str) -> Any:
+        return self._NULL_CONTEXT
+
+    def add_span(self, name: str, elapsed_ms: float) -> None:
+        pass
+
+    def count(self, name: str, value: int = 1) -> None:
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+_Method = TypeVar("_Method", bound=Callable[..., Any])
+
+
+def instrumented(op: str) -> Callable[[_Method], _Method]:
+    """Run a backend method inside `self.instrumentation.operation(op)`."""
+
+    def decorate(method: _Method) -> _Method:
+        @functools.wraps(method)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            with self.instrumentation.operation(op):
+                return method(self, *args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def summarize_metrics_log(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Per-op count and nearest-rank p50/p95/p99/max of `total_ms` from a metrics JSONL log."""
+    samples: Dict[str, List[float]] = {}
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("status") == "pass":
+                samples.setdefault(str(record["op"]), []).append(float(record["total_ms"]))
+
+    def nearest_rank(ordered: List[float], pct: float) -> float:
+        return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+    summary: Dict[str, Dict[str, Any]] = {}
+    for op, values in sorted(samples.items()):
+        ordered = sorted(values)
+        summary[op] = {
+            "count": len(ordered),
+            "p50_ms": nearest_rank(ordered, 50),
+            "p95_ms": nearest_rank(ordered, 95),
+            "p99_ms": nearest_rank(ordered, 99),
+            "max_ms": ordered[-1],
+        }
+    return summary
+
+
+class MemoryBackendBase:
+    """Policy loading, TTL resolution and record building shared by the concrete backends."""
+
+    instrumentation: Instrumentation = NULL_INSTRUMENTATION
+
+    def _init_policy(self, policy_path: Path) -> None:
+        self.policy_path = policy_path
+        self.policy = self._load_json(policy_path)
+        self.memory_classes = self.policy.get("memory_classes", {})
+        self.requires_provenance = bool(
+            self.policy.get("merge_policy", {}).get("requires_provenance", True)
+        )
+        if not isinstance(self.memory_classes, dict) or not self.memory_classes:
+            raise ValueError("memory policy is invalid: memory_classes must be non-empty object")
+
+    @staticmethod
+    def _load_json(path: Path) -> Dict[str, Any]:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _sha256(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _safe_date(value: Any) -> date | None:
+        if not isinstance(value, str):
+            return None
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _now_utc() -> datetime:
+        return datetime.now(timezone.utc)
+
+    def _validate_memory_class(self, memory_class: str) -> None:
+        if memory_class not in self.memory_classes:
+            allowed = ", ".join(sorted(self.memory_classes.keys()))
+            raise ValueError(f"unknown memory_class '{memory_class}', allowed: {allowed}")
+
+    def _ttl_for_class(self, memory_class: str) -> timedelta:
+        config = self.memory_classes[memory_class]
+        if "ttl_hours" in config:
+            return timedelta(hours=int(config["ttl_hours"]))
+        if "ttl_days" in config:
+            return timedelta(days=int(config["ttl_days"]))
+        return timedelta(days=1)
+
+    def _validate_provenance(self, provenance: Dict[str, Any] | None) -> Dict[str, Any]:
+        provenance = provenance or {}
+        if self.requires_provenance and not provenance:
+            raise ValueError("provenance is required by memory policy")
+        return provenance
+
+    def _build_record(
+        self,
+        memory_class: str,
+        raw_record: Dict[str, Any],
+        provenance: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        return self._build_records(memory_class, [raw_record], provenance)[0]
+
+    def _build_records(
+        self,
+        memory_class: str,
+        raw_records: Iterable[Dict[str, Any]],
+        provenance: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """Build one append batch; the clock, TTL and source are read once and shared by every record.
+
+        Records of a batch share `created_at` and the `provenance` object. Ids stay
+        `sha256(canonical_hash:timestamp:source)[:24]`, so equal content within a batch maps to one
+        id, which the dedup already keeps once.
+        """
+        now = self._now_utc()
+        stamp = now.isoformat()
+        created_at = stamp.replace("+00:00", "Z")
+        expires_on = (now + self._ttl_for_class(memory_class)).date().isoformat()
+        id_suffix = f":{stamp}:{provenance.get('source', 'unknown')}"
+        sha256 = self._sha256
+
+        built: List[Dict[str, Any]] = []
+        for raw_record in raw_records:
+            if not isinstance(raw_record, dict):
+                raise ValueError("append records must be objects")
+            content = str(raw_record.get("content", "")).strip()
+            if not content:
+                raise ValueError("record.content must be non-empty")
+
+            canonical_hash = sha256(" ".join(content.lower().split()))
+
+            evidence_score = raw_record.get("evidence_score", 0.5)
+            try:
+                evidence_score = float(evidence_score)
+            except (ValueError, TypeError) as exc:
+                raise ValueError(f"record.evidence_score must be float-compatible ({exc})") from exc
+
+            tags = raw_record.get("tags", [])
+            if tags is None:
+                tags = []
+            if not isinstance(tags, list):
+                raise ValueError("record.tags must be a list when provided")
+
+            built.append(
+                {
+                    "record_id": sha256(canonical_hash + id_suffix)[:24],
+                    "memory_class": memory_class,
+                    "canonical_hash": canonical_hash,
+                    "content": content,
+                    "evidence_score": max(0.0, min(1.0, evidence_score)),
+                    "tags": [str(tag) for tag in tags],
+                    "created_at": created_at,
+                    "expires_on": expires_on,
+                    "provenance": provenance,
+                    "tombstone": False,
+                }
+            )
+        return built
+
+    def close(self) -> None:
+        """Release backend resources; file backends without handles have nothing to do."""
+
+
+def parse_json_value(raw: str, field_name: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, TypeError) as exc:
+        raise ValueError(f"{field_name} must be valid JSON ({exc})") from exc
+    if not isinstance(data, dict):
+        raise ValueError(f"{field_name} must be a JSON object")
+    return data
+
+
+def resolve_records_file_path(records_file: str, field_name: str = "records_file") -> Path:
+    """Resolve an input file named on the command line; it must stay inside the LDS root."""
+    path = Path(records_file)
+    candidate = path if path.is_absolute() else (ROOT / path)
+    resolved = candidate.resolve()
+    if ROOT_RESOLVED not in resolved.parents and resolved != ROOT_RESOLVED:
+        raise ValueError(f"{field_name} path must stay inside LDS root")
+    return resolved
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def open_ndjson(path: Path, mode: str = "r") -> IO[str]:
+    """Open an NDJSON file as text, gzip-compressed when reading gzip data or writing a `.gz` path."""
+    if mode.startswith("r"):
+        with path.open("rb") as f:
+            compressed = f.read(2) == GZIP_MAGIC
+    else:
+        compressed = path.suffix == ".gz"
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="\n")
+    return path.open(mode, encoding="utf-8", newline="\n")
+
+
+def iter_ndjson(stream: Iterable[str]) -> Iterator[tuple[int, Dict[str, Any]]]:
+    """Yield (line number, object) per non-blank line without reading the whole stream."""
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"line {line_no} is not valid JSON ({exc})") from exc
+        if not isinstance(data, dict):
+            raise ValueError(f"line {line_no} must be a JSON object")
+        yield line_no, data
+
+
+def load_records_from_args(records_file: str | None, record_values: List[str]) -> List[Dict[str, Any]]:
+    records: List[Dict[str, Any]] = []
+
+    if records_file:
+        path = resolve_records_file_path(records_file)
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            records.append(data)
+        elif isinstance(data, list):
+            for item in data:
+                if not isinstance(item, dict):
+                    raise ValueError("records file list must contain only objects")
+                records.append(item)
+        else:
+            raise ValueError("records file must be a JSON object or JSON array")
+
+    for raw in record_values:
+        records.append(parse_json_value(raw, "--record"))
+
+    if not records:
+        raise ValueError("no records provided")
+
+    return records
+
+
+def add_instrumentation_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Include the operation's timing spans and counters in the JSON output.",
+    )
+    parser.add_argument(
+        "--metrics-log",
+        default=None,
+        help="Append one JSON line of timings per operation to this file (relative to LDS root).",
+    )
+
+
+def instrumentation_from_args(args: argparse.Namespace) -> Instrumentation | None:
+    if not args.stats and not args.metrics_log:
+        return None
+    metrics_log = None
+    if args.metrics_log:
+        path = Path(args.metrics_log)
+        metrics_log = path if path.is_absolute() else ROOT / path
+    return Instrumentation(metrics_log=metrics_log)
+
+
+def add_operation_parsers(sub: argparse._SubParsersAction) -> Dict[str, argparse.ArgumentParser]:
+    """Add the append/query/compact/evict subcommands every backend CLI exposes."""
+    p_append = sub.add_parser("append", help="Append records to a memory class")
+    p_append.add_argument("--memory-class", required=True)
+    p_append.add_argument("--records-file", help="JSON file with object or array of objects")
+    p_append.add_argument("--record", action="append", default=[], help="Inline JSON record")
+    p_append.add_argument("--provenance", default="{}", help="Provenance JSON object")
+
+    p_query = sub.add_parser("query", help="Query records")
+    p_query.add_argument("--query", required=True)
+    p_query.add_argument("--memory-class", action="append", default=[])
+    p_query.add_argument("--top-k", type=int, default=5)
+    p_query.add_argument("--filters", default="{}", help="JSON object with optional filters")
+
+    p_compact = sub.add_parser("compact", help="Compact old records")
+    p_compact.add_argument("--memory-class", required=True)
+    p_compact.add_argument("--before-date", required=True, help="YYYY-MM-DD")
+    p_compact.add_argument(
+        "--max-words",
+        "--max-tokens",
+        dest="max_words",
+        type=int,
+        default=256,
+        help="Maximum words in compacted summary (legacy alias: --max-tokens).",
+    )
+
+    p_evict = sub.add_parser("evict", help="Evict records")
+    p_evict.add_argument("--memory-class", required=True)
+    p_evict.add_argument("--selector", required=True, choices=["expired", "all"])
+    p_evict.add_argument("--reason-code", required=True)
+    p_evict.add_argument(
+        "--counts-only",
+        action="store_true",
+        help="Return evicted_count without the tombstone id list.",
+    )
+
+    return {"append": p_append, "query": p_query, "compact": p_compact, "evict": p_evict}
+
+
+def request_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.cmd == "append":
+        return {
+            "op": "append",
+            "memory_class": args.memory_class,
+            "records": load_records_from_args(args.records_file, args.record),
+            "provenance": parse_json_value(args.provenance, "--provenance"),
+        }
+    if args.cmd == "query":
+        return {
+            "op": "query",
+            "query": args.query,
+            "memory_classes": args.memory_class or None,
+            "top_k": args.top_k,
+            "filters": parse_json_value(args.filters, "--filters"),
+        }
+    if args.cmd == "compact":
+        return {
+            "op": "compact",
+            "memory_class": args.memory_class,
+            "before_date": args.before_date,
+            "max_words": args.max_words,
+            "window": getattr(args, "window", None),
+            "window_rows": getattr(args, "window_rows", None),
+        }
+    if args.cmd == "evict":
+        return {
+            "op": "evict",
+            "memory_class": args.memory_class,
+            "selector": args.selector,
+            "reason_code": args.reason_code,
+            "counts_only": args.counts_only,
+        }
+    raise ValueError(f"unsupported command: {args.cmd}")
+
+
+def dispatch_request(adapter: MemoryBackend, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one lds-memory-api request object (`op` plus the operation fields) against a backend."""
+    op = str(request.get("op", "")).strip().lower()
+
+    if op == "append":
+        records = request.get("records")
+        if not isinstance(records, list) or not records:
+            raise ValueError("append.records must be a non-empty list")
+        provenance = request.get("provenance") or {}
+        if not isinstance(provenance, dict):
+            raise ValueError("append.provenance must be an object")
+        return adapter.append(str(request.get("memory_class", "")), records, provenance)
+    if op == "query":
+        classes = request.get("memory_classes") or None
+        if classes is not None and not isinstance(classes, list):
+            raise ValueError("query.memory_classes must be a list")
+        filters = request.get("filters") or {}
+        if not isinstance(filters, dict):
+            raise ValueError("query.filters must be an object")
+        return adapter.query(
+            str(request.get("query", "")),
+            classes,
+            int(request.get("top_k", 5)),
+            filters=filters,
+        )
+    if op == "compact":
+        max_words = request.get("max_words", request.get("max_tokens", 256))
+        # Windowing is a backend extension; only forward it when asked for.
+        window = {key: request[key] for key in ("window", "window_rows") if request.get(key) is not None}
+        return adapter.compact(
+            str(request.get("memory_class", "")),
+            str(request.get("before_date", "")),
+            int(max_words),
+            **window,
+        )
+    if op == "evict":
+        return adapter.evict(
+            str(request.get("memory_class", "")),
+            str(request.get("selector", "")),
+            str(request.get("reason_code", "")),
+            return_tombstones=not bool(request.get("counts_only", False)),
+        )
+    raise ValueError(f"unsupported op: {op or '<missing>'}")
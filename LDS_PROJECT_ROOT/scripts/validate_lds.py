@@ -562,6 +562,15 @@ def validate_runtime_contracts() -> List[str]:
         if required_glob not in denylist:
             errors.append(f"retrieval denylist missing required glob: {required_glob}")
 
+    memory_policy = load_json(ROOT / "contracts/memory/lds-memory-policy.json")
+    performance = memory_policy.get("performance")
+    if isinstance(performance, dict):
+        profiles = performance.get("profiles", {})
+        if performance.get("default_profile") not in profiles:
+            errors.append("memory policy violation: performance.default_profile is not a defined profile")
+        if "bulk_load" not in profiles:
+            errors.append("memory policy violation: performance.profiles missing required profile: bulk_load")
+
     token_budget = load_json(ROOT / "contracts/token/lds-token-budget.json")
     doc_limits = token_budget.get("document_limits", {})
     max_doc = doc_limits.get("max_tokens_per_doc")
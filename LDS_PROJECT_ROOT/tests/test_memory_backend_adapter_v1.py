@@ -1,8 +1,10 @@
 import importlib.util
+import json
 import tempfile
 from datetime import date, timedelta
 from pathlib import Path
 import unittest
+from unittest import mock
 
 ROOT = Path(__file__).resolve().parents[1]
 SCRIPT = ROOT / "scripts" / "memory_backend_adapter_v1.py"
@@ -97,6 +99,86 @@ class MemoryBackendAdapterV1Tests(unittest.TestCase):
         after = adapter._load_records("episodic")
         self.assertTrue(any("compacted_into" in rec for rec in after))
 
+    def test_segmented_log_appends_updates_and_merges(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = Path(tmp.name)
+        adapter = self.mod.MemoryBackendAdapterV1(
+            ROOT / "contracts/memory/lds-memory-policy.json",
+            store,
+            segment_max_bytes=512,
+            background_merge=False,
+        )
+
+        for batch in range(6):
+            adapter.append(
+                "short_term",
+                [{"content": f"venue latency note {batch}-{i}", "evidence_score": 0.5} for i in range(3)],
+                {"source": "unit-test", "trace_id": f"s-{batch}"},
+            )
+        segments = adapter._segment_paths("short_term")
+        self.assertGreater(len(segments), 1, "small segment_max_bytes must roll segments")
+        sealed_sizes = {path: path.stat().st_size for path in segments[:-1]}
+
+        evicted = adapter.evict("short_term", "all", "manual")
+        self.assertEqual(evicted["evicted_count"], 18)
+        for path, size in sealed_sizes.items():
+            self.assertEqual(path.stat().st_size, size, "evict must append, not rewrite sealed segments")
+        self.assertEqual(adapter.query("latency", ["short_term"], top_k=3, filters={})["results"], [])
+
+        merged = adapter.merge("short_term")
+        self.assertEqual(merged["record_count"], 18)
+        self.assertLess(merged["bytes_after"], merged["bytes_before"])
+        base = store / "short_term.jsonl"
+        lines = [json.loads(line) for line in base.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(len(lines), 18)
+        self.assertTrue(all(rec["tombstone"] and "op" not in rec for rec in lines))
+        self.assertTrue(all(path == base or path.stat().st_size == 0 for path in adapter._segment_paths("short_term")))
+
+        again = adapter.append(
+            "short_term",
+            [{"content": "venue latency note 0-0"}],
+            {"source": "unit-test", "trace_id": "s-again"},
+        )
+        self.assertEqual(again["accepted_count"], 1, "tombstoned hashes must not block re-append")
+
+    def test_sidecar_index_skips_dead_lines_and_tracks_staleness(self):
+        tmp, adapter = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        store = Path(tmp.name)
+
+        adapter.append(
+            "short_term",
+            [{"content": f"venue latency note {i}", "evidence_score": 0.5} for i in range(6)],
+            {"source": "unit-test", "trace_id": "i-1"},
+        )
+        live_ids = [rec["record_id"] for rec in adapter._load_records("short_term")][:2]
+        adapter.evict("short_term", "all", "manual")
+        adapter.append(
+            "short_term",
+            [{"content": "venue latency note 0"}, {"content": "venue latency note 1"}],
+            {"source": "unit-test", "trace_id": "i-2"},
+        )
+        adapter.close()
+        self.assertTrue((store / "short_term.idx").exists())
+
+        with mock.patch.object(self.mod.json, "loads", wraps=json.loads) as loads:
+            results = adapter.query("latency", ["short_term"], top_k=10, filters={})["results"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(loads.call_count, 2, "tombstoned lines must be skipped without decoding")
+        self.assertFalse({item["record_id"] for item in results} & set(live_ids))
+
+        other = self.mod.MemoryBackendAdapterV1(ROOT / "contracts/memory/lds-memory-policy.json", store)
+        other.append("short_term", [{"content": "gateway outage"}], {"source": "unit-test"})
+        dup = adapter.append("short_term", [{"content": "Gateway  outage"}], {"source": "unit-test"})
+        self.assertEqual(dup["accepted_count"], 0, "index must catch up on tails written by other writers")
+
+        records = adapter._load_records("short_term")
+        path = store / "short_term.jsonl"
+        path.write_text("".join(json.dumps(rec) + "\n" for rec in records[-1:]), encoding="utf-8")
+        fresh = adapter.append("short_term", [{"content": "venue latency note 0"}], {"source": "unit-test"})
+        self.assertEqual(fresh["accepted_count"], 1, "a shrunk segment must force an index rebuild")
+
 
 if __name__ == "__main__":
     unittest.main()
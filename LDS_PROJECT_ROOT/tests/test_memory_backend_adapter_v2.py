@@ -1,12 +1,19 @@
+import asyncio
 import importlib.util
 import json
+import sqlite3
+import subprocess
+import sys
 import tempfile
+import threading
 from datetime import date, timedelta
 from pathlib import Path
 import unittest
+from unittest import mock
 
 ROOT = Path(__file__).resolve().parents[1]
 SCRIPT = ROOT / "scripts" / "memory_backend_adapter_v2.py"
+SCRIPT_V1 = ROOT / "scripts" / "memory_backend_adapter_v1.py"
 
 
 def load_module(path: Path, name: str):
@@ -60,6 +67,61 @@ class MemoryBackendAdapterV2Tests(unittest.TestCase):
         self.assertGreaterEqual(len(query["results"]), 1)
         self.assertIn("latency", query["results"][0]["evidence"]["content"].lower())
 
+    def test_performance_profiles_apply_pragmas_and_switch(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+        policy = ROOT / "contracts/memory/lds-memory-policy.json"
+        profiles = json.loads(policy.read_text(encoding="utf-8"))["performance"]["profiles"]
+
+        def pragma(conn, name):
+            return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+        self.assertEqual(adapter.performance_profile, "balanced")
+        self.assertEqual(pragma(adapter.conn, "synchronous"), 1)
+        self.assertEqual(pragma(adapter.conn, "cache_size"), -profiles["balanced"]["cache_size_kib"])
+        self.assertEqual(pragma(adapter.conn, "temp_store"), 2)
+
+        adapter.set_performance_profile("bulk_load")
+        self.assertEqual(pragma(adapter.conn, "synchronous"), 0)
+        self.assertEqual(pragma(adapter.conn, "wal_autocheckpoint"), profiles["bulk_load"]["wal_autocheckpoint_pages"])
+        adapter.append("episodic", [{"content": f"bulk row {i}"} for i in range(50)], {"source": "unit-test"})
+        adapter.set_performance_profile("durable")
+        self.assertEqual(pragma(adapter.conn, "synchronous"), 2)
+
+        reader = self.mod.MemoryBackendAdapterV2(policy, db_path, read_only=True, performance_profile="read_heavy")
+        self.addCleanup(reader.close)
+        self.assertEqual(pragma(reader.conn, "cache_size"), -profiles["read_heavy"]["cache_size_kib"])
+        self.assertEqual(len(reader._load_records("episodic")), 50)
+
+        with self.assertRaises(ValueError):
+            self.mod.MemoryBackendAdapterV2(policy, db_path, performance_profile="turbo")
+
+    def test_cli_bulk_load_restores_profile_when_command_fails(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        adapter.close()
+
+        at_close = []
+        real_close = self.mod.MemoryBackendAdapterV2.close
+
+        def recording_close(backend):
+            at_close.append((backend.performance_profile, backend.conn.execute("PRAGMA synchronous").fetchone()[0]))
+            real_close(backend)
+
+        argv = ["memory_backend_adapter_v2.py", "--db-path", str(db_path), "migrate", "--bulk-load"]
+        with (
+            mock.patch.object(self.mod.MemoryBackendAdapterV2, "migrate", side_effect=RuntimeError("disk full")),
+            mock.patch.object(self.mod.MemoryBackendAdapterV2, "close", recording_close),
+            mock.patch.object(self.mod.logging, "basicConfig"),
+            mock.patch.object(sys, "argv", argv),
+            mock.patch("builtins.print") as printed,
+            self.assertLogs(self.mod.LOG, "ERROR"),
+        ):
+            self.assertEqual(self.mod.main(), 1)
+        self.assertEqual(at_close, [("balanced", 1)])
+        self.assertIn("disk full", printed.call_args.args[0])
+
     def test_evict_expired_records(self):
         tmp, adapter, _ = self.make_adapter()
         self.addCleanup(tmp.cleanup)
@@ -87,6 +149,110 @@ class MemoryBackendAdapterV2Tests(unittest.TestCase):
         self.assertTrue(rows[0]["tombstone"])
         self.assertEqual(rows[0]["tombstone_reason"], "ttl_expired")
 
+    def test_evict_all_counts_only_and_legacy_sqlite_path(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        adapter.append(
+            "short_term",
+            [{"content": f"Churn record {i}"} for i in range(50)],
+            {"source": "unit-test", "trace_id": "v2-e2"},
+        )
+        adapter.append(
+            "episodic",
+            [{"content": f"Episode {i}"} for i in range(5)],
+            {"source": "unit-test", "trace_id": "v2-e3"},
+        )
+
+        counted = adapter.evict("short_term", "all", "bulk_reset", return_tombstones=False)
+        self.assertEqual(counted, {"evicted_count": 50, "tombstones": []})
+
+        with mock.patch.object(self.mod.sqlite3, "sqlite_version_info", (3, 31, 0)):
+            legacy = adapter.evict("episodic", "all", "bulk_reset")
+        self.assertEqual(legacy["evicted_count"], 5)
+        self.assertEqual(len(set(legacy["tombstones"])), 5)
+
+        live = adapter.conn.execute("SELECT count(*) FROM memory_records WHERE tombstone = 0").fetchone()[0]
+        self.assertEqual(live, 0)
+
+    def test_purge_respects_retention_and_compliance_hold_then_vacuums(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        adapter.append(
+            "episodic",
+            [{"content": f"settlement break {i} " + "detail " * 150} for i in range(400)],
+            {"source": "unit-test"},
+        )
+        held_ids = [row[0] for row in adapter.conn.execute("SELECT record_id FROM memory_records ORDER BY rowid")][::10]
+        adapter.append("episodic", [{"content": "recently evicted note"}], {"source": "unit-test"})
+        adapter.append("long_term", [{"content": "live desk policy"}], {"source": "unit-test"})
+        adapter.evict("episodic", "all", "manual_review")
+        with adapter.conn:
+            adapter.conn.execute(
+                "UPDATE memory_records SET tombstoned_on = '2020-01-01' WHERE content != 'recently evicted note'"
+            )
+            adapter.conn.executemany(
+                "UPDATE memory_records SET compliance_hold = 1 WHERE record_id = ?", [(rid,) for rid in held_ids]
+            )
+
+        out = adapter.purge(retention_days=30, batch_size=64)
+        self.assertEqual(out["purged_count"], 360)
+        self.assertEqual(out["classes"]["episodic"], 360)
+        remaining = adapter.conn.execute(
+            "SELECT compliance_hold, content FROM memory_records WHERE memory_class = 'episodic'"
+        ).fetchall()
+        self.assertEqual(sum(1 for row in remaining if row["compliance_hold"]), 40)
+        self.assertIn("recently evicted note", [row["content"] for row in remaining])
+        self.assertEqual(len(remaining), 41)
+        self.assertEqual(len(adapter._load_records("long_term")), 1)
+        orphan_tags = adapter.conn.execute(
+            "SELECT count(*) FROM memory_record_tags WHERE record_id NOT IN (SELECT record_id FROM memory_records)"
+        ).fetchone()[0]
+        self.assertEqual(orphan_tags, 0)
+
+        adapter.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        size_before = db_path.stat().st_size
+        report = adapter.maintain(time_budget_seconds=30.0, pages_per_step=16)
+        self.assertEqual(report["auto_vacuum"], "incremental")
+        self.assertGreater(report["reclaimed_bytes"], 0)
+        self.assertEqual(report["free_bytes_remaining"], 0)
+        self.assertTrue(report["optimized"])
+        self.assertLess(db_path.stat().st_size, size_before)
+
+        exhausted = adapter.maintain(time_budget_seconds=0.0)
+        self.assertFalse(exhausted["optimized"])
+        self.assertTrue(exhausted["budget_exhausted"])
+
+    def test_purge_ages_legacy_tombstones_without_tombstoned_on_by_created_at(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        adapter.append(
+            "episodic",
+            [
+                {"content": "old legacy tombstone"},
+                {"content": "old held legacy tombstone"},
+                {"content": "recent legacy tombstone"},
+            ],
+            {"source": "unit-test"},
+        )
+        adapter.evict("episodic", "all", "legacy")
+        with adapter.conn:
+            adapter.conn.execute("UPDATE memory_records SET tombstoned_on = NULL")
+            adapter.conn.execute("UPDATE memory_records SET compliance_hold = 1 WHERE content LIKE '%held%'")
+            adapter.conn.execute(
+                "UPDATE memory_records SET created_at = '2020-01-10T10:00:00Z' WHERE content LIKE 'old%'"
+            )
+
+        out = adapter.purge(retention_days=30)
+        self.assertEqual(out["purged_count"], 1)
+        remaining = [row[0] for row in adapter.conn.execute("SELECT content FROM memory_records ORDER BY rowid")]
+        self.assertEqual(remaining, ["old held legacy tombstone", "recent legacy tombstone"])
+
     def test_compact_old_records_creates_summary(self):
         tmp, adapter, _ = self.make_adapter()
         self.addCleanup(tmp.cleanup)
@@ -113,6 +279,84 @@ class MemoryBackendAdapterV2Tests(unittest.TestCase):
         rows = adapter._load_records("episodic")
         self.assertTrue(any(rec.get("compacted_into") for rec in rows))
 
+    def test_windowed_compaction_resumes_after_interruption(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        appended = adapter.append(
+            "episodic",
+            [{"content": f"clearing backlog note {i} " + "filler " * 20, "evidence_score": 0.1 * i} for i in range(9)],
+            {"source": "unit-test"},
+        )
+        with adapter.conn:
+            adapter.conn.execute(
+                "UPDATE memory_records SET created_at = '2020-01-0' || (1 + (rowid - 1) / 3) || 'T10:00:00Z' "
+                "WHERE memory_class = 'episodic'"
+            )
+
+        original = adapter._bump_generation
+        calls = {"n": 0}
+
+        def flaky_bump(memory_class):
+            calls["n"] += 1
+            if calls["n"] == 2:
+                raise RuntimeError("simulated interruption")
+            original(memory_class)
+
+        with mock.patch.object(adapter, "_bump_generation", side_effect=flaky_bump):
+            with self.assertRaises(RuntimeError):
+                adapter.compact("episodic", "2020-12-31", max_words=5, window="day")
+        linked = [rec for rec in adapter._load_records("episodic") if rec.get("compacted_into")]
+        self.assertEqual(len(linked), 3, "only the first day's window committed")
+
+        resumed = adapter.compact("episodic", "2020-12-31", max_words=5, window="day")
+        self.assertTrue(resumed["resumed"])
+        self.assertEqual(resumed["windows"], 2)
+        self.assertEqual(resumed["compacted_count"], 6)
+        self.assertIsNone(adapter._get_meta("compaction.episodic.cursor"))
+
+        records = {rec["record_id"]: rec for rec in adapter._load_records("episodic")}
+        summaries = [rec for rec in records.values() if "compacted-summary" in rec["tags"]]
+        self.assertEqual(len(summaries), 3)
+        self.assertTrue(all(len(rec["content"].split()) == 5 for rec in summaries))
+        self.assertTrue(all(records[record_id]["compacted_into"] for record_id in appended["record_ids"]))
+
+        again = adapter.compact("episodic", "2020-12-31", max_words=5, window="rows", window_rows=2)
+        self.assertEqual((again["compacted_count"], again["windows"]), (0, 0), "compacted rows are not revisited")
+
+    def test_windowed_compaction_through_today_skips_its_own_summaries(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        adapter.append("episodic", [{"content": f"margin call note {i}"} for i in range(5)], {"source": "unit-test"})
+        out = adapter.compact("episodic", date.today().isoformat(), max_words=8, window="rows", window_rows=3)
+        self.assertEqual((out["compacted_count"], out["windows"]), (5, 2))
+
+        summaries = [rec for rec in adapter._load_records("episodic") if "compacted-summary" in rec["tags"]]
+        self.assertEqual(sorted(rec["record_id"] for rec in summaries), sorted(out["summary_ids"]))
+        self.assertTrue(all(not rec.get("compacted_into") for rec in summaries), "summaries are not re-compacted")
+
+    def test_windowed_compaction_counts_only_linked_rows_when_summary_dedups_into_window(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        appended = adapter.append(
+            "episodic",
+            [{"content": "desk alpha"}, {"content": "desk beta"}, {"content": "desk gamma"}],
+            {"source": "unit-test"},
+        )
+        alpha, beta, gamma = appended["record_ids"]
+        # Window 1 is alpha+beta cut to alpha's two words; window 2 is gamma alone. Both summaries
+        # dedup against a row of their own window.
+        out = adapter.compact("episodic", date.today().isoformat(), max_words=2, window="rows", window_rows=2)
+        self.assertEqual(out, {"compacted_count": 1, "summary_ids": [], "windows": 2, "resumed": False})
+
+        links = {rec["record_id"]: rec.get("compacted_into") for rec in adapter._load_records("episodic")}
+        self.assertEqual(links, {alpha: None, beta: alpha, gamma: None})
+
     def test_query_honors_min_evidence_filter(self):
         tmp, adapter, _ = self.make_adapter()
         self.addCleanup(tmp.cleanup)
@@ -136,9 +380,892 @@ class MemoryBackendAdapterV2Tests(unittest.TestCase):
         self.assertEqual(len(out["results"]), 1)
         self.assertIn("high confidence", out["results"][0]["evidence"]["content"].lower())
 
+    def test_query_required_tags_use_tag_table(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+
+        adapter.append(
+            "long_term",
+            [
+                {"content": "Venue outage runbook", "tags": ["ops", "venue"]},
+                {"content": "Venue outage postmortem", "tags": ["venue"]},
+                {"content": "Venue outage draft", "tags": []},
+            ],
+            {"source": "unit-test", "trace_id": "v2-t3"},
+        )
+        out = adapter.query("outage", ["long_term"], top_k=5, filters={"required_tags": ["venue", "ops"]})
+        self.assertEqual([item["evidence"]["content"] for item in out["results"]], ["Venue outage runbook"])
+
+        # Simulate a 2.3.0 store created before memory_record_tags existed; reopening backfills it.
+        adapter.conn.executescript(
+            """
+            DROP TRIGGER memory_record_tags_ai;
+            DROP TRIGGER memory_record_tags_ad;
+            DROP TRIGGER memory_record_tags_au;
+            DROP TABLE memory_record_tags;
+            UPDATE backend_meta SET value = '2.3.0' WHERE key = 'schema_version';
+            """
+        )
+        adapter.close()
+
+        reopened = self.mod.MemoryBackendAdapterV2(
+            ROOT / "contracts/memory/lds-memory-policy.json",
+            db_path,
+        )
+        self.addCleanup(reopened.close)
+        tag_rows = reopened.conn.execute("SELECT count(*) FROM memory_record_tags").fetchone()[0]
+        self.assertEqual(tag_rows, 3)
+        out = reopened.query("outage", ["long_term"], top_k=5, filters={"required_tags": ["venue"]})
+        self.assertEqual(len(out["results"]), 2)
+
+    def make_legacy_store(self, db_path: Path, rows: int) -> None:
+        """Write a schema 2.0.0 store the way the original adapter did."""
+        conn = sqlite3.connect(str(db_path))
+        conn.executescript(
+            """
+            CREATE TABLE memory_records (
+                record_id TEXT PRIMARY KEY,
+                memory_class TEXT NOT NULL,
+                canonical_hash TEXT NOT NULL,
+                content TEXT NOT NULL,
+                evidence_score REAL NOT NULL,
+                tags_json TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                expires_on TEXT NOT NULL,
+                provenance_json TEXT NOT NULL,
+                tombstone INTEGER NOT NULL DEFAULT 0,
+                tombstone_reason TEXT,
+                tombstoned_on TEXT,
+                compacted_into TEXT,
+                compliance_hold INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE backend_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at TEXT NOT NULL);
+            INSERT INTO backend_meta VALUES ('schema_version', '2.0.0', '2026-02-18T00:00:00Z');
+            """
+        )
+        expires = (date.today() + timedelta(days=30)).isoformat()
+        conn.executemany(
+            "INSERT INTO memory_records VALUES (?, 'long_term', ?, ?, 0.5, ?, '2026-02-18T00:00:00Z', ?, "
+            "'{\"source\": \"legacy\"}', 0, NULL, NULL, NULL, 0)",
+            [
+                (f"legacy-{i}", f"hash-{i}", f"Legacy clearing note {i}", json.dumps([f"t{i % 3}"]), expires)
+                for i in range(rows)
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+    def test_migrate_dry_run_then_resumable_batches(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db_path = Path(tmp.name) / "legacy.sqlite3"
+        self.make_legacy_store(db_path, rows=25)
+        policy = ROOT / "contracts/memory/lds-memory-policy.json"
+
+        planner = self.mod.MemoryBackendAdapterV2(policy, db_path, auto_migrate=False)
+        plan = planner.migrate(dry_run=True)
+        self.assertEqual(plan["from_version"], "2.0.0")
+        self.assertEqual([step["version"] for step in plan["steps"]], ["2.1.0", "2.2.0", "2.3.0", "2.4.0", "2.5.0", "2.6.0", "2.7.0", "2.8.0"])
+        self.assertTrue(all(step["estimated_rows"] == 25 for step in plan["steps"]))
+        self.assertEqual(planner.schema_version(), "2.0.0")
+
+        def interrupt_second_batch(name):
+            original = getattr(planner, name)
+            calls = {"n": 0}
+
+            def flaky_backfill(lo_rowid, hi_rowid):
+                calls["n"] += 1
+                if calls["n"] == 2:
+                    raise sqlite3.OperationalError("simulated interruption")
+                return original(lo_rowid, hi_rowid)
+
+            setattr(planner, name, flaky_backfill)
+            with self.assertRaises(RuntimeError):
+                planner.migrate(batch_size=10)
+            setattr(planner, name, original)
+
+        # Interrupt the 2.3.0 FTS backfill, then the 2.4.0 tag backfill, after their first batch.
+        interrupt_second_batch("_migrate_fts_backfill")
+        self.assertEqual(planner.schema_version(), "2.2.0")
+        self.assertEqual(planner._get_meta("migration.2.3.0.cursor"), "10")
+        interrupt_second_batch("_migrate_tags_backfill")
+        self.assertEqual(planner.schema_version(), "2.3.0")
+        self.assertEqual(planner._get_meta("migration.2.4.0.cursor"), "10")
+        planner.close()
+
+        adapter = self.mod.MemoryBackendAdapterV2(policy, db_path)
+        self.addCleanup(adapter.close)
+        self.assertEqual(adapter.schema_version(), adapter.SCHEMA_VERSION)
+        self.assertEqual(adapter.pending_migrations(), [])
+        self.assertTrue(adapter.fts_enabled)
+        self.assertTrue(adapter.bulk_insert_enabled)
+        tag_rows = adapter.conn.execute("SELECT count(*) FROM memory_record_tags").fetchone()[0]
+        self.assertEqual(tag_rows, 25)
+        fts_rows = adapter.conn.execute(
+            "SELECT count(*) FROM memory_records_fts WHERE memory_records_fts MATCH 'clearing'"
+        ).fetchone()[0]
+        self.assertEqual(fts_rows, 25)
+        self.assertEqual(len(adapter.query("clearing", ["long_term"], top_k=50, filters={})["results"]), 25)
+
+        out = adapter.query("clearing", ["long_term"], top_k=50, filters={"required_tags": ["t1"], "ranking": "bm25"})
+        self.assertEqual(len(out["results"]), 8)
+
+    def test_migrate_from_v1_preserves_fields_and_resumes(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = Path(tmp.name) / "v1"
+        policy = ROOT / "contracts/memory/lds-memory-policy.json"
+        v1_mod = load_module(SCRIPT_V1, "memory_backend_adapter_v1")
+        v1 = v1_mod.MemoryBackendAdapterV1(policy, store, segment_max_bytes=1024, background_merge=False)
+        for batch in range(4):
+            v1.append(
+                "episodic",
+                [{"content": f"settlement drift note {batch}-{i}", "tags": [f"t{i}"]} for i in range(4)],
+                {"source": "unit-test", "batch": batch},
+            )
+        records = v1._load_records("episodic")
+        for rec in records:
+            rec["created_at"] = "2020-01-10T10:00:00Z"
+        v1._write_records("episodic", records)
+        v1.compact("episodic", "2020-12-31", max_tokens=8)
+        v1.append("short_term", [{"content": "gateway outage"}], {"source": "unit-test"})
+        v1.evict("short_term", "all", "manual")
+        v1.close()
+        expected = {rec["record_id"]: rec for cls in ("episodic", "short_term") for rec in v1._load_records(cls)}
+
+        adapter = self.mod.MemoryBackendAdapterV2(policy, Path(tmp.name) / "v2.sqlite3")
+        self.addCleanup(adapter.close)
+        original = adapter._v1_apply_batch
+        calls = {"n": 0}
+
+        def flaky_batch(*args):
+            calls["n"] += 1
+            if calls["n"] == 3:
+                raise RuntimeError("simulated interruption")
+            return original(*args)
+
+        with mock.patch.object(adapter, "_v1_apply_batch", side_effect=flaky_batch):
+            with self.assertRaises(RuntimeError):
+                adapter.migrate_from_v1(store, batch_size=5)
+        checkpoint = json.loads(adapter._get_meta("v1_import.episodic.cursor"))
+        self.assertGreater(checkpoint["offset"], 0)
+
+        report = adapter.migrate_from_v1(store, batch_size=5)
+        self.assertEqual(report["classes"]["episodic"]["resumed_from"], checkpoint)
+        self.assertEqual(report["classes"]["episodic"]["skipped"], 0)
+
+        migrated = {rec["record_id"]: rec for cls in ("episodic", "short_term") for rec in adapter._load_records(cls)}
+        self.assertEqual(set(migrated), set(expected))
+        for record_id, rec in expected.items():
+            for field in ("canonical_hash", "content", "created_at", "expires_on", "tags", "provenance"):
+                self.assertEqual(migrated[record_id][field], rec[field], field)
+            for field in ("tombstone", "tombstone_reason", "tombstoned_on", "compacted_into"):
+                self.assertEqual(migrated[record_id][field], rec.get(field, None if field != "tombstone" else False))
+        self.assertEqual(sum(1 for rec in migrated.values() if rec["compacted_into"]), 16)
+
+        again = adapter.migrate_from_v1(store)
+        self.assertEqual(again["classes"]["episodic"]["lines_read"], 0, "rerun must only read new lines")
+
+    def test_ndjson_export_import_round_trip_with_filters_and_batches(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+        root = Path(tmp.name)
+
+        appended = adapter.append(
+            "episodic",
+            [{"content": f"venue outage {i}", "tags": ["venue"], "evidence_score": 0.7} for i in range(5)],
+            {"source": "unit-test", "trace_id": "v2-x1"},
+        )
+        adapter.append("long_term", [{"content": "desk runbook"}], {"source": "unit-test"})
+        with adapter.conn:
+            adapter.conn.execute(
+                "UPDATE memory_records SET created_at = '2024-01-10T08:00:00Z', created_epoch = ? WHERE record_id = ?",
+                (adapter._iso_epoch("2024-01-10T08:00:00Z"), appended["record_ids"][0]),
+            )
+        adapter.evict("episodic", "all", "manual_review", return_tombstones=False)
+        adapter.append("episodic", [{"content": "venue outage 1"}], {"source": "unit-test"})
+
+        live = adapter.export_records(root / "live", compress=True)
+        self.assertEqual({name: entry["records"] for name, entry in live["classes"].items()},
+                         {"episodic": 1, "long_term": 1, "short_term": 0})
+        self.assertTrue(Path(live["classes"]["episodic"]["path"]).name.endswith(".ndjson.gz"))
+        dated = adapter.export_records(
+            root / "dated", ["episodic"], since="2024-01-01", until="2024-01-31", tombstones="only"
+        )
+        self.assertEqual(dated["classes"]["episodic"]["records"], 1)
+        full = adapter.export_records(root / "full", ["episodic"], tombstones="include")
+        self.assertEqual(full["classes"]["episodic"]["records"], 6)
+        self.assertEqual(sorted(p.name for p in (root / "full").iterdir()), ["episodic.ndjson"])
+
+        restored = self.mod.MemoryBackendAdapterV2(ROOT / "contracts/memory/lds-memory-policy.json", root / "restored.db")
+        self.addCleanup(restored.close)
+        seen = []
+        out = restored.import_records(root / "full" / "episodic.ndjson", batch_size=4, progress=seen.append)
+        self.assertEqual((out["imported"], out["skipped"], out["batches"]), (6, 0, 2))
+        self.assertEqual([totals["lines_read"] for totals in seen], [4, 6])
+        self.assertEqual(restored._load_records("episodic"), adapter._load_records("episodic"))
+        gz = restored.import_records(Path(live["classes"]["long_term"]["path"]))
+        self.assertEqual(gz["imported"], 1)
+        self.assertEqual(restored.import_records(root / "full" / "episodic.ndjson")["skipped"], 6)
+
+        raw = root / "raw.ndjson"
+        raw.write_text(
+            '{"content": "clearing delay"}\n\n{"content": "clearing  DELAY"}\n'
+            '{"content": "fx gap", "memory_class": "long_term", "provenance": {"source": "feed"}}\n{"content": ""}\n',
+            encoding="utf-8",
+        )
+        with self.assertRaisesRegex(ValueError, "line 5: record.content must be non-empty"):
+            restored.import_records(raw, "short_term", {"source": "bulk"}, batch_size=2)
+        self.assertEqual(
+            [(rec["content"], rec["provenance"]["source"]) for rec in restored._load_records("short_term")],
+            [("clearing delay", "bulk")],
+        )
+        self.assertNotIn("fx gap", [rec["content"] for rec in restored._load_records("long_term")], "batch in flight")
+
+    def test_snapshot_is_consistent_under_concurrent_writes_and_restore_verifies_manifest(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+        policy = ROOT / "contracts/memory/lds-memory-policy.json"
+        root = Path(tmp.name)
+
+        adapter.append("episodic", [{"content": f"fill incident {i} " + "detail " * 60} for i in range(300)], {"source": "unit-test"})
+        stepped = adapter.snapshot(root / "snap" / "a.sqlite3", pages_per_step=8, step_sleep_ms=0)
+        self.assertEqual(stepped["mode"], "stepped")
+        self.assertGreater(stepped["steps"], 1)
+        manifest = json.loads(Path(stepped["manifest_path"]).read_text(encoding="utf-8"))
+        self.assertEqual(manifest["row_counts"]["by_class"], {"episodic": {"live": 300, "tombstoned": 0}})
+        self.assertEqual(manifest["schema_version"], self.mod.MemoryBackendAdapterV2.SCHEMA_VERSION)
+
+        writer = self.mod.MemoryBackendAdapterV2(policy, db_path)
+        self.addCleanup(writer.close)
+        written = []
+
+        def write_from_other_connection(_):
+            written.append(writer.append("short_term", [{"content": f"late note {len(written)}"}], {"source": "unit-test"}))
+
+        raced = adapter.snapshot(root / "snap" / "b.sqlite3", pages_per_step=8, step_sleep_ms=0, progress=write_from_other_connection)
+        self.assertEqual(raced["mode"], "single_pass")
+        self.assertGreater(raced["restarts"], adapter.BACKUP_MAX_RESTARTS)
+        self.assertEqual(adapter.verify_snapshot(Path(raced["snapshot_path"]))["sha256"], raced["manifest"]["sha256"])
+        self.assertEqual(raced["manifest"]["row_counts"]["by_class"]["short_term"]["live"], len(written))
+
+        reader = self.mod.MemoryBackendAdapterV2(policy, db_path, read_only=True, query_cache_size=8)
+        self.addCleanup(reader.close)
+        self.assertEqual(len(reader.query("late note", ["short_term"], 20, filters={})["results"]), len(written))
+        adapter.evict("episodic", "all", "manual_review", return_tombstones=False)
+
+        restored = adapter.restore(Path(stepped["snapshot_path"]))
+        self.assertEqual(restored["row_counts"]["memory_records"], 300)
+        self.assertEqual(len(adapter.query("fill incident", ["episodic"], 5, filters={})["results"]), 5)
+        self.assertEqual(reader.query("late note", ["short_term"], 20, filters={})["results"], [], "cached result survived restore")
+        self.assertEqual(adapter.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+        corrupted = root / "snap" / "c.sqlite3"
+        corrupted.write_bytes(Path(stepped["snapshot_path"]).read_bytes()[:-1] + b"\x01")
+        Path(str(corrupted) + ".manifest.json").write_text(Path(stepped["manifest_path"]).read_text(encoding="utf-8"), encoding="utf-8")
+        with self.assertRaisesRegex(ValueError, "sha256"):
+            adapter.restore(corrupted)
+        self.assertEqual(adapter._snapshot_row_counts(adapter.conn)["memory_records"], 300)
+
+    def test_sharded_backend_routes_by_class_and_namespace_and_merges_top_k(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db_path = Path(tmp.name) / "lds_memory.sqlite3"
+        policy = ROOT / "contracts/memory/lds-memory-policy.json"
+        sharded = self.mod.ShardedMemoryBackendV2(policy, db_path, sharding={"mode": "class_namespace", "query_workers": 3})
+        self.addCleanup(sharded.close)
+        single = self.mod.MemoryBackendAdapterV2(policy, Path(tmp.name) / "single.sqlite3")
+        self.addCleanup(single.close)
+
+        batches = [
+            ("short_term", {"source": "unit-test", "namespace": "desk-a"}, ["spread spread risk", "spread note"]),
+            ("short_term", {"source": "unit-test", "namespace": "desk-b"}, ["spread spread spread risk"]),
+            ("long_term", {"source": "unit-test"}, ["spread policy", "venue list"]),
+        ]
+        for memory_class, provenance, contents in batches:
+            records = [{"content": content, "evidence_score": 0.5 - 0.1 * i} for i, content in enumerate(contents)]
+            sharded.append(memory_class, records, provenance)
+            single.append(memory_class, records, provenance)
+
+        shard_files = sorted(p.relative_to(sharded.shard_dir).as_posix() for p in sharded.shard_dir.rglob("*.sqlite3"))
+        self.assertEqual(shard_files, ["long_term/default.sqlite3", "short_term/desk-a.sqlite3", "short_term/desk-b.sqlite3"])
+        self.assertFalse(db_path.exists())
+
+        merged = sharded.query("spread", None, 3, filters={})
+        self.assertEqual(merged["shards"], 3)
+        expected = single.query("spread", None, 3, filters={})["results"]
+        self.assertEqual([(r["score"], r["evidence"]["content"]) for r in merged["results"]],
+                         [(r["score"], r["evidence"]["content"]) for r in expected])
+        only_a = sharded.query("spread", ["short_term"], 5, filters={"namespace": "desk-a"})
+        self.assertEqual({r["evidence"]["content"] for r in only_a["results"]}, {"spread spread risk", "spread note"})
+
+        with self.assertRaises(ValueError):
+            sharded.append("short_term", [{"content": "x"}], {"source": "unit-test", "namespace": "../escape"})
+        self.assertEqual(sharded.evict("short_term", "all", "manual", return_tombstones=False)["evicted_count"], 3)
+
+        # A writer holding one class's shard lock does not block another class's writes.
+        blocker = sqlite3.connect(str(sharded._shard_path("short_term", "desk-a")))
+        self.addCleanup(blocker.close)
+        blocker.execute("BEGIN IMMEDIATE")
+        out = sharded.append("long_term", [{"content": "written while short_term is locked"}], {"source": "unit-test"})
+        self.assertEqual(out["accepted_count"], 1)
+        blocker.rollback()
+
+    def test_query_cache_hits_and_invalidates_across_connections(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        policy = ROOT / "contracts/memory/lds-memory-policy.json"
+        db_path = Path(tmp.name) / "cache.sqlite3"
+        adapter = self.mod.MemoryBackendAdapterV2(policy, db_path, query_cache_size=8)
+        self.addCleanup(adapter.close)
+        adapter.append("long_term", [{"content": "venue latency baseline"}], {"source": "unit-test"})
+        adapter.append("episodic", [{"content": "venue outage review"}], {"source": "unit-test"})
+
+        first = adapter.query("Venue  latency", ["long_term"], top_k=3, filters={})
+        self.assertFalse(first["cache"]["hit"])
+        second = adapter.query("venue latency", ["long_term"], top_k=3, filters={})
+        self.assertTrue(second["cache"]["hit"])
+        self.assertEqual(second["results"], first["results"])
+        second["results"].clear()
+        self.assertEqual(len(adapter.query("venue latency", ["long_term"], 3, filters={})["results"]), 1)
+
+        # A write from another connection (another process in production) bumps the class generation.
+        other = self.mod.MemoryBackendAdapterV2(policy, db_path)
+        other.append("long_term", [{"content": "venue latency regression"}], {"source": "unit-test"})
+        other.append("episodic", [{"content": "unrelated venue note"}], {"source": "unit-test"})
+        refreshed = adapter.query("venue latency", ["long_term"], top_k=3, filters={})
+        self.assertFalse(refreshed["cache"]["hit"])
+        self.assertEqual(len(refreshed["results"]), 2)
+
+        adapter.query("venue", ["long_term"], top_k=3, filters={})
+        other.evict("episodic", "all", "manual")
+        self.assertTrue(adapter.query("venue", ["long_term"], 3, filters={})["cache"]["hit"], "other classes keep entries")
+        other.evict("long_term", "all", "manual")
+        other.close()
+        evicted = adapter.query("venue", ["long_term"], top_k=3, filters={})
+        self.assertFalse(evicted["cache"]["hit"])
+        self.assertEqual(evicted["results"], [])
+        self.assertEqual((evicted["cache"]["hits"], evicted["cache"]["misses"]), (3, 4))
+
+    def test_query_instrumentation_spans_and_daemon_lock_wait(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+        adapter.append(
+            "long_term",
+            [{"content": f"collateral haircut {i}"} for i in range(600)],
+            {"source": "unit-test"},
+        )
+        self.assertIsNone(adapter.instrumentation.last, "instrumentation is opt-in")
+
+        adapter.instrumentation = self.mod.Instrumentation()
+        adapter.query("collateral haircut", ["long_term"], 5, filters={})
+        record = adapter.instrumentation.last
+        self.assertEqual(set(record["spans_ms"]), {"fetch", "score", "sort", "decode"})
+        self.assertEqual(record["counters"], {"rows_scanned": 600, "rows_returned": 5})
+
+        socket_path = Path(tmp.name) / "memory.sock"
+        server = self.mod.MemoryDaemon(socket_path, adapter)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        client = self.mod.MemoryDaemonClient(socket_path)
+        self.addCleanup(client.close)
+        response = client.request({"op": "query", "query": "haircut", "top_k": 2, "stats": True})
+        self.assertEqual(response["stats"]["op"], "query")
+        self.assertIn("lock_wait", response["stats"]["spans_ms"])
+        self.assertNotIn("stats", client.request({"op": "query", "query": "haircut"}))
+
+    def test_fts_query_matches_substring_fallback(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+        self.assertTrue(adapter.fts_enabled)
+
+        adapter.append(
+            "long_term",
+            [
+                {"content": "Order execution latency spike", "evidence_score": 0.9},
+                {"content": "Quarterly risk review notes", "evidence_score": 0.5},
+                {"content": "Latency budget exceeded on gateway", "evidence_score": 0.4},
+            ],
+            {"source": "unit-test", "trace_id": "v2-f1"},
+        )
+        fts_count = adapter.conn.execute("SELECT count(*) FROM memory_records_fts").fetchone()[0]
+        self.assertEqual(fts_count, 3)
+
+        fallback = self.mod.MemoryBackendAdapterV2(
+            ROOT / "contracts/memory/lds-memory-policy.json",
+            db_path,
+            use_fts=False,
+        )
+        self.addCleanup(fallback.close)
+        self.assertFalse(fallback.fts_enabled)
+
+        for text in ("latency", "tency gateway", "review"):
+            with_fts = adapter.query(text, ["long_term"], top_k=10, filters={})
+            without_fts = fallback.query(text, ["long_term"], top_k=10, filters={})
+            self.assertEqual(
+                [item["record_id"] for item in with_fts["results"]],
+                [item["record_id"] for item in without_fts["results"]],
+            )
+
+    def test_fts_query_plan_scans_index_once(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        statements = []
+        adapter.conn.set_trace_callback(statements.append)
+        adapter.query("latency", ["long_term"], top_k=5, filters={})
+        adapter.conn.set_trace_callback(None)
+
+        fts_sql = next(sql for sql in statements if "MATCH" in sql)
+        plan = [row[3] for row in adapter.conn.execute("EXPLAIN QUERY PLAN " + fts_sql)]
+        self.assertTrue(plan[0].startswith("SCAN f VIRTUAL TABLE"), plan)
+        self.assertIn("INTEGER PRIMARY KEY", plan[1])
+
+    def test_expiry_and_age_predicates_use_partial_live_indexes(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        adapter = self.mod.MemoryBackendAdapterV2(
+            ROOT / "contracts/memory/lds-memory-policy.json",
+            Path(tmp.name) / "plans.sqlite3",
+            use_fts=False,
+        )
+        self.addCleanup(adapter.close)
+        adapter.append("episodic", [{"content": f"clearing note {i}"} for i in range(20)], {"source": "unit-test"})
+        with adapter.conn:
+            adapter.conn.execute("UPDATE memory_records SET created_at = '2020-01-10T10:00:00Z'")
+        row = adapter.conn.execute("SELECT created_epoch FROM memory_records LIMIT 1").fetchone()
+        self.assertEqual(row[0], 1578650400, "editing created_at must resync created_epoch")
+
+        statements = []
+        adapter.conn.set_trace_callback(statements.append)
+        adapter.query("clearing", ["episodic"], top_k=5, filters={})
+        adapter.compact("episodic", "2020-12-31", 16)
+        adapter.evict("episodic", "expired", "ttl_expired")
+        adapter.conn.set_trace_callback(None)
+
+        expected = {
+            "expires_epoch >=": "idx_memory_records_live_expires (memory_class=? AND expires_epoch>?)",
+            "created_epoch <": "idx_memory_records_live_created (memory_class=? AND created_epoch<?)",
+            "expires_epoch <": "idx_memory_records_live_expires (memory_class=? AND expires_epoch<?)",
+        }
+        for predicate, index in expected.items():
+            matching = [sql for sql in statements if predicate in sql and not sql.lstrip().startswith("CREATE")]
+            self.assertTrue(matching, predicate)
+            for sql in matching:
+                plan = [row[3] for row in adapter.conn.execute("EXPLAIN QUERY PLAN " + sql)]
+                self.assertTrue(any(index in step for step in plan), (sql, plan))
+                self.assertFalse(any(step.startswith("SCAN") for step in plan), (sql, plan))
+
+    def test_fts_short_tokens_use_substring_scorer(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        adapter.append(
+            "short_term",
+            [{"content": "Fill ratio on venue A", "evidence_score": 0.7}],
+            {"source": "unit-test", "trace_id": "v2-f2"},
+        )
+        self.assertIsNone(adapter._fts_match_expression(["on", "venue"]))
+        out = adapter.query("on", ["short_term"], top_k=3, filters={})
+        self.assertEqual(len(out["results"]), 1)
+
+    def test_bm25_ranking_prefers_focused_records(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        adapter.append(
+            "long_term",
+            [
+                {
+                    "content": "latency " * 3 + " ".join(f"filler{i}" for i in range(200)),
+                    "evidence_score": 0.5,
+                },
+                {"content": "Gateway latency regression", "evidence_score": 0.5},
+                *[{"content": f"Unrelated venue onboarding step {i}", "evidence_score": 0.5} for i in range(8)],
+            ],
+            {"source": "unit-test", "trace_id": "v2-b1"},
+        )
+
+        lexical = adapter.query("latency", ["long_term"], top_k=5, filters={})
+        self.assertTrue(lexical["results"][0]["evidence"]["content"].startswith("latency latency"))
+
+        fallback = self.mod.MemoryBackendAdapterV2(
+            ROOT / "contracts/memory/lds-memory-policy.json",
+            db_path,
+            use_fts=False,
+        )
+        self.addCleanup(fallback.close)
+
+        for backend in (adapter, fallback):
+            ranked = backend.query("latency", ["long_term"], top_k=5, filters={"ranking": "bm25"})
+            self.assertEqual(len(ranked["results"]), 2)
+            self.assertEqual(ranked["results"][0]["evidence"]["content"], "Gateway latency regression")
+
+    def test_bm25_scores_match_with_and_without_fts(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        # "venue" is in every record, so only the idf formula decides whether it still contributes.
+        adapter.append(
+            "long_term",
+            [
+                {"content": "venue latency spike latency", "evidence_score": 0.4},
+                {"content": "venue onboarding checklist", "evidence_score": 0.7},
+                {"content": "venue latency budget review for gateway", "evidence_score": 0.5},
+                {"content": "venue fee schedule", "evidence_score": 0.9},
+            ],
+            {"source": "unit-test", "trace_id": "v2-b3"},
+        )
+        fallback = self.mod.MemoryBackendAdapterV2(
+            ROOT / "contracts/memory/lds-memory-policy.json",
+            db_path,
+            use_fts=False,
+        )
+        self.addCleanup(fallback.close)
+        self.assertTrue(adapter.fts_enabled)
+
+        for text in ("venue", "venue latency", "latency gateway"):
+            with_fts = adapter.query(text, ["long_term"], top_k=4, filters={"ranking": "bm25"})
+            without_fts = fallback.query(text, ["long_term"], top_k=4, filters={"ranking": "bm25"})
+            self.assertEqual(
+                [(item["record_id"], item["score"]) for item in with_fts["results"]],
+                [(item["record_id"], item["score"]) for item in without_fts["results"]],
+                text,
+            )
+
+        only_venue = adapter.query("venue", ["long_term"], top_k=1, filters={"ranking": "bm25"})
+        evidence_and_recency = float(adapter.ranking["evidence_weight"]) * 0.9 + float(adapter.ranking["recency_weight"])
+        self.assertGreater(only_venue["results"][0]["score"], round(evidence_and_recency, 4))
+
+    def test_bm25_blends_evidence_and_recency(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        inserted = adapter.append(
+            "long_term",
+            [
+                {"content": "Hedge ratio drift detected", "evidence_score": 0.6},
+                {"content": "Hedge ratio drift observed", "evidence_score": 0.6},
+            ],
+            {"source": "unit-test", "trace_id": "v2-b2"},
+        )
+        stale_id = inserted["record_ids"][0]
+        adapter.conn.execute(
+            "UPDATE memory_records SET created_at = '2020-01-10T10:00:00Z' WHERE record_id = ?",
+            (stale_id,),
+        )
+        adapter.conn.commit()
+
+        ranked = adapter.query("hedge drift", ["long_term"], top_k=2, filters={"ranking": "bm25"})
+        self.assertNotEqual(ranked["results"][0]["record_id"], stale_id)
+
+        with self.assertRaises(ValueError):
+            adapter.query("hedge", ["long_term"], top_k=2, filters={"ranking": "cosine"})
+
+    def test_query_top_k_keeps_best_hits_in_order(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        adapter.append(
+            "episodic",
+            [
+                {"content": f"{'spread ' * hits}widening episode {hits}", "evidence_score": 0.5}
+                for hits in range(1, 7)
+            ],
+            {"source": "unit-test", "trace_id": "v2-k1"},
+        )
+
+        full = adapter.query("spread", ["episodic"], top_k=10, filters={})
+        top = adapter.query("spread", ["episodic"], top_k=3, filters={})
+        self.assertEqual(len(full["results"]), 6)
+        self.assertEqual(top["results"], full["results"][:3])
+        self.assertEqual([item["score"] for item in top["results"]], [6.5, 5.5, 4.5])
+        self.assertEqual(top["results"][0]["evidence"]["provenance"]["trace_id"], "v2-k1")
+
+    def test_dense_and_hybrid_ranking_recover_paraphrases(self):
+        tmp, lexical_only, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(lexical_only.close)
+
+        lexical_only.append(
+            "long_term",
+            [
+                {"content": "Settlement failures spiked after the clearing migration", "evidence_score": 0.5},
+                {"content": "Gateway latency regression on venue B", "evidence_score": 0.5},
+            ],
+            {"source": "unit-test", "trace_id": "v2-d1"},
+        )
+        self.assertEqual(lexical_only.conn.execute("SELECT count(*) FROM memory_record_embeddings").fetchone()[0], 0)
+        with self.assertRaisesRegex(ValueError, "dense_enabled"):
+            lexical_only.query("settling failed", ["long_term"], top_k=3, filters={"ranking": "dense"})
+        triggers = [str(row[0]) for row in lexical_only.conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger'")]
+        self.assertFalse(any("lds_embedding" in sql for sql in triggers), "writes must not need a Python UDF")
+
+        # Opening with dense enabled embeds existing rows; later writes are embedded in batch.
+        adapter = self.mod.MemoryBackendAdapterV2(ROOT / "contracts/memory/lds-memory-policy.json", db_path, dense_enabled=True)
+        self.addCleanup(adapter.close)
+        adapter.append(
+            "long_term",
+            [{"content": "Margin calls delayed overnight", "evidence_score": 0.5}],
+            {"source": "unit-test", "trace_id": "v2-d1"},
+        )
+        stored = adapter.conn.execute("SELECT COUNT(*), MIN(LENGTH(embedding)) FROM memory_record_embeddings").fetchone()
+        self.assertEqual(tuple(stored), (3, 2 * self.mod.EMBEDDING_DIM))
+        contents = [row[0] for row in adapter.conn.execute("SELECT content FROM memory_records ORDER BY rowid")]
+        blobs = [row[0] for row in adapter.conn.execute("SELECT embedding FROM memory_record_embeddings ORDER BY rowid")]
+        self.assertEqual(blobs, [self.mod.embedding_blob(content) for content in contents])
+
+        paraphrase = "settling failed"
+        self.assertEqual(adapter.query(paraphrase, ["long_term"], top_k=3, filters={})["results"], [])
+        dense = adapter.query(paraphrase, ["long_term"], top_k=3, filters={"ranking": "dense"})
+        self.assertEqual(dense["results"][0]["evidence"]["content"], "Settlement failures spiked after the clearing migration")
+        self.assertTrue(all(item["score"] > 0 for item in dense["results"]))
+        self.assertEqual(dense["results"][0]["evidence"]["provenance"]["trace_id"], "v2-d1")
+
+        with mock.patch.object(self.mod, "_numpy", return_value=None):
+            fallback = adapter.query(paraphrase, ["long_term"], top_k=3, filters={"ranking": "dense"})
+        self.assertEqual(fallback["results"], dense["results"])
+
+        hybrid = adapter.query("latency settling failed", ["long_term"], top_k=2, filters={"ranking": "hybrid"})
+        self.assertEqual(
+            {item["evidence"]["content"] for item in hybrid["results"]},
+            {"Settlement failures spiked after the clearing migration", "Gateway latency regression on venue B"},
+        )
+
+        adapter.evict("long_term", "all", "manual")
+        self.assertEqual(adapter.query(paraphrase, ["long_term"], top_k=3, filters={"ranking": "dense"})["results"], [])
+
+    def test_bulk_append_matches_per_record_dedup(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+        self.assertTrue(adapter.bulk_insert_enabled)
+
+        batch = [{"content": f"Ingest record {i % 700}", "evidence_score": 0.5} for i in range(1200)]
+        first = adapter.append("long_term", batch, {"source": "unit-test", "trace_id": "v2-a1"})
+        self.assertEqual(first["accepted_count"], 700)
+        self.assertEqual(len(set(first["record_ids"])), 700)
+
+        adapter.bulk_insert_enabled = False
+        second = adapter.append(
+            "long_term",
+            [{"content": "ingest record 5"}, {"content": "Fresh record"}],
+            {"source": "unit-test", "trace_id": "v2-a2"},
+        )
+        self.assertEqual(second["accepted_count"], 1)
+
+        adapter.bulk_insert_enabled = True
+        third = adapter.append(
+            "long_term",
+            [{"content": "Fresh record"}, {"content": "Another fresh record"}],
+            {"source": "unit-test", "trace_id": "v2-a3"},
+        )
+        self.assertEqual(third["accepted_count"], 1)
+
+        live = adapter.conn.execute(
+            "SELECT count(*) FROM memory_records WHERE memory_class = 'long_term' AND tombstone = 0"
+        ).fetchone()[0]
+        self.assertEqual(live, 702)
+
+    def test_batch_record_builder_matches_per_record_builder(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        raw = [
+            {"content": "  Venue LATENCY spike ", "evidence_score": "1.7", "tags": ["fx", 3]},
+            {"content": "clearing delay", "tags": None, "compliance_hold": True},
+        ]
+        provenance = {"source": "unit-test", "trace_id": "v2-b1"}
+        frozen = self.mod.datetime(2026, 1, 2, 3, 4, 5, tzinfo=self.mod.timezone.utc)
+        with mock.patch.object(adapter, "_now_utc", return_value=frozen):
+            batch = adapter._build_records("long_term", raw, provenance)
+            single = [adapter._build_record("long_term", record, provenance) for record in raw]
+        self.assertEqual(batch, single)
+        self.assertEqual(batch[0]["record_id"], adapter._sha256(f"{batch[0]['canonical_hash']}:2026-01-02T03:04:05+00:00:unit-test")[:24])
+        self.assertEqual(batch[0]["canonical_hash"], adapter._sha256("venue latency spike"))
+        self.assertEqual((batch[0]["evidence_score"], batch[0]["tags"]), (1.0, ["fx", "3"]))
+        self.assertEqual(batch[1]["created_at"], "2026-01-02T03:04:05Z")
+        self.assertIs(batch[1]["provenance"], batch[0]["provenance"])
+
+        rows = adapter._insert_rows(batch)
+        self.assertEqual(rows[0][5], '["fx", "3"]')
+        self.assertEqual(rows[1][5], "[]")
+        self.assertEqual(rows[1][8], json.dumps(provenance, ensure_ascii=True))
+        self.assertEqual(rows[0][12], adapter._iso_epoch("2026-01-02T03:04:05Z"))
+        self.assertNotIn("compliance_hold", batch[1])
+        self.assertEqual(rows[1][10], 0, "append must not place records under compliance hold")
+        other = dict(batch[0], provenance={"source": "other"})
+        mixed = adapter._insert_rows([batch[0], other, dict(batch[1], provenance=dict(provenance))])
+        self.assertEqual([row[8] for row in mixed], [rows[0][8], '{"source": "other"}', rows[0][8]])
+
+        with self.assertRaisesRegex(ValueError, "append records must be objects"):
+            adapter._build_records("long_term", [{"content": "ok"}, "not a record"], provenance)
+
+    def test_append_rejects_invalid_batch_atomically(self):
+        tmp, adapter, _ = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+
+        with self.assertRaises(ValueError):
+            adapter.append(
+                "short_term",
+                [{"content": "Valid record"}, {"content": "   "}],
+                {"source": "unit-test", "trace_id": "v2-a4"},
+            )
+        self.assertEqual(adapter.conn.execute("SELECT count(*) FROM memory_records").fetchone()[0], 0)
+
+        ok = adapter.append("short_term", [{"content": "Valid record"}], {"source": "unit-test"})
+        self.assertEqual(ok["accepted_count"], 1)
+
+    def test_daemon_serves_ndjson_requests_and_cli_client(self):
+        tmp, adapter, db_path = self.make_adapter()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(adapter.close)
+        socket_path = Path(tmp.name) / "memory.sock"
+        adapter.instrumentation = self.mod.Instrumentation()
+
+        server = self.mod.MemoryDaemon(socket_path, adapter)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.assertEqual(socket_path.stat().st_mode & 0o777, 0o600)
+
+        client = self.mod.MemoryDaemonClient(socket_path)
+        self.addCleanup(client.close)
+        self.assertEqual(client.request({"op": "ping"})["status"], "pass")
+
+        appended = client.request(
+            {
+                "op": "append",
+                "memory_class": "short_term",
+                "records": [{"content": "Daemon latency note", "evidence_score": 0.7}],
+                "provenance": {"source": "unit-test", "trace_id": "v2-d1"},
+            }
+        )
+        self.assertEqual(appended["result"]["accepted_count"], 1)
+
+        failed = client.request({"op": "query", "query": "   "})
+        self.assertEqual(failed["status"], "fail")
+
+        def cli_query(store_path):
+            proc = subprocess.run(
+                [
+                    sys.executable,
+                    "-B",
+                    str(SCRIPT),
+                    "--db-path",
+                    str(store_path),
+                    "--socket",
+                    str(socket_path),
+                    "--stats",
+                    "query",
+                    "--query",
+                    "latency",
+                ],
+                cwd=ROOT,
+                text=True,
+                capture_output=True,
+                check=False,
+            )
+            self.assertEqual(proc.returncode, 0, msg=proc.stdout + proc.stderr)
+            return json.loads(proc.stdout)
+
+        out = cli_query(db_path)
+        self.assertEqual(out["result"]["results"][0]["evidence"]["content"], "Daemon latency note")
+        self.assertIn("lock_wait", out["stats"]["spans_ms"], "served by the daemon")
+
+        other = Path(tmp.name) / "other.sqlite3"
+        out = cli_query(other)
+        self.assertEqual(out["result"]["results"], [], "another store is queried in-process")
+        self.assertTrue(other.exists())
+        mismatch = client.request({"op": "query", "query": "latency", "store": self.mod.store_identity(ROOT, other)})
+        self.assertTrue(mismatch["store_mismatch"])
+
+        self.assertTrue(client.request({"op": "shutdown"})["result"]["shutdown"])
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+
+    def test_async_facade_queries_in_parallel_with_queued_writes(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        db_path = Path(tmp.name) / "lds_memory.sqlite3"
+
+        async def scenario():
+            backend = self.mod.AsyncMemoryBackendV2(
+                ROOT / "contracts/memory/lds-memory-policy.json",
+                db_path,
+                reader_pool_size=3,
+                max_pending_writes=2,
+            )
+            async with backend:
+                await backend.append(
+                    "long_term",
+                    [{"content": "Seed settlement latency note", "evidence_score": 0.8}],
+                    {"source": "unit-test", "trace_id": "v2-as1"},
+                )
+                writes = [
+                    backend.append(
+                        "long_term",
+                        [{"content": f"Async ingest settlement batch {i}"}],
+                        {"source": "unit-test", "trace_id": f"v2-as-w{i}"},
+                    )
+                    for i in range(10)
+                ]
+                reads = [backend.query("settlement", ["long_term"], 20, {}) for _ in range(10)]
+                outcomes = await asyncio.gather(*writes, *reads)
+
+                with self.assertRaises(ValueError):
+                    await backend.append("long_term", [{"content": "x"}], {})
+                final = await backend.query("settlement", ["long_term"], 20, {})
+            return outcomes, final
+
+        outcomes, final = asyncio.run(scenario())
+        self.assertTrue(all(out["accepted_count"] == 1 for out in outcomes[:10]))
+        self.assertTrue(all(len(out["results"]) >= 1 for out in outcomes[10:]))
+        self.assertEqual(len(final["results"]), 11)
+
+    def test_async_facade_opens_every_connection_off_the_event_loop(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        opened_on = []
+
+        class RecordingAdapter(self.mod.MemoryBackendAdapterV2):
+            def __init__(self, *args, **kwargs):
+                opened_on.append((kwargs.get("read_only", False), threading.current_thread().name))
+                super().__init__(*args, **kwargs)
+
+        async def scenario():
+            backend = self.mod.AsyncMemoryBackendV2(
+                ROOT / "contracts/memory/lds-memory-policy.json",
+                Path(tmp.name) / "lds_memory.sqlite3",
+                reader_pool_size=3,
+            )
+            async with backend:
+                return threading.current_thread().name
+
+        with mock.patch.object(self.mod, "MemoryBackendAdapterV2", RecordingAdapter):
+            loop_thread = asyncio.run(scenario())
+        self.assertEqual(sorted(read_only for read_only, _ in opened_on), [False, True, True, True])
+        self.assertNotIn(loop_thread, [thread for _, thread in opened_on])
+
     def test_records_file_path_rejects_traversal(self):
         with self.assertRaises(ValueError):
             self.mod.load_records_from_args("../../../etc/passwd", [])
+        with self.assertRaisesRegex(ValueError, "--input"):
+            self.mod.resolve_records_file_path("../../../etc/passwd", "--input")
 
     def test_records_file_path_allows_file_inside_root(self):
         data_path = ROOT / "tests" / "fixtures" / "memory_v2_records.json"
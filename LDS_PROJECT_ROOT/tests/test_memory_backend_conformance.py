@@ -0,0 +1,272 @@
+import importlib.util
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+import unittest
+
+ROOT = Path(__file__).resolve().parents[1]
+POLICY = ROOT / "contracts" / "memory" / "lds-memory-policy.json"
+BENCH = ROOT / "benchmarks" / "bench_memory_backends.py"
+
+
+def load_module(path: Path, name: str):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    assert spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+class MemoryBackendConformance:
+    """Checks every memory backend must pass; subclasses provide the backend and a test hook.
+
+    `LATENCY_BUDGETS` are deliberately loose ceilings for a shared CI runner: they catch order-of-
+    magnitude regressions (an accidental full scan per record), not small drifts, which
+    `benchmarks/bench_memory_backends.py --baseline` is for.
+    """
+
+    LATENCY_BUDGETS = {
+        "records": 2000,
+        "queries": 40,
+        "append_seconds": 10.0,
+        "query_p95_ms": 250.0,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bench = load_module(BENCH, "bench_memory_backends")
+
+    def make_backend(self, store: Path):
+        raise NotImplementedError
+
+    def rewrite_dates(self, memory_class: str, created_at: str | None = None, expires_on: str | None = None):
+        """Backdate every record of a class; this and `hold_records` are the only storage hooks."""
+        raise NotImplementedError
+
+    def hold_records(self, memory_class: str, record_ids: list[str]):
+        """Put records under compliance hold, which the append API deliberately cannot do."""
+        raise NotImplementedError
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.backend = self.make_backend(Path(tmp.name))
+        self.addCleanup(self.backend.close)
+
+    def test_satisfies_memory_backend_protocol(self):
+        self.assertIsInstance(self.backend, self.bench.common.MemoryBackend)
+
+    def test_deduplicates_by_canonical_content(self):
+        first = self.backend.append(
+            "short_term",
+            [{"content": "Venue latency spike"}, {"content": "venue   LATENCY spike"}],
+            {"source": "conformance"},
+        )
+        self.assertEqual(first["accepted_count"], 1)
+        second = self.backend.append("short_term", [{"content": " Venue latency spike "}], {"source": "conformance"})
+        self.assertEqual(second["accepted_count"], 0)
+        other_class = self.backend.append("long_term", [{"content": "Venue latency spike"}], {"source": "conformance"})
+        self.assertEqual(other_class["accepted_count"], 1, "dedup is scoped to one memory class")
+
+    def test_requires_provenance_and_known_class(self):
+        with self.assertRaises(ValueError):
+            self.backend.append("short_term", [{"content": "no provenance"}], {})
+        with self.assertRaises(ValueError):
+            self.backend.append("unknown", [{"content": "bad class"}], {"source": "conformance"})
+
+    def test_expired_records_are_hidden_then_evicted(self):
+        self.backend.append("short_term", [{"content": "stale settlement note"}], {"source": "conformance"})
+        self.backend.append("long_term", [{"content": "fresh settlement note"}], {"source": "conformance"})
+        self.rewrite_dates("short_term", expires_on=(date.today() - timedelta(days=1)).isoformat())
+
+        out = self.backend.query("settlement", None, 10, filters={})
+        self.assertEqual([item["evidence"]["content"] for item in out["results"]], ["fresh settlement note"])
+
+        evicted = self.backend.evict("short_term", "expired", "ttl_expired")
+        self.assertEqual(evicted["evicted_count"], 1)
+        self.assertEqual(self.backend.evict("short_term", "expired", "ttl_expired")["evicted_count"], 0)
+
+    def test_tombstones_hide_records_without_hard_delete(self):
+        appended = self.backend.append(
+            "episodic",
+            [{"content": "hedge drift alpha"}, {"content": "hedge drift beta"}],
+            {"source": "conformance"},
+        )
+        self.hold_records("episodic", appended["record_ids"][1:])
+        evicted = self.backend.evict("episodic", "all", "manual_review")
+        self.assertEqual(sorted(evicted["tombstones"]), sorted(appended["record_ids"]))
+        self.assertEqual(self.backend.query("hedge drift", ["episodic"], 5, filters={})["results"], [])
+
+        stored = {rec["record_id"]: rec for rec in self.backend._load_records("episodic")}
+        self.assertEqual(set(stored), set(appended["record_ids"]), "evict must tombstone, never hard delete")
+        self.assertTrue(all(rec["tombstone"] and rec["tombstone_reason"] == "manual_review" for rec in stored.values()))
+        held = [rec for rec in stored.values() if rec.get("compliance_hold")]
+        self.assertEqual([rec["content"] for rec in held], ["hedge drift beta"])
+
+        again = self.backend.append("episodic", [{"content": "hedge drift alpha"}], {"source": "conformance"})
+        self.assertEqual(again["accepted_count"], 1, "tombstoned content may be appended again")
+
+    def test_evict_counts_only_omits_ids(self):
+        self.backend.append("short_term", [{"content": "gateway outage"}], {"source": "conformance"})
+        out = self.backend.evict("short_term", "all", "manual", return_tombstones=False)
+        self.assertEqual(out, {"evicted_count": 1, "tombstones": []})
+
+    def test_compact_links_sources_to_summary(self):
+        self.backend.append(
+            "episodic",
+            [{"content": "margin call overnight"}, {"content": "clearing delay overnight"}],
+            {"source": "conformance"},
+        )
+        self.rewrite_dates("episodic", created_at="2020-01-10T10:00:00Z")
+        out = self.backend.compact("episodic", "2020-12-31", 8)
+        self.assertEqual(out["compacted_count"], 2)
+        self.assertEqual(len(out["summary_ids"]), 1)
+        linked = [rec for rec in self.backend._load_records("episodic") if rec.get("compacted_into")]
+        self.assertEqual({rec["compacted_into"] for rec in linked}, set(out["summary_ids"]))
+        self.assertEqual(len(linked), 2)
+
+    def test_query_ranks_by_hits_then_evidence(self):
+        self.backend.append(
+            "long_term",
+            [
+                {"content": "spread spread risk", "evidence_score": 0.1},
+                {"content": "spread risk", "evidence_score": 0.9},
+                {"content": "spread only", "evidence_score": 0.2},
+            ],
+            {"source": "conformance"},
+        )
+        out = self.backend.query("spread risk", ["long_term"], 2, filters={})
+        self.assertEqual([item["evidence"]["content"] for item in out["results"]], ["spread spread risk", "spread risk"])
+        self.assertTrue(out["trace_id"])
+
+    def test_instrumentation_reports_each_operation_to_hooks_and_log(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        metrics_log = Path(tmp.name) / "metrics.jsonl"
+        seen = []
+        self.backend.instrumentation = self.bench.common.Instrumentation(metrics_log=metrics_log, hooks=[seen.append])
+
+        self.backend.append("episodic", [{"content": "fx settlement lag"}], {"source": "conformance"})
+        self.backend.query("settlement", ["episodic"], 3, filters={})
+        self.backend.compact("episodic", "2000-01-01", 8)
+        self.backend.evict("episodic", "all", "manual")
+
+        self.assertEqual([record["op"] for record in seen], ["append", "query", "compact", "evict"])
+        self.assertTrue(all(record["status"] == "pass" and record["total_ms"] >= 0 for record in seen))
+        self.assertEqual(seen[0]["counters"]["rows_accepted"], 1)
+        self.assertEqual(seen[1]["counters"]["rows_returned"], 1)
+        self.assertEqual(seen[3]["counters"]["rows_evicted"], 1)
+
+        summary = self.bench.common.summarize_metrics_log(metrics_log)
+        self.assertEqual(sorted(summary), ["append", "compact", "evict", "query"])
+        self.assertEqual(summary["query"]["count"], 1)
+
+    def test_latency_budgets(self):
+        budget = self.LATENCY_BUDGETS
+        records = self.bench.generate_records(
+            budget["records"],
+            seed=13,
+            class_mix={"short_term": 0.5, "episodic": 0.3, "long_term": 0.2},
+            content_words=24,
+            tag_cardinality=64,
+        )
+        by_class = {}
+        for memory_class, record in records:
+            by_class.setdefault(memory_class, []).append(record)
+
+        started = time.perf_counter()
+        for memory_class, class_records in by_class.items():
+            self.backend.append(memory_class, class_records, {"source": "conformance-budget"})
+        append_seconds = time.perf_counter() - started
+
+        rng = random.Random(14)
+        latencies = []
+        for _ in range(budget["queries"]):
+            text = " ".join(rng.sample(self.bench.DOMAIN_WORDS, k=2))
+            started = time.perf_counter()
+            self.backend.query(text, None, 5, filters={})
+            latencies.append((time.perf_counter() - started) * 1000.0)
+
+        self.assertLess(append_seconds, budget["append_seconds"])
+        self.assertLess(self.bench.percentile(latencies, 95), budget["query_p95_ms"])
+
+
+class MemoryBackendV1ConformanceTests(MemoryBackendConformance, unittest.TestCase):
+    def make_backend(self, store: Path):
+        return self.bench.open_adapter("v1", POLICY, store)
+
+    def rewrite_dates(self, memory_class, created_at=None, expires_on=None):
+        records = self.backend._load_records(memory_class)
+        for rec in records:
+            if created_at:
+                rec["created_at"] = created_at
+            if expires_on:
+                rec["expires_on"] = expires_on
+        self.backend._write_records(memory_class, records)
+
+    def hold_records(self, memory_class, record_ids):
+        records = self.backend._load_records(memory_class)
+        for rec in records:
+            if rec["record_id"] in record_ids:
+                rec["compliance_hold"] = True
+        self.backend._write_records(memory_class, records)
+
+
+class MemoryBackendV2ConformanceTests(MemoryBackendConformance, unittest.TestCase):
+    USE_FTS = True
+
+    def make_backend(self, store: Path):
+        return self.bench.open_adapter("v2", POLICY, store, use_fts=self.USE_FTS)
+
+    def rewrite_dates(self, memory_class, created_at=None, expires_on=None):
+        with self.backend.conn:
+            if created_at:
+                self.backend.conn.execute(
+                    "UPDATE memory_records SET created_at = ? WHERE memory_class = ?",
+                    (created_at, memory_class),
+                )
+            if expires_on:
+                self.backend.conn.execute(
+                    "UPDATE memory_records SET expires_on = ? WHERE memory_class = ?",
+                    (expires_on, memory_class),
+                )
+
+    def hold_records(self, memory_class, record_ids):
+        with self.backend.conn:
+            self.backend.conn.executemany(
+                "UPDATE memory_records SET compliance_hold = 1 WHERE memory_class = ? AND record_id = ?",
+                [(memory_class, record_id) for record_id in record_ids],
+            )
+
+
+class MemoryBackendV2SubstringConformanceTests(MemoryBackendV2ConformanceTests):
+    USE_FTS = False
+
+
+class MemoryBackendV2ShardedConformanceTests(MemoryBackendConformance, unittest.TestCase):
+    def make_backend(self, store: Path):
+        return self.bench.open_adapter("v2-sharded", POLICY, store)
+
+    def rewrite_dates(self, memory_class, created_at=None, expires_on=None):
+        for key in self.backend.shard_keys(memory_class):
+            conn = self.backend._shard(*key).conn
+            with conn:
+                if created_at:
+                    conn.execute("UPDATE memory_records SET created_at = ? WHERE memory_class = ?", (created_at, memory_class))
+                if expires_on:
+                    conn.execute("UPDATE memory_records SET expires_on = ? WHERE memory_class = ?", (expires_on, memory_class))
+
+    def hold_records(self, memory_class, record_ids):
+        for key in self.backend.shard_keys(memory_class):
+            conn = self.backend._shard(*key).conn
+            with conn:
+                conn.executemany(
+                    "UPDATE memory_records SET compliance_hold = 1 WHERE memory_class = ? AND record_id = ?",
+                    [(memory_class, record_id) for record_id in record_ids],
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()